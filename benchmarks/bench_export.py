@@ -0,0 +1,101 @@
+"""
+Measure `catherd export` throughput against a synthetic Atuin history.
+
+    python benchmarks/bench_export.py --rows 10000000
+
+The database is generated once (inside SQLite, so it takes seconds rather
+than minutes) and reused on later runs with the same row count.
+"""
+
+import argparse
+import io
+import resource
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from catherd.export import export_history
+from catherd.kitty import KittyWindow
+
+SCHEMA = """
+CREATE TABLE history (
+    id TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    exit INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    cwd TEXT NOT NULL,
+    session TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    deleted_at INTEGER
+);
+CREATE INDEX idx_history_timestamp ON history (timestamp);
+"""
+
+GENERATE = """
+WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+INSERT INTO history (id, timestamp, duration, exit, command, cwd, session, hostname)
+SELECT
+    printf('%016x', i),
+    1700000000000000000 + i * 1000000000,
+    abs(random() % 5000000000),
+    CASE WHEN i % 17 = 0 THEN 1 ELSE 0 END,
+    'make test --target=' || (i % 997),
+    '/home/me/src/project' || (i % 13),
+    'session-' || (i % ?),
+    'host:me'
+FROM n
+"""
+
+
+class NullWriter(io.TextIOBase):
+    """Counts characters instead of storing them."""
+
+    def __init__(self) -> None:
+        self.chars = 0
+
+    def write(self, s: str) -> int:
+        self.chars += len(s)
+        return len(s)
+
+
+def build_db(path: Path, rows: int, sessions: int) -> None:
+    if path.exists():
+        return
+    started = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    with conn:
+        conn.execute(GENERATE, (rows, sessions))
+    conn.close()
+    print(f"built {rows:,} rows in {time.perf_counter() - started:.1f} s: {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--dir", type=Path, default=Path(tempfile.gettempdir()))
+    args = parser.parse_args()
+
+    db = args.dir / f"catherd-bench-history-{args.rows}.db"
+    build_db(db, args.rows, args.sessions)
+    windows = {
+        f"session-{i}": KittyWindow(id=str(i), tab=str(i // 10), title=f"window {i}", os_window="1")
+        for i in range(args.sessions)
+    }
+    out = NullWriter()
+    started = time.perf_counter()
+    written = export_history(windows, out, args.format, db_paths=[db])
+    elapsed = time.perf_counter() - started
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{args.format}: {written:,} rows, {out.chars / 2**20:.0f} MiB in {elapsed:.1f} s "
+        f"= {written / elapsed:,.0f} rows/s, peak RSS {peak_mib:.0f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
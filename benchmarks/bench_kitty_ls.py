@@ -0,0 +1,108 @@
+"""
+Compare peak RSS and parse time of the `kitty @ ls` decoders.
+
+    python benchmarks/bench_kitty_ls.py --windows 500
+
+`json` is the old path (read all of stdout, then `json.loads`); `stream`
+is `decode_kitty_ls` over 64 KiB chunks. Each runs in a fresh interpreter
+so the peak RSS of one does not hide the other.
+"""
+
+import argparse
+import json
+import resource
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from catherd.kitty import READ_CHUNK_SIZE
+from catherd.kitty_ls import decode_kitty_ls
+
+
+def make_window(i: int) -> dict[str, object]:
+    return {
+        "id": i,
+        "title": f"window {i}",
+        "is_focused": False,
+        "pid": 10000 + i,
+        "cwd": f"/home/me/src/project{i % 13}",
+        "cmdline": ["/bin/zsh", "-l"],
+        "env": {f"VAR_{n}": f"/some/fairly/long/value/{n}/{i}" for n in range(60)},
+        "foreground_processes": [
+            {
+                "pid": 20000 + i,
+                "cwd": "/home/me",
+                "cmdline": ["python", "-m", "pytest", "-q", *[f"t{n}" for n in range(40)]],
+            }
+        ],
+        "user_vars": {},
+        "at_prompt": True,
+        "lines": 50,
+        "columns": 200,
+    }
+
+
+def make_payload(windows: int, per_tab: int = 5) -> bytes:
+    tabs = [
+        {
+            "id": t,
+            "title": f"tab {t}",
+            "is_focused": t == 0,
+            "layout": "tall",
+            "windows": [make_window(i) for i in range(t * per_tab, min((t + 1) * per_tab, windows))],
+        }
+        for t in range((windows + per_tab - 1) // per_tab)
+    ]
+    return json.dumps([{"id": 1, "is_focused": True, "tabs": tabs}], indent=2).encode()
+
+
+def parse(mode: str, path: Path) -> None:
+    baseline_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with path.open("rb") as stream:
+        if mode == "json":
+            data = json.loads(stream.read().decode())
+        else:
+            data = decode_kitty_ls(iter(lambda: stream.read(READ_CHUNK_SIZE), b""))
+    elapsed = time.perf_counter() - started
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    windows = sum(len(tab["windows"]) for osw in data for tab in osw["tabs"])
+    grown_mib = (peak_kib - baseline_kib) / 1024
+    print(f"{mode:>6}: {windows} windows in {elapsed * 1000:.0f} ms, peak RSS +{grown_mib:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--windows", type=int, default=500)
+    parser.add_argument("--step", choices=["generate", "json", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--file", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.step == "generate":
+        payload = make_payload(args.windows)
+        args.file.write_bytes(payload)
+        print(f"payload: {args.windows} windows, {len(payload) / 2**20:.1f} MiB")
+        return
+    if args.step:
+        parse(args.step, args.file)
+        return
+    # Every step runs in its own interpreter: a child inherits its parent's peak RSS.
+    with tempfile.NamedTemporaryFile(suffix=".json") as tmp:
+        for step in ("generate", "json", "stream"):
+            cmd = [
+                sys.executable,
+                __file__,
+                "--windows",
+                str(args.windows),
+                "--step",
+                step,
+                "--file",
+                tmp.name,
+            ]
+            subprocess.run(cmd, check=True)  # noqa: S603
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Join Kitty windows with their Atuin session and last command."""
+
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from .atuin import (
+    HistoryFilter,
+    get_last_commands_for_atuin_sessions,
+    get_recent_windows_for_atuin_sessions,
+    get_running_commands_for_atuin_sessions,
+)
+from .deadline import Deadline
+from .kitty import KittyWindow
+from .registry import earlier_sessions, read_session_lineage, read_session_registry, window_sessions
+from .session_index import get_indexed_last_commands, get_indexed_recent_windows
+
+
+@dataclass(frozen=True, slots=True)
+class WindowActivity:
+    window_id: str
+    tab: str | None
+    title: str
+    session: str | None
+    last_command: str
+
+
+@dataclass(frozen=True, slots=True)
+class RunningCommand:
+    command: str
+    # Seconds since Atuin recorded the start; None when Atuin has no unfinished row for it.
+    elapsed: float | None = None
+
+
+def format_elapsed(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
+
+
+def lookup_last_commands(
+    session_ids: Sequence[str],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+    lineage: Mapping[str, Sequence[str]] | None = None,
+) -> dict[str, str]:
+    """
+    Return the last command of each session, or of an earlier session of its window in `lineage`.
+
+    Unfiltered lookups go through the sidecar session index; hostname and
+    time-range filters need the raw history, so they query it directly.
+    """
+    if history_filter is None or history_filter == HistoryFilter():
+        return get_indexed_last_commands(
+            session_ids, verbose=verbose, db_paths=db_paths, deadline=deadline, lineage=lineage
+        )
+    return get_last_commands_for_atuin_sessions(
+        session_ids,
+        verbose=verbose,
+        db_paths=db_paths,
+        history_filter=history_filter,
+        deadline=deadline,
+        lineage=lineage,
+    )
+
+
+def collect_activity(
+    windows: Sequence[KittyWindow],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+) -> list[WindowActivity]:
+    """Return one row per window using one scan of the registry and lineage and a single history query."""
+    registry = read_session_registry()
+    sessions = window_sessions(windows, registry)
+    last_commands = lookup_last_commands(
+        [session for session in sessions.values() if session],
+        verbose=verbose,
+        db_paths=db_paths,
+        history_filter=history_filter,
+        deadline=deadline,
+        lineage=earlier_sessions(registry, read_session_lineage()),
+    )
+    return [
+        WindowActivity(
+            window_id=win.id,
+            tab=win.tab,
+            title=win.title,
+            session=sessions[win.id],
+            last_command=last_commands[session] if (session := sessions[win.id]) else "(no session info)",
+        )
+        for win in windows
+    ]
+
+
+def lookup_recent_windows(
+    session_windows: Mapping[str, str],
+    *,
+    limit: int,
+    oldest: bool = False,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+) -> list[tuple[str, str, int]] | None:
+    """Rank windows by recency in the sidecar index, or in the raw history when filtered."""
+    if history_filter is None or history_filter == HistoryFilter():
+        return get_indexed_recent_windows(
+            session_windows, limit=limit, oldest=oldest, verbose=verbose, db_paths=db_paths, deadline=deadline
+        )
+    return get_recent_windows_for_atuin_sessions(
+        session_windows,
+        limit=limit,
+        oldest=oldest,
+        verbose=verbose,
+        db_paths=db_paths,
+        history_filter=history_filter,
+        deadline=deadline,
+    )
+
+
+def collect_recent_activity(
+    windows: Sequence[KittyWindow],
+    *,
+    limit: int | None = None,
+    oldest: bool = False,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+) -> list[WindowActivity] | None:
+    """
+    Return rows for the `limit` most (or least) recently active windows, in that order.
+
+    The ranking and the cut-off happen in SQLite over every session of
+    every window, so only `limit` rows are read back. Windows without a
+    command fill any remaining places in kitty's order. Returns None if the
+    history could not be read.
+    """
+    registry = read_session_registry()
+    lineage = earlier_sessions(registry, read_session_lineage())
+    sessions = window_sessions(windows, registry)
+    session_windows: dict[str, str] = {}
+    for win in windows:
+        if session := sessions[win.id]:
+            for known in (session, *lineage.get(session, ())):
+                session_windows.setdefault(known, win.id)
+    limit = len(windows) if limit is None else limit
+    ranked = lookup_recent_windows(
+        session_windows,
+        limit=limit,
+        oldest=oldest,
+        verbose=verbose,
+        db_paths=db_paths,
+        history_filter=history_filter,
+        deadline=deadline,
+    )
+    if ranked is None:
+        return None
+    by_id = {win.id: win for win in windows}
+    commands = {window_id: command for window_id, command, _ in ranked}
+    unranked = [win for win in windows if win.id not in commands]
+    rows: list[WindowActivity] = []
+    for win in [*(by_id[window_id] for window_id, _, _ in ranked), *unranked][:limit]:
+        session = sessions[win.id]
+        fallback = "(no command)" if session else "(no session info)"
+        rows.append(WindowActivity(win.id, win.tab, win.title, session, commands.get(win.id, fallback)))
+    return rows
+
+
+def collect_running(
+    windows: Sequence[KittyWindow],
+    sessions: Mapping[str, str | None],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+    now: int | None = None,
+) -> dict[str, RunningCommand]:
+    """
+    Return what each busy window is running, keyed by window ID.
+
+    Busy means kitty reports a foreground process other than the shell, so
+    this needs nothing beyond the `ls` payload the windows came from. The
+    start times come from one query for the unfinished Atuin rows of the
+    busy windows' sessions; `now` is in Atuin's nanoseconds.
+    """
+    busy = [win for win in windows if win.foreground_command]
+    started = get_running_commands_for_atuin_sessions(
+        [session for win in busy if (session := sessions.get(win.id))],
+        verbose=verbose,
+        db_paths=db_paths,
+        history_filter=history_filter,
+        deadline=deadline,
+    )
+    now = time.time_ns() if now is None else now
+    running: dict[str, RunningCommand] = {}
+    for win in busy:
+        start = started.get(sessions.get(win.id) or "")
+        if start is None:
+            running[win.id] = RunningCommand(win.foreground_command or "")
+        else:
+            command, timestamp = start
+            running[win.id] = RunningCommand(command, max(0, now - timestamp) / 1e9)
+    return running
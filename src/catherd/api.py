@@ -0,0 +1,158 @@
+"""
+In-process API for kitty tab bars, watchers and other embedders.
+
+Nothing here prints or exits. Results, including the configured history
+DB paths, are kept in a bounded module-level cache for `ttl` seconds, so
+repeated calls during redraws are dictionary lookups. Code running inside
+the kitty process must pass `ls_data` from `boss.list_os_windows()`:
+without it `snapshot` runs `kitty @ ls`, which kitty cannot answer while
+its own event loop is blocked on the call. That call gives up after
+`LS_TIMEOUT` seconds with `KittyTimeoutError`.
+
+Errors from kitty raise `KittyError`. History problems do not raise: the
+last command is then one of the placeholders `catherd show` prints, such
+as "(no history db)".
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+from .activity import WindowActivity, lookup_last_commands
+from .atuin import get_atuin_history_db_paths
+from .kitty import KittyError, KittySnapshot, KittyWindow, run_kitty_ls
+from .registry import earlier_sessions, read_session_lineage, read_session_registry, window_sessions
+
+__all__ = [
+    "DEFAULT_TTL",
+    "LS_TIMEOUT",
+    "KittyError",
+    "WindowActivity",
+    "clear_cache",
+    "last_command",
+    "last_command_async",
+    "snapshot",
+    "snapshot_async",
+]
+
+DEFAULT_TTL = 1.0
+LS_TIMEOUT = 0.5
+MAX_CACHE_ENTRIES = 256
+
+# key -> (stored at, expires at, value) on the monotonic clock, least recently used first.
+_cache: dict[tuple, tuple[float, float, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _cached[T](key: tuple, ttl: float, compute: Callable[[], T]) -> T:
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.pop(key, None)
+        if entry is not None:
+            _cache[key] = entry  # Most recently used last, so eviction drops the least used.
+    if entry is not None and now - entry[0] < ttl:
+        return entry[2]
+    value = compute()
+    with _cache_lock:
+        _cache.pop(key, None)
+        _cache[key] = (now, now + ttl, value)
+        if len(_cache) > MAX_CACHE_ENTRIES:
+            for expired in [k for k, (_, expires, _) in _cache.items() if expires <= now]:
+                del _cache[expired]
+            while len(_cache) > MAX_CACHE_ENTRIES:
+                del _cache[next(iter(_cache))]
+    return value
+
+
+def _db_paths(db_paths: Sequence[str | Path] | None, ttl: float) -> tuple[Path, ...]:
+    # Resolving the defaults reads config.toml, so it is cached like everything else.
+    given = tuple(db_paths or ())
+    return _cached(("db_paths", given), ttl, lambda: tuple(get_atuin_history_db_paths(given, quiet=True)))
+
+
+def _windows(ls_data: list[dict[str, Any]] | None, ttl: float) -> list[KittyWindow]:
+    if ls_data is not None:
+        return KittySnapshot.from_ls(ls_data).windows
+    return _cached(("windows",), ttl, lambda: KittySnapshot.from_ls(run_kitty_ls(timeout=LS_TIMEOUT)).windows)
+
+
+def _registry(ttl: float) -> dict[str, str]:
+    return _cached(("registry",), ttl, read_session_registry)
+
+
+def _lineage(ttl: float) -> dict[str, list[str]]:
+    return _cached(("lineage",), ttl, lambda: earlier_sessions(_registry(ttl), read_session_lineage()))
+
+
+def _last_commands(sessions: Sequence[str], db_paths: tuple[Path, ...], ttl: float) -> dict[str, str]:
+    key = ("last_commands", db_paths, tuple(sorted(set(sessions))))
+    return _cached(key, ttl, lambda: lookup_last_commands(key[2], db_paths=db_paths, lineage=_lineage(ttl)))
+
+
+def snapshot(
+    *,
+    ls_data: list[dict[str, Any]] | None = None,
+    db_paths: Sequence[str | Path] | None = None,
+    ttl: float = DEFAULT_TTL,
+) -> list[WindowActivity]:
+    """
+    Return one `WindowActivity` per kitty window, as `catherd show` would list them.
+
+    Callers inside kitty must pass `ls_data`; see the module docstring.
+    """
+    paths = _db_paths(db_paths, ttl)
+    windows = _windows(ls_data, ttl)
+    sessions = window_sessions(windows, _registry(ttl))
+    commands = _last_commands([session for session in sessions.values() if session], paths, ttl)
+    return [
+        WindowActivity(
+            window_id=win.id,
+            tab=win.tab,
+            title=win.title,
+            session=sessions[win.id],
+            last_command=commands[session] if (session := sessions[win.id]) else "(no session info)",
+        )
+        for win in windows
+    ]
+
+
+def last_command(
+    window_id: str | int, *, db_paths: Sequence[str | Path] | None = None, ttl: float = DEFAULT_TTL
+) -> str | None:
+    """
+    Return the last command run in a kitty window.
+
+    `window_id` is a window of the kitty instance the caller runs in.
+    Returns None if the window has no Atuin session registered. This needs
+    no `kitty @ ls`, so it is safe to call from inside kitty.
+    """
+    window = KittyWindow(str(window_id), None, "")
+    session = window_sessions([window], _registry(ttl))[window.id]
+    if session is None:
+        return None
+    return _last_commands([session], _db_paths(db_paths, ttl), ttl)[session]
+
+
+async def snapshot_async(
+    *,
+    ls_data: list[dict[str, Any]] | None = None,
+    db_paths: Sequence[str | Path] | None = None,
+    ttl: float = DEFAULT_TTL,
+) -> list[WindowActivity]:
+    """Run `snapshot` in a worker thread."""
+    return await asyncio.to_thread(snapshot, ls_data=ls_data, db_paths=db_paths, ttl=ttl)
+
+
+async def last_command_async(
+    window_id: str | int, *, db_paths: Sequence[str | Path] | None = None, ttl: float = DEFAULT_TTL
+) -> str | None:
+    """Run `last_command` in a worker thread."""
+    return await asyncio.to_thread(last_command, window_id, db_paths=db_paths, ttl=ttl)
@@ -1,7 +1,47 @@
+import json
 import os
 import sqlite3
+import sys
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
 from pathlib import Path
 
+from .config import get_config_file, load_config
+from .deadline import TIMED_OUT, Deadline
+
+
+@dataclass(frozen=True, slots=True)
+class HistoryFilter:
+    """
+    Row filters pushed down into every history query.
+
+    `since` and `until` are Atuin timestamps (nanoseconds since the epoch).
+    A `hostname` without a `:user` suffix matches every user on that host.
+    """
+
+    hostname: str | None = None
+    since: int | None = None
+    until: int | None = None
+
+    def where(self) -> tuple[list[str], list[object]]:
+        clauses: list[str] = []
+        params: list[object] = []
+        if self.hostname:
+            if ":" in self.hostname:
+                clauses.append("hostname = ?")
+                params.append(self.hostname)
+            else:
+                escaped = self.hostname.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                clauses.append("hostname LIKE ? ESCAPE '\\'")
+                params.append(f"{escaped}:%")
+        if self.since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(self.since)
+        if self.until is not None:
+            clauses.append("timestamp < ?")
+            params.append(self.until)
+        return clauses, params
+
 
 def get_atuin_history_db_path() -> Path:
     # Atuin uses $XDG_DATA_HOME/atuin/history.db or ~/.local/share/atuin/history.db
@@ -10,34 +50,319 @@ def get_atuin_history_db_path() -> Path:
     return path / "atuin" / "history.db"
 
 
+def get_atuin_history_db_paths(paths: Sequence[str | Path] = (), *, quiet: bool = False) -> list[Path]:
+    """
+    Return the history databases to read, in priority order.
+
+    Explicit `paths` win over `history_dbs` in config.toml, which wins over
+    Atuin's default database. Duplicates are dropped. A `history_dbs` that
+    is not a list of strings is ignored with a warning unless `quiet` is set.
+    """
+    if not paths:
+        configured = load_config(quiet=quiet).get("history_dbs", [])
+        if not isinstance(configured, list) or not all(isinstance(path, str) for path in configured):
+            if not quiet:
+                print(
+                    f"[warning] Ignoring history_dbs = {configured!r} in {get_config_file()}: "
+                    "expected a list of paths.",
+                    file=sys.stderr,
+                )
+            configured = []
+        paths = configured or [get_atuin_history_db_path()]
+    resolved: list[Path] = []
+    for path in paths:
+        expanded = Path(path).expanduser()
+        if expanded not in resolved:
+            resolved.append(expanded)
+    return resolved
+
+
+def read_only_uri(path: Path) -> str:
+    return f"{path.resolve().as_uri()}?mode=ro"
+
+
+def connect_atuin_history(
+    db_paths: Sequence[Path], *, deadline: Deadline | None = None
+) -> sqlite3.Connection:
+    """
+    Open the first database read-only and ATTACH the rest to the same connection.
+
+    SQLite limits a connection to 10 attached databases by default.
+    """
+    conn = sqlite3.connect(read_only_uri(db_paths[0]), uri=True)
+    try:
+        if deadline is not None:
+            deadline.guard(conn)
+        for index, path in enumerate(db_paths[1:], start=1):
+            conn.execute(f"ATTACH DATABASE ? AS h{index}", (read_only_uri(path),))
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def history_schemas(conn: sqlite3.Connection) -> list[str]:
+    return [row[1] for row in conn.execute("PRAGMA database_list") if row[1] != "temp"]
+
+
+def history_union_sql(
+    conn: sqlite3.Connection,
+    columns: str,
+    where: Sequence[str] = (),
+    params: Sequence[object] = (),
+    history_filter: HistoryFilter | None = None,
+) -> tuple[str, list[object]]:
+    """
+    Build a `UNION ALL` over the history table of every attached database.
+
+    The WHERE clauses are repeated inside each branch so SQLite can use the
+    indexes of each file rather than filtering the combined rows.
+    """
+    filter_where, filter_params = (history_filter or HistoryFilter()).where()
+    clauses = [*where, *filter_where]
+    branch_params = [*params, *filter_params]
+    where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    branches: list[str] = []
+    all_params: list[object] = []
+    for schema in history_schemas(conn):
+        branches.append(f"SELECT {columns} FROM {schema}.history{where_sql}")  # noqa: S608
+        all_params.extend(branch_params)
+    return "\nUNION ALL\n".join(branches), all_params
+
+
+def last_command_query(
+    conn: sqlite3.Connection, session_id: str, history_filter: HistoryFilter | None = None
+) -> tuple[str, list[object]]:
+    union, params = history_union_sql(
+        conn, "command, timestamp", ["session = ?"], [session_id], history_filter
+    )
+    return f"SELECT command FROM ({union}) ORDER BY timestamp DESC LIMIT 1", params  # noqa: S608
+
+
+def last_commands_query(
+    conn: sqlite3.Connection, session_ids: Sequence[str], history_filter: HistoryFilter | None = None
+) -> tuple[str, list[object]]:
+    union, params = history_union_sql(
+        conn,
+        "session, command, timestamp",
+        ["session IN (SELECT value FROM json_each(?))"],
+        [json.dumps(list(session_ids))],
+        history_filter,
+    )
+    # SQLite takes the bare `command` column from the row holding MAX(timestamp).
+    return f"SELECT session, command, MAX(timestamp) FROM ({union}) GROUP BY session", params  # noqa: S608
+
+
+def running_commands_query(
+    conn: sqlite3.Connection, session_ids: Sequence[str], history_filter: HistoryFilter | None = None
+) -> tuple[str, list[object]]:
+    union, params = history_union_sql(
+        conn,
+        "session, command, duration, timestamp",
+        ["session IN (SELECT value FROM json_each(?))"],
+        [json.dumps(list(session_ids))],
+        history_filter,
+    )
+    # Atuin writes a row with duration -1 when a command starts and fills it in when it ends.
+    return (
+        "SELECT session, command, ts FROM ("  # noqa: S608
+        f"SELECT session, command, duration, MAX(timestamp) AS ts FROM ({union}) GROUP BY session"
+        ") WHERE duration = -1",
+        params,
+    )
+
+
+def recent_windows_query(
+    conn: sqlite3.Connection,
+    session_windows: Mapping[str, str],
+    history_filter: HistoryFilter | None = None,
+    *,
+    limit: int,
+    oldest: bool = False,
+) -> tuple[str, list[object]]:
+    sessions = json.dumps(dict(session_windows))
+    union, params = history_union_sql(
+        conn,
+        "session, command, timestamp",
+        ["session IN (SELECT key FROM json_each(?))"],
+        [sessions],
+        history_filter,
+    )
+    # One row per window: the newest command of any of its sessions. Only `limit` rows leave SQLite.
+    return (
+        f"SELECT w.value, h.command, MAX(h.timestamp) AS ts FROM ({union}) AS h "  # noqa: S608
+        "JOIN json_each(?) AS w ON w.key = h.session "
+        f"GROUP BY w.value ORDER BY ts {'ASC' if oldest else 'DESC'}, w.value LIMIT ?",
+        [*params, sessions, limit],
+    )
+
+
+def with_lineage(session_ids: Sequence[str], lineage: Mapping[str, Sequence[str]] | None) -> list[str]:
+    """Return `session_ids` followed by the earlier sessions of the same windows, each once."""
+    earlier = [old for session in session_ids for old in (lineage or {}).get(session, ())]
+    return list(dict.fromkeys([*session_ids, *earlier]))
+
+
+def newest_in_lineage(
+    found: Mapping[str, tuple[int, str]], session_id: str, lineage: Mapping[str, Sequence[str]] | None
+) -> str | None:
+    """Return the newest command of `session_id` or of an earlier session of its window."""
+    rows = [
+        found[session] for session in (session_id, *(lineage or {}).get(session_id, ())) if session in found
+    ]
+    return max(rows)[1] if rows else None
+
+
+def existing_db_paths(db_paths: Sequence[Path], *, verbose: bool = False) -> list[Path]:
+    existing: list[Path] = []
+    for path in db_paths:
+        if path.exists():
+            existing.append(path)
+        elif verbose:
+            print(f"[verbose] Atuin history DB not found at {path}")
+    return existing
+
+
 def get_last_command_for_atuin_session(
     session_id: str,
     *,
     verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
 ) -> str:
-    db_path = get_atuin_history_db_path()
-    if not db_path.exists():
-        if verbose:
-            print(f"[verbose] Atuin history DB not found at {db_path}")
+    if db_paths is None:
+        db_paths = get_atuin_history_db_paths()
+    existing = existing_db_paths(db_paths, verbose=verbose)
+    if not existing:
         return "(no history db)"
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT command
-                FROM history
-                WHERE session = ?
-                ORDER BY timestamp DESC
-                LIMIT 1;
-                """,
-                (session_id,),
-            )
-            row = cursor.fetchone()
-            if row:
-                return row[0]
-            return "(no command)"
+        conn = connect_atuin_history(existing, deadline=deadline)
+        try:
+            row = conn.execute(*last_command_query(conn, session_id, history_filter)).fetchone()
+        finally:
+            conn.close()
     except sqlite3.DatabaseError as e:
+        if deadline is not None and deadline.expired:
+            return TIMED_OUT
         if verbose:
             print(f"[verbose] SQLite error: {e}")
         return "(sqlite error)"
+    if row:
+        return row[0]
+    return "(no command)"
+
+
+def get_last_commands_for_atuin_sessions(
+    session_ids: Sequence[str],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+    lineage: Mapping[str, Sequence[str]] | None = None,
+) -> dict[str, str]:
+    """
+    Look up the last command of many sessions with one query.
+
+    Every requested session is present in the result, using the same
+    placeholders as `get_last_command_for_atuin_session` when there is no
+    command, no database, a SQLite error, or the deadline ran out.
+    `lineage` maps a session to earlier sessions of its window; their
+    commands count as the session's own.
+    """
+    unique_ids = list(dict.fromkeys(session_ids))
+    if not unique_ids:
+        return {}
+    if db_paths is None:
+        db_paths = get_atuin_history_db_paths()
+    existing = existing_db_paths(db_paths, verbose=verbose)
+    if not existing:
+        return dict.fromkeys(unique_ids, "(no history db)")
+    try:
+        conn = connect_atuin_history(existing, deadline=deadline)
+        try:
+            query = last_commands_query(conn, with_lineage(unique_ids, lineage), history_filter)
+            rows = conn.execute(*query).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        if deadline is not None and deadline.expired:
+            return dict.fromkeys(unique_ids, TIMED_OUT)
+        if verbose:
+            print(f"[verbose] SQLite error: {e}")
+        return dict.fromkeys(unique_ids, "(sqlite error)")
+    found = {session: (ts, command) for session, command, ts in rows}
+    return {session: newest_in_lineage(found, session, lineage) or "(no command)" for session in unique_ids}
+
+
+def get_recent_windows_for_atuin_sessions(
+    session_windows: Mapping[str, str],
+    *,
+    limit: int,
+    oldest: bool = False,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+) -> list[tuple[str, str, int]] | None:
+    """
+    Rank windows by the newest command of their sessions and return the top `limit`.
+
+    `session_windows` maps every session to its window. Returns `(window,
+    command, timestamp)` rows, most recent first (least recent first with
+    `oldest`), or None if the history could not be read.
+    """
+    if not session_windows:
+        return []
+    if db_paths is None:
+        db_paths = get_atuin_history_db_paths()
+    existing = existing_db_paths(db_paths, verbose=verbose)
+    if not existing:
+        return None
+    try:
+        conn = connect_atuin_history(existing, deadline=deadline)
+        try:
+            query = recent_windows_query(conn, session_windows, history_filter, limit=limit, oldest=oldest)
+            rows = conn.execute(*query).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        if verbose:
+            print(f"[verbose] SQLite error: {e}")
+        return None
+    return [(window, command, ts) for window, command, ts in rows]
+
+
+def get_running_commands_for_atuin_sessions(
+    session_ids: Sequence[str],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    history_filter: HistoryFilter | None = None,
+    deadline: Deadline | None = None,
+) -> dict[str, tuple[str, int]]:
+    """
+    Return `(command, start timestamp)` for each session whose latest command has not finished.
+
+    Sessions that are idle, unknown, or could not be looked up are left out.
+    """
+    unique_ids = list(dict.fromkeys(session_ids))
+    if not unique_ids:
+        return {}
+    if db_paths is None:
+        db_paths = get_atuin_history_db_paths()
+    existing = existing_db_paths(db_paths, verbose=verbose)
+    if not existing:
+        return {}
+    try:
+        conn = connect_atuin_history(existing, deadline=deadline)
+        try:
+            rows = conn.execute(*running_commands_query(conn, unique_ids, history_filter)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        if verbose:
+            print(f"[verbose] SQLite error: {e}")
+        return {}
+    return {session: (command, started) for session, command, started in rows}
@@ -1,13 +1,75 @@
+import base64
+import json
+import math
 import os
+import re
+import shlex
 import shutil
+import sqlite3
+import time
+from collections.abc import Sequence
+from datetime import datetime
 from pathlib import Path
+from typing import Literal, TextIO
 
 import click
 
-from .atuin import get_last_command_for_atuin_session
-from .config import get_session_file
-from .kitty import KittyWindow, get_kitty_windows
+from .activity import (
+    RunningCommand,
+    WindowActivity,
+    collect_activity,
+    collect_recent_activity,
+    collect_running,
+    format_elapsed,
+    lookup_last_commands,
+)
+from .atuin import HistoryFilter, existing_db_paths, get_atuin_history_db_paths, with_lineage
+from .completion import (
+    COMPLETION_SHELLS,
+    complete_match_option,
+    completion_script,
+    get_completion_script_path,
+)
+from .config import get_config_file, get_session_file, load_config
+from .deadline import TIMED_OUT, Deadline
+from .export import ExportFormat, export_history
+from .fileio import write_atomic
+from .hooks import HistoryEvent, HistoryTail, HookRunner, HookState, load_hooks
+from .instances import discover_kitty_sockets, get_kitty_socket_patterns, query_kitty_instances
+from .kitty import (
+    GroupBy,
+    KittyError,
+    KittySnapshot,
+    KittyWindow,
+    get_kitty_snapshot,
+    get_kitty_windows,
+    match_windows,
+    run_kitty_ls,
+)
+from .layout import get_layout_path, layout_from_snapshot, load_layout, restore_layout, save_layout
+from .metrics import MetricsState, render_metrics, session_file_names
+from .perf import human_bytes, perf_score, run_perf_checks
+from .picker import FuzzyIndex, PickEntry, Picker, run_picker
+from .proctree import PROC_ROOT, LoadSampler
+from .registry import (
+    compact_session_lineage,
+    current_instance_key,
+    earlier_sessions,
+    read_session_lineage,
+    read_session_registry,
+    registry_key,
+    resolve_registry_keys,
+    window_sessions,
+)
+from .remote import KittyRemote, KittyRemoteError, get_listen_on
+from .repos import group_windows_by_repo
+from .scrollback import DEFAULT_JOBS, grep_scrollback
+from .shared_cache import SharedCache
 from .shell import SHELL_SNIPPET_FILENAMES, get_shell_rc_path, load_snippet_for_shell
+from .timeline import TimelineRecorder, replay
+from .timings import Timings
+from .top_commands import DEFAULT_TOP, top_commands
+from .watcher import LiveKittyModel, get_kitty_conf_path, get_watcher_path
 
 
 def is_sync_active_in_this_shell() -> bool:
@@ -15,7 +77,10 @@ def is_sync_active_in_this_shell() -> bool:
     atuin_sess = os.environ.get("ATUIN_SESSION")
     if not kitty_id or not atuin_sess:
         return False
-    session_path = get_session_file(str(kitty_id))
+    session_path = get_session_file(registry_key(kitty_id, current_instance_key()))
+    if not session_path.exists():
+        # Written by an older snippet.
+        session_path = get_session_file(str(kitty_id))
     if not session_path.exists():
         return False
     content = session_path.read_text(encoding="utf-8").strip()
@@ -47,6 +112,213 @@ def get_shell_info(force_shell: str | None = None) -> str:
     return shell
 
 
+def _to_atuin_timestamp(value: datetime | None) -> int | None:
+    # Atuin stores nanoseconds since the epoch; naive datetimes are local time.
+    if value is None:
+        return None
+    return int(value.astimezone().timestamp() * 1_000_000_000)
+
+
+ShowGroupBy = GroupBy | Literal["repo"]
+ShowSort = Literal["recent", "oldest", "title"]
+
+DEFAULT_DEADLINE_MS = 5000
+TOP_WINDOW_REFRESH = 10
+RUNNING_WIDTH = 30
+
+history_db_option = click.option(
+    "--history-db",
+    "history_dbs",
+    multiple=True,
+    type=click.Path(path_type=Path),
+    help="Atuin history DB to read (repeatable; defaults to history_dbs in config.toml)",
+)
+
+
+deadline_option = click.option(
+    "--deadline",
+    "deadline_ms",
+    type=click.IntRange(min=0),
+    default=DEFAULT_DEADLINE_MS,
+    show_default=True,
+    help="Time budget in ms for kitty and Atuin calls; partial results are shown when it runs out (0: none)",
+)
+
+
+def _get_shared_kitty_snapshot(
+    ttl: float, *, verbose: bool, timings: Timings, deadline: Deadline
+) -> KittySnapshot | None:
+    cache = SharedCache("kitty_ls", ttl=ttl, timings=timings)
+    try:
+        data = cache.get("kitty @ ls", lambda: run_kitty_ls(verbose=verbose, timeout=deadline.remaining()))
+    except KittyError as exc:
+        click.echo(f"[error] {exc}", err=True)
+        return None
+    return KittySnapshot.from_ls(data)
+
+
+def _get_multi_instance_snapshot(patterns: Sequence[str], *, deadline: Deadline) -> KittySnapshot | None:
+    addresses = discover_kitty_sockets(patterns)
+    if not addresses:
+        click.echo(f"[error] No kitty sockets match {', '.join(patterns)}", err=True)
+        return None
+    snapshot, errors = query_kitty_instances(addresses, timeout=deadline.remaining())
+    for address, exc in errors.items():
+        click.echo(f"[warning] Skipping kitty at {address}: {exc}", err=True)
+    return snapshot if len(errors) < len(addresses) else None
+
+
+def _config_cache_ttl() -> float:
+    value = load_config().get("cache_ttl", 0)
+    try:
+        ttl = float(value)
+    except (TypeError, ValueError):
+        ttl = math.nan
+    if not math.isfinite(ttl) or ttl < 0:
+        click.echo(
+            f"[warning] Ignoring cache_ttl = {value!r} in {get_config_file()}: expected seconds >= 0.",
+            err=True,
+        )
+        return 0.0
+    return ttl
+
+
+def _window_groups(
+    windows: list[KittyWindow] | None, group_by: ShowGroupBy | None
+) -> list[tuple[str, list[KittyWindow]]]:
+    if not windows:
+        return []
+    if group_by == "repo":
+        return group_windows_by_repo(windows)
+    return [("", windows)]
+
+
+def _get_show_windows(
+    group_by: ShowGroupBy | None,
+    *,
+    sockets: Sequence[str],
+    cache_ttl: float,
+    verbose: bool,
+    timings: Timings,
+    deadline: Deadline,
+) -> tuple[list[KittyWindow] | None, list[tuple[str, list[KittyWindow]]]]:
+    if sockets:
+        snapshot = _get_multi_instance_snapshot(sockets, deadline=deadline)
+    elif cache_ttl > 0:
+        snapshot = _get_shared_kitty_snapshot(cache_ttl, verbose=verbose, timings=timings, deadline=deadline)
+    elif group_by in {None, "repo"}:
+        windows = get_kitty_windows(verbose=verbose, timeout=deadline.remaining())
+        return windows, _window_groups(windows, group_by)
+    else:
+        snapshot = get_kitty_snapshot(verbose=verbose, timeout=deadline.remaining())
+    if snapshot is None:
+        return None, []
+    if group_by in {None, "repo"}:
+        return snapshot.windows, _window_groups(snapshot.windows, group_by)
+    return snapshot.windows, snapshot.groups(group_by)
+
+
+def _get_activity(
+    windows: Sequence[KittyWindow],
+    *,
+    cache_ttl: float,
+    verbose: bool,
+    db_paths: Sequence[Path],
+    history_filter: HistoryFilter,
+    timings: Timings,
+    deadline: Deadline,
+) -> list[WindowActivity]:
+    if cache_ttl <= 0:
+        return collect_activity(
+            windows, verbose=verbose, db_paths=db_paths, history_filter=history_filter, deadline=deadline
+        )
+    # Only the session and last command are cached; titles come from the fresh window list.
+    key = json.dumps([
+        [str(path) for path in db_paths],
+        [history_filter.hostname, history_filter.since, history_filter.until],
+        [win.id for win in windows],
+    ])
+    cached = SharedCache("activity", ttl=cache_ttl, timings=timings).get(
+        key,
+        lambda: {
+            row.window_id: [row.session, row.last_command]
+            for row in collect_activity(
+                windows, verbose=verbose, db_paths=db_paths, history_filter=history_filter, deadline=deadline
+            )
+        },
+        # Never share results cut short by this process's deadline.
+        store=lambda value: all(command != TIMED_OUT for _, command in value.values()),
+    )
+    return [WindowActivity(win.id, win.tab, win.title, *cached[win.id]) for win in windows]
+
+
+def _get_sorted_activity(
+    windows: list[KittyWindow],
+    sort_by: ShowSort | None,
+    limit: int | None,
+    *,
+    cache_ttl: float,
+    verbose: bool,
+    db_paths: Sequence[Path],
+    history_filter: HistoryFilter,
+    timings: Timings,
+    deadline: Deadline,
+) -> tuple[list[KittyWindow], list[WindowActivity]]:
+    """Return the windows to print, in order, and their activity; history is only read for those."""
+    if sort_by in {"recent", "oldest"}:
+        rows = collect_recent_activity(
+            windows,
+            limit=limit,
+            oldest=sort_by == "oldest",
+            verbose=verbose,
+            db_paths=db_paths,
+            history_filter=history_filter,
+            deadline=deadline,
+        )
+        if rows is not None:
+            by_id = {win.id: win for win in windows}
+            return [by_id[row.window_id] for row in rows], rows
+        click.echo("[warning] Could not rank windows by their history; using Kitty's order.", err=True)
+    elif sort_by == "title":
+        windows = sorted(windows, key=lambda win: win.title.casefold())
+    windows = windows[:limit]
+    rows = _get_activity(
+        windows,
+        cache_ttl=cache_ttl,
+        verbose=verbose,
+        db_paths=db_paths,
+        history_filter=history_filter,
+        timings=timings,
+        deadline=deadline,
+    )
+    return windows, rows
+
+
+def _running_cell(running: RunningCommand | None) -> str:
+    if running is None:
+        return " " * RUNNING_WIDTH
+    elapsed = f" ({format_elapsed(running.elapsed)})"
+    command = running.command[: RUNNING_WIDTH - len(elapsed)]
+    return f"{command}{elapsed}".ljust(RUNNING_WIDTH)
+
+
+def _print_show_table(
+    groups: Sequence[tuple[str, Sequence[KittyWindow]]],
+    activity: dict[str, WindowActivity],
+    running: dict[str, RunningCommand] | None,
+) -> None:
+    running_header = "" if running is None else f"{'Running':<{RUNNING_WIDTH}} | "
+    click.echo(f"{'Kitty WinID':>10} | {'TabID':>5} | {'Title':<25} | {running_header}Last Command")
+    click.echo("-" * (80 + len(running_header)))
+    for label, group in groups:
+        if label:
+            click.secho(f"[{label}]", bold=True)
+        for win in group:
+            last_cmd = activity[win.id].last_command
+            running_cell = "" if running is None else f"{_running_cell(running.get(win.id))} | "
+            click.echo(f"{win.id:>10} | {win.tab or '':>5} | {win.title[:25]:<25} | {running_cell}{last_cmd}")
+
+
 @click.group()
 def main():
     """catherd: herd your Kitty windows and Atuin history."""
@@ -54,9 +326,85 @@ def main():
 
 @main.command()
 @click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
-def show(*, verbose: bool = False) -> None:
+@click.option(
+    "--group-by",
+    type=click.Choice(["tab", "os-window", "repo"]),
+    default=None,
+    help="Group windows under their tab, OS window, or the git repository of their cwd",
+)
+@history_db_option
+@click.option("--hostname", help="Only consider history recorded on this host (host or host:user)")
+@click.option("--since", type=click.DateTime(), help="Only consider commands run at or after this time")
+@click.option("--until", type=click.DateTime(), help="Only consider commands run before this time")
+@click.option(
+    "--cache-ttl",
+    type=float,
+    default=None,
+    help="Share results with other catherd processes for this many seconds (default: cache_ttl in "
+    "config.toml, else off)",
+)
+@click.option(
+    "--timings", "show_timings", is_flag=True, help="Print stage timings and cache counters to stderr"
+)
+@click.option(
+    "--socket",
+    "sockets",
+    multiple=True,
+    help="kitty socket or unix-socket glob to query, e.g. 'unix:/tmp/kitty-*' (repeatable; default: "
+    "kitty_sockets in config.toml)",
+)
+@click.option(
+    "--running",
+    "show_running",
+    is_flag=True,
+    help="Add a column with what each busy window is running and for how long",
+)
+@click.option(
+    "--sort",
+    "sort_by",
+    type=click.Choice(["recent", "oldest", "title"]),
+    default=None,
+    help="Order windows by their last command (most or least recent first) or by title, not Kitty's order",
+)
+@click.option("--limit", type=click.IntRange(min=1), default=None, help="Show at most this many windows")
+@deadline_option
+def show(
+    *,
+    verbose: bool = False,
+    group_by: ShowGroupBy | None = None,
+    history_dbs: tuple[Path, ...] = (),
+    hostname: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cache_ttl: float | None = None,
+    show_timings: bool = False,
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+    sockets: tuple[str, ...] = (),
+    show_running: bool = False,
+    sort_by: ShowSort | None = None,
+    limit: int | None = None,
+) -> None:
     """Show each open Kitty window/tab and its last Atuin command."""
-    windows = get_kitty_windows(verbose=verbose)
+    if group_by and (sort_by or limit):
+        click.echo("[error] --sort and --limit cannot be combined with --group-by.", err=True)
+        return
+    timings = Timings()
+    deadline = Deadline(deadline_ms or None)
+    db_paths = get_atuin_history_db_paths(history_dbs)
+    history_filter = HistoryFilter(
+        hostname=hostname, since=_to_atuin_timestamp(since), until=_to_atuin_timestamp(until)
+    )
+    if cache_ttl is None:
+        cache_ttl = _config_cache_ttl()
+    with timings.stage("kitty ls"):
+        windows, groups = _get_show_windows(
+            group_by,
+            sockets=get_kitty_socket_patterns(sockets),
+            cache_ttl=cache_ttl,
+            verbose=verbose,
+            timings=timings,
+            deadline=deadline,
+        )
     if windows is None:
         click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
         return
@@ -64,16 +412,43 @@ def show(*, verbose: bool = False) -> None:
         click.echo("[warning] No Kitty windows/tabs found. Is Kitty running?", err=True)
         return
 
-    click.echo(f"{'Kitty WinID':>10} | {'TabID':>5} | {'Title':<25} | Last Command")
-    click.echo("-" * 80)
-    for win in windows:
-        session_id = get_atuin_session_for_window(win.id, verbose=verbose)
-        last_cmd = (
-            get_last_command_for_atuin_session(session_id, verbose=verbose)
-            if session_id
-            else "(no session info)"
+    with timings.stage("history"):
+        windows, rows = _get_sorted_activity(
+            windows,
+            sort_by,
+            limit,
+            cache_ttl=cache_ttl,
+            verbose=verbose,
+            db_paths=db_paths,
+            history_filter=history_filter,
+            timings=timings,
+            deadline=deadline,
+        )
+    if sort_by or limit:
+        groups = [("", windows)]
+    activity = {row.window_id: row for row in rows}
+    running: dict[str, RunningCommand] | None = None
+    if show_running:
+        with timings.stage("running"):
+            running = collect_running(
+                windows,
+                {row.window_id: row.session for row in rows},
+                verbose=verbose,
+                db_paths=db_paths,
+                history_filter=history_filter,
+                deadline=deadline,
+            )
+    _print_show_table(groups, activity, running)
+    timed_out = sum(row.last_command == TIMED_OUT for row in rows)
+    if timed_out:
+        click.echo(
+            f"[warning] Deadline of {deadline_ms} ms reached during the history lookup; "
+            f"{timed_out} window(s) show {TIMED_OUT}.",
+            err=True,
         )
-        click.echo(f"{win.id:>10} | {win.tab or '':>5} | {win.title[:25]:<25} | {last_cmd}")
+    if show_timings:
+        for line in timings.report():
+            click.echo(line, err=True)
 
 
 @main.command("install")
@@ -91,22 +466,707 @@ def install_shell_snippet(force_shell: str | None = None) -> None:
             + "\n# end catherd atuin/kitty sync\n"
         )
 
-        if rc_path.exists():
-            contents = rc_path.read_text(encoding="utf-8")
-            if snippet_marker in contents:
-                click.secho(f"[OK] Snippet already installed in {rc_path}", fg="green")
+        if rc_path.exists() and snippet_marker in rc_path.read_text(encoding="utf-8"):
+            click.secho(f"[OK] Snippet already installed in {rc_path}", fg="green")
+        else:
+            if rc_path.exists():
+                shutil.copyfile(rc_path, rc_path.with_suffix(rc_path.suffix + ".catherd.bak"))
+            with rc_path.open("a", encoding="utf-8") as f:
+                f.write("\n\n" + snippet_block + "\n")
+            click.secho(f"[OK] Snippet added to {rc_path}", fg="green")
+            click.secho(
+                "You must restart Kitty tabs/windows or re-source your shell for the change to take effect.",
+                fg="yellow",
+            )
+    except ValueError as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+    _install_completion(shell, rc_path)
+
+
+def _install_completion(shell: str, rc_path: Path) -> None:
+    """Write the tab-completion script and, unless fish autoloads it, source it from the rc file."""
+    if shell not in COMPLETION_SHELLS:
+        click.echo(f"[warning] No tab completion for {shell}.", err=True)
+        return
+    script_path = get_completion_script_path(shell)
+    script_path.parent.mkdir(parents=True, exist_ok=True)
+    script_path.write_text(completion_script(main, shell), encoding="utf-8")
+    if shell != "fish":
+        marker = "# catherd tab completion"
+        if not rc_path.exists() or marker not in rc_path.read_text(encoding="utf-8"):
+            quoted = shlex.quote(str(script_path))
+            with rc_path.open("a", encoding="utf-8") as f:
+                f.write(f"\n{marker}\n[ -f {quoted} ] && . {quoted}\n")
+    click.secho(f"[OK] Tab completion installed in {script_path}", fg="green")
+
+
+@main.command("install-watcher")
+def install_kitty_watcher() -> None:
+    """Register catherd's window-event watcher in kitty.conf (idempotent)."""
+    conf_path = get_kitty_conf_path()
+    marker = "# catherd kitty watcher"
+    block = f"{marker}\nwatcher {get_watcher_path()}\n"
+    if conf_path.exists():
+        if marker in conf_path.read_text(encoding="utf-8"):
+            click.secho(f"[OK] Watcher already installed in {conf_path}", fg="green")
+            return
+        shutil.copyfile(conf_path, conf_path.with_suffix(conf_path.suffix + ".catherd.bak"))
+    conf_path.parent.mkdir(parents=True, exist_ok=True)
+    with conf_path.open("a", encoding="utf-8") as f:
+        f.write("\n" + block)
+    click.secho(f"[OK] Watcher added to {conf_path}", fg="green")
+    click.secho("Restart Kitty for the watcher to take effect.", fg="yellow")
+
+
+@main.command()
+@click.option("--interval", default=0.5, show_default=True, help="Seconds between event-log polls")
+@click.option("--count", type=int, default=None, help="Stop after this many polls")
+def watch(*, interval: float = 0.5, count: int | None = None) -> None:
+    """Follow window changes from the Kitty watcher's event log."""
+    model = LiveKittyModel()
+    model.refresh()
+    if model.snapshot is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    click.echo(f"[INFO] Tracking {len(model.snapshot.windows)} window(s).")
+    polls = 0
+    while count is None or polls < count:
+        time.sleep(interval)
+        polls += 1
+        resyncs = model.resyncs
+        for event in model.refresh():
+            click.echo(f"{event.kind:<6} {event.window_id or '':>6} | {event.title or ''}")
+        if model.resyncs != resyncs:
+            click.echo("[INFO] Resynced from 'kitty @ ls'.")
+
+
+@main.command()
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option("--interval", default=5.0, show_default=True, help="Seconds between samples")
+@click.option(
+    "--checkpoint-every", default=60, show_default=True, help="Write a full checkpoint every N samples"
+)
+@click.option(
+    "--keep-days", type=click.IntRange(min=1), default=None, help="Keep only this many daily timeline files"
+)
+@click.option("--count", type=int, default=None, help="Stop after this many samples")
+@history_db_option
+def record(
+    *,
+    verbose: bool = False,
+    interval: float = 5.0,
+    checkpoint_every: int = 60,
+    keep_days: int | None = None,
+    count: int | None = None,
+    history_dbs: tuple[Path, ...] = (),
+) -> None:
+    """Sample window activity into the append-only timeline."""
+    db_paths = get_atuin_history_db_paths(history_dbs)
+    recorder = TimelineRecorder(checkpoint_every=checkpoint_every, keep_days=keep_days)
+    samples = 0
+    try:
+        while count is None or samples < count:
+            if samples:
+                time.sleep(interval)
+            samples += 1
+            windows = get_kitty_windows(verbose=verbose)
+            if windows is None:
+                continue
+            rows = collect_activity(windows, verbose=verbose, db_paths=db_paths)
+            written = recorder.record(rows, int(time.time() * 1000))
+            if verbose:
+                click.echo(f"[verbose] Sample {samples}: {written} row(s) written")
+    finally:
+        recorder.close()
+
+
+@main.command("replay")
+@click.option("--at", "at", type=click.DateTime(), required=True, help="Local time to rebuild")
+def replay_timeline(*, at: datetime) -> None:
+    """Show the window activity recorded at a past time."""
+    rows = replay(int(at.astimezone().timestamp() * 1000))
+    if rows is None:
+        click.echo(f"[warning] Nothing was recorded at or before {at}.", err=True)
+        return
+    click.echo(f"{'Kitty WinID':>10} | {'TabID':>5} | {'Title':<25} | Last Command")
+    click.echo("-" * 80)
+    for row in rows:
+        click.echo(f"{row.window_id:>10} | {row.tab or '':>5} | {row.title[:25]:<25} | {row.last_command}")
+
+
+@main.command()
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option(
+    "-m",
+    "--match",
+    "specs",
+    multiple=True,
+    required=True,
+    help="Target windows: id:N, tab:N, os_window:N, pid:N, title:REGEX, cwd:REGEX (repeatable)",
+    shell_complete=complete_match_option,
+)
+@click.option("--to", help="kitty remote-control address (default: $KITTY_LISTEN_ON)")
+@click.option("--no-newline", is_flag=True, help="Type the text without pressing Enter")
+@deadline_option
+@click.argument("text")
+def send(
+    *,
+    verbose: bool = False,
+    specs: tuple[str, ...],
+    to: str | None,
+    no_newline: bool = False,
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+    text: str,
+) -> None:
+    """Send TEXT to every matching window over one remote-control connection."""
+    started = time.perf_counter()
+    deadline = Deadline(deadline_ms or None)
+    windows = get_kitty_windows(verbose=verbose, timeout=deadline.remaining())
+    if windows is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    try:
+        targets = match_windows(windows, specs)
+    except ValueError as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+    if not targets:
+        click.echo("[warning] No windows match.", err=True)
+        return
+
+    data = "base64:" + base64.b64encode((text if no_newline else text + "\r").encode()).decode()
+    requests = [("send-text", {"match": f"id:{win.id}", "data": data}) for win in targets]
+    try:
+        with KittyRemote(get_listen_on(to), deadline=deadline) as remote:
+            responses = remote.pipeline(requests)
+    except KittyRemoteError as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+
+    sent = 0
+    for win, response in zip(targets, responses, strict=True):
+        if response.get("ok"):
+            sent += 1
+            click.secho(f"[OK] {win.id:>6} | {win.title[:40]}", fg="green")
+        else:
+            click.secho(f"[FAIL] {win.id:>6} | {response.get('error', 'unknown error')}", fg="red")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    click.echo(f"[INFO] Sent to {sent}/{len(targets)} window(s) in {elapsed_ms:.1f} ms.")
+
+
+@main.command()
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option(
+    "--file",
+    "layout_file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Where to write the layout (default: layout.json in the cache dir)",
+)
+@history_db_option
+@deadline_option
+def save(
+    *,
+    verbose: bool = False,
+    layout_file: Path | None = None,
+    history_dbs: tuple[Path, ...] = (),
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+) -> None:
+    """Save the OS windows, tabs and windows with each window's cwd and last command."""
+    deadline = Deadline(deadline_ms or None)
+    snapshot = get_kitty_snapshot(verbose=verbose, timeout=deadline.remaining())
+    if snapshot is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    rows = collect_activity(
+        snapshot.windows, verbose=verbose, db_paths=get_atuin_history_db_paths(history_dbs), deadline=deadline
+    )
+    layout = layout_from_snapshot(snapshot, rows)
+    path = layout_file or get_layout_path()
+    try:
+        save_layout(layout, path)
+    except OSError as err:
+        click.secho(f"[FAIL] Could not write {path}: {err}", fg="red")
+        return
+    tabs = sum(len(os_window.tabs) for os_window in layout)
+    windows = sum(len(tab.windows) for os_window in layout for tab in os_window.tabs)
+    click.secho(f"[OK] Saved {windows} window(s) in {tabs} tab(s) to {path}.", fg="green")
+
+
+@main.command()
+@click.option(
+    "--file",
+    "layout_file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Layout to restore (default: layout.json in the cache dir)",
+)
+@click.option("--to", help="kitty remote-control address (default: $KITTY_LISTEN_ON)")
+@click.option(
+    "--prefill", is_flag=True, help="Type each window's last command at its prompt without running it"
+)
+@deadline_option
+def restore(
+    *,
+    layout_file: Path | None = None,
+    to: str | None = None,
+    prefill: bool = False,
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+) -> None:
+    """Reopen a saved layout, launching every window over one remote-control connection."""
+    started = time.perf_counter()
+    path = layout_file or get_layout_path()
+    try:
+        layout = load_layout(path)
+    except FileNotFoundError:
+        click.echo(f"[error] No saved layout at {path}; run 'catherd save' first.", err=True)
+        return
+    except (OSError, ValueError) as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+    try:
+        with KittyRemote(get_listen_on(to), deadline=Deadline(deadline_ms or None)) as remote:
+            result = restore_layout(remote, layout, prefill=prefill)
+    except KittyRemoteError as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result.failed:
+        click.echo(f"[warning] {result.failed} window(s) could not be opened: {result.error}", err=True)
+    click.secho(f"[OK] Restored {result.launched} window(s) in {elapsed_ms:.1f} ms.", fg="green")
+
+
+@main.command()
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option("-q", "--query", help="Pick the best match for QUERY without prompting")
+@click.option("--print", "print_only", is_flag=True, help="Print the chosen window ID instead of focusing it")
+@click.option("--to", help="kitty remote-control address (default: $KITTY_LISTEN_ON)")
+@history_db_option
+@deadline_option
+def pick(
+    *,
+    verbose: bool = False,
+    query: str | None = None,
+    print_only: bool = False,
+    to: str | None = None,
+    history_dbs: tuple[Path, ...] = (),
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+) -> None:
+    """Fuzzy-find a window by title, tab or last command and focus it."""
+    # Bounds listing the windows and reading their history, not the user choosing one.
+    deadline = Deadline(deadline_ms or None)
+    windows = get_kitty_windows(verbose=verbose, timeout=deadline.remaining())
+    if windows is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    rows = collect_activity(
+        windows, verbose=verbose, db_paths=get_atuin_history_db_paths(history_dbs), deadline=deadline
+    )
+    index = FuzzyIndex([PickEntry.from_activity(row) for row in rows])
+    if query is not None:
+        matches = index.search(query)
+        choice = matches[0] if matches else None
+        if choice is None:
+            click.echo("[warning] No windows match.", err=True)
+            return
+    elif not click.get_text_stream("stdin").isatty():
+        click.echo("[error] pick needs a terminal; pass --query to pick without prompting.", err=True)
+        return
+    else:
+        choice = run_picker(Picker(index))
+        if choice is None:
+            return
+
+    if print_only:
+        click.echo(choice.window_id)
+        return
+    try:
+        with KittyRemote(get_listen_on(to), deadline=Deadline(deadline_ms or None)) as remote:
+            response = remote.request("focus-window", {"match": f"id:{choice.window_id}"})
+    except KittyRemoteError as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+    if response.get("ok"):
+        click.secho(f"[OK] Focused {choice.window_id:>6} | {choice.title[:40]}", fg="green")
+    else:
+        click.secho(f"[FAIL] {choice.window_id:>6} | {response.get('error', 'unknown error')}", fg="red")
+
+
+@main.command("scrollback-grep")
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option("-i", "--ignore-case", is_flag=True, help="Match case-insensitively")
+@click.option(
+    "-m",
+    "--match",
+    "specs",
+    multiple=True,
+    help="Only search these windows: id:N, tab:N, os_window:N, pid:N, title:REGEX, cwd:REGEX (repeatable)",
+    shell_complete=complete_match_option,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=DEFAULT_JOBS,
+    show_default=True,
+    help="Windows fetched at once",
+)
+@click.option("--to", help="kitty remote-control address (default: $KITTY_LISTEN_ON)")
+@deadline_option
+@click.argument("pattern")
+def scrollback_grep(
+    *,
+    verbose: bool = False,
+    ignore_case: bool = False,
+    specs: tuple[str, ...] = (),
+    jobs: int = DEFAULT_JOBS,
+    to: str | None = None,
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+    pattern: str,
+) -> None:
+    """Search the scrollback of every window for PATTERN (a Python regex)."""
+    try:
+        regex = re.compile(pattern, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    except re.error as err:
+        click.secho(f"[FAIL] Invalid pattern: {err}", fg="red")
+        return
+    deadline = Deadline(deadline_ms or None)
+    windows = get_kitty_windows(verbose=verbose, timeout=deadline.remaining())
+    if windows is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    try:
+        address = get_listen_on(to)
+        targets = match_windows(windows, specs) if specs else windows
+    except (KittyRemoteError, ValueError) as err:
+        click.secho(f"[FAIL] {err}", fg="red")
+        return
+
+    total = matched_windows = 0
+    for result in grep_scrollback(targets, regex, address=address, jobs=jobs, deadline=deadline):
+        win = result.window
+        if result.error is not None:
+            click.echo(f"[warning] Skipping window {win.id}: {result.error}", err=True)
+            continue
+        matched_windows += bool(result.lines)
+        total += len(result.lines)
+        for line_number, line in result.lines:
+            click.echo(f"{win.id:>10} | {win.tab or '':>5} | {win.title[:25]:<25} | {line_number:>6}: {line}")
+    click.echo(f"[INFO] {total} match(es) in {matched_windows} of {len(targets)} window(s).", err=True)
+
+
+@main.command()
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option("--interval", default=2.0, show_default=True, help="Seconds between samples")
+@click.option("-n", "--count", type=int, default=None, help="Stop after this many refreshes")
+@click.option("--limit", type=int, default=None, help="Show only the busiest N windows")
+@history_db_option
+def top(
+    *,
+    verbose: bool = False,
+    interval: float = 2.0,
+    count: int | None = None,
+    limit: int | None = None,
+    history_dbs: tuple[Path, ...] = (),
+) -> None:
+    """Show the CPU and memory use of each window's processes, busiest first."""
+    if not PROC_ROOT.is_dir():
+        click.echo("[error] catherd top needs /proc (Linux).", err=True)
+        return
+    db_paths = get_atuin_history_db_paths(history_dbs)
+    sampler = LoadSampler()
+    windows: list[KittyWindow] | None = None
+    last_commands: dict[str, str] = {}
+    refreshes = 0
+    while count is None or refreshes < count:
+        # kitty and Atuin are asked again only every few samples; /proc is cheap.
+        if windows is None or refreshes % TOP_WINDOW_REFRESH == 0:
+            windows = get_kitty_windows(verbose=verbose)
+            if windows is None:
+                click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
                 return
-            shutil.copyfile(rc_path, rc_path.with_suffix(rc_path.suffix + ".catherd.bak"))
-        with rc_path.open("a", encoding="utf-8") as f:
-            f.write("\n\n" + snippet_block + "\n")
-        click.secho(f"[OK] Snippet added to {rc_path}", fg="green")
-        click.secho(
-            "You must restart Kitty tabs/windows or re-source your shell for the change to take effect.",
-            fg="yellow",
+            rows = collect_activity(windows, verbose=verbose, db_paths=db_paths)
+            last_commands = {row.window_id: row.last_command for row in rows}
+            if not refreshes:
+                sampler.sample(windows)  # Baseline for the first CPU figures.
+        time.sleep(interval)
+        loads = sampler.sample(windows)[:limit]
+        refreshes += 1
+        click.clear()
+        click.echo(
+            f"{'Kitty WinID':>10} | {'CPU%':>6} | {'RSS':>10} | {'Procs':>5} | {'Title':<25} | Last Command"
         )
+        click.echo("-" * 100)
+        for load in loads:
+            win = load.window
+            click.echo(
+                f"{win.id:>10} | {load.cpu_percent:>6.1f} | {human_bytes(load.rss_bytes):>10} | "
+                f"{load.processes:>5} | {win.title[:25]:<25} | {last_commands.get(win.id, '')}"
+            )
+
+
+@main.command("top-commands")
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option("-n", "--top", default=DEFAULT_TOP, show_default=True, help="Number of commands to list")
+@click.option(
+    "--sketch-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Count in one streaming pass that keeps at most this many commands (fixed memory, approximate)",
+)
+@history_db_option
+@click.option("--hostname", help="Only count history recorded on this host (host or host:user)")
+@click.option("--since", type=click.DateTime(), help="Only count commands run at or after this time")
+@click.option("--until", type=click.DateTime(), help="Only count commands run before this time")
+def top_commands_cmd(
+    *,
+    verbose: bool = False,
+    top: int = DEFAULT_TOP,
+    sketch_size: int | None = None,
+    history_dbs: tuple[Path, ...] = (),
+    hostname: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> None:
+    """List the commands run most often in the open windows, e.g. 'git commit' or 'make'."""
+    windows = get_kitty_windows(verbose=verbose)
+    if windows is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    registry = read_session_registry()
+    lineage = earlier_sessions(registry, read_session_lineage())
+    current = [session for session in window_sessions(windows, registry).values() if session]
+    session_ids = with_lineage(current, lineage)
+    if not session_ids:
+        click.echo("[warning] No open window has an Atuin session.", err=True)
+        return
+    db_paths = existing_db_paths(get_atuin_history_db_paths(history_dbs), verbose=verbose)
+    if not db_paths:
+        click.echo("[error] No Atuin history DB found.", err=True)
+        return
+    history_filter = HistoryFilter(
+        hostname=hostname, since=_to_atuin_timestamp(since), until=_to_atuin_timestamp(until)
+    )
+    try:
+        counts, total = top_commands(
+            session_ids, db_paths=db_paths, top=top, sketch_size=sketch_size, history_filter=history_filter
+        )
+    except sqlite3.DatabaseError as exc:
+        click.echo(f"[error] SQLite error: {exc}", err=True)
+        return
+    click.echo(f"{'Count':>8} | {'Failed':>6} | Command")
+    click.echo("-" * 40)
+    for entry in counts:
+        click.echo(f"{entry.count:>8} | {entry.failures:>6} | {entry.key}")
+    click.echo(
+        f"[INFO] {total} command(s) from {len(session_ids)} session(s) of {len(windows)} window(s).", err=True
+    )
+    if error := max((entry.error for entry in counts), default=0):
+        click.echo(f"[INFO] Counts are approximate: each may be over by up to {error}.", err=True)
+
+
+@main.command()
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True)
+@click.option("-o", "--output", type=click.File("w"), default="-", help="File to write (default: stdout)")
+@history_db_option
+@click.option("--hostname", help="Only export history recorded on this host (host or host:user)")
+@click.option("--since", type=click.DateTime(), help="Only export commands run at or after this time")
+@click.option("--until", type=click.DateTime(), help="Only export commands run before this time")
+def export(
+    *,
+    verbose: bool = False,
+    fmt: ExportFormat = "jsonl",
+    output: TextIO,
+    history_dbs: tuple[Path, ...] = (),
+    hostname: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> None:
+    """Export the Atuin history of every open window, with window and tab columns."""
+    windows = get_kitty_windows(verbose=verbose)
+    if windows is None:
+        click.echo("[error] Could not get Kitty windows. See error messages above.", err=True)
+        return
+    sessions = window_sessions(windows, read_session_registry())
+    windows_by_session = {session: win for win in windows if (session := sessions[win.id])}
+    if not windows_by_session:
+        click.echo("[warning] No open window has an Atuin session.", err=True)
+        return
+    db_paths = existing_db_paths(get_atuin_history_db_paths(history_dbs), verbose=verbose)
+    if not db_paths:
+        click.echo("[error] No Atuin history DB found.", err=True)
+        return
+    history_filter = HistoryFilter(
+        hostname=hostname, since=_to_atuin_timestamp(since), until=_to_atuin_timestamp(until)
+    )
+    try:
+        written = export_history(
+            windows_by_session, output, fmt, db_paths=db_paths, history_filter=history_filter
+        )
+    except sqlite3.DatabaseError as exc:
+        click.echo(f"[error] SQLite error: {exc}", err=True)
+        return
+    click.echo(f"[INFO] Exported {written} row(s) from {len(windows_by_session)} window(s).", err=True)
+
+
+@main.group()
+def hooks() -> None:
+    """Run commands when commands finish in kitty windows."""
+
+
+def _focused_window_key() -> str | None:
+    """Return the registry key of the focused window, as `HookRunner` compares them."""
+    windows = get_kitty_windows() or []
+    focused = next((win for win in windows if win.is_focused), None)
+    if focused is None:
+        return None
+    return resolve_registry_keys(windows, read_session_registry())[focused.id]
+
+
+def _poll_history(tails: Sequence[HistoryTail]) -> list[HistoryEvent]:
+    events: list[HistoryEvent] = []
+    for tail in tails:
+        try:
+            events.extend(tail.poll())
+        except sqlite3.DatabaseError as exc:
+            click.echo(f"[warning] Could not read {tail.db_path}: {exc}", err=True)
+            tail.close()
+    return events
+
+
+@hooks.command("run")
+@history_db_option
+@click.option("--interval", default=0.5, show_default=True, help="Seconds between checks for new history")
+@click.option("--count", type=int, default=None, help="Stop after this many checks")
+@click.option("--exec", "exec_command", help="Also run this shell command when a command finishes")
+@click.option(
+    "--min-duration", type=float, default=0.0, help="--exec only: ignore commands shorter than this (s)"
+)
+@click.option(
+    "--exit", "exit_filter", type=click.Choice(["any", "zero", "nonzero"]), default="any", help="--exec only"
+)
+@click.option("--pattern", help="--exec only: only commands matching this regex")
+@click.option("--unfocused", is_flag=True, help="--exec only: skip the window that has focus")
+@click.option("--debounce", type=float, default=0.0, help="--exec only: seconds between runs for one window")
+def hooks_run(
+    *,
+    history_dbs: tuple[Path, ...] = (),
+    interval: float = 0.5,
+    count: int | None = None,
+    exec_command: str | None = None,
+    min_duration: float = 0.0,
+    exit_filter: str = "any",
+    pattern: str | None = None,
+    unfocused: bool = False,
+    debounce: float = 0.0,
+) -> None:
+    """Follow Atuin history and run the [[hooks]] from config.toml as commands finish."""
+    entries = list(load_config().get("hooks") or [])
+    if exec_command:
+        entries.append({
+            "name": "exec",
+            "exec": exec_command,
+            "min_duration": min_duration,
+            "exit": exit_filter,
+            "pattern": pattern,
+            "unfocused": unfocused,
+            "debounce": debounce,
+        })
+    try:
+        hook_list = load_hooks(entries)
     except ValueError as err:
         click.secho(f"[FAIL] {err}", fg="red")
         return
+    if not hook_list:
+        click.echo("[error] No hooks: add [[hooks]] to config.toml or pass --exec.", err=True)
+        return
+    db_paths = existing_db_paths(get_atuin_history_db_paths(history_dbs))
+    if not db_paths:
+        click.echo("[error] No Atuin history DB found.", err=True)
+        return
+
+    state = HookState()
+    tails = [HistoryTail(path, state.source(path)) for path in db_paths]
+    runner = HookRunner(
+        hook_list,
+        sessions_to_windows=lambda: {session: key for key, session in read_session_registry().items()},
+        focused_window=_focused_window_key,
+    )
+    click.echo(f"[INFO] Watching {len(tails)} history DB(s) with {len(hook_list)} hook(s).")
+    polls = 0
+    try:
+        while count is None or polls < count:
+            if polls:
+                time.sleep(interval)
+            polls += 1
+            for firing in runner.handle(_poll_history(tails)):
+                event = firing.event
+                click.echo(
+                    f"[INFO] {firing.hook.name}: window {firing.window_id or '?'} | {event.command} "
+                    f"(exit {event.exit}, {format_elapsed(event.duration / 1e9)})"
+                )
+            state.save()
+    finally:
+        for tail in tails:
+            tail.close()
+
+
+def _update_metrics(state: MetricsState, tails: Sequence[HistoryTail], *, verbose: bool) -> str:
+    windows = get_kitty_windows(verbose=verbose)
+    registry = read_session_registry()
+    state.count(_poll_history(tails))
+    state.prune(registry.values())
+    text = render_metrics(windows, registry, session_file_names(), state.sessions)
+    state.save()
+    return text
+
+
+@main.command("metrics")
+@click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
+@history_db_option
+@click.option(
+    "--out",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="File to replace atomically, e.g. in node_exporter's textfile directory (default: stdout)",
+)
+@click.option("--interval", type=float, default=None, help="Keep rewriting --out every this many seconds")
+@click.option("--count", type=int, default=None, help="With --interval, stop after this many writes")
+def metrics(
+    *,
+    verbose: bool = False,
+    history_dbs: tuple[Path, ...] = (),
+    out: Path | None = None,
+    interval: float | None = None,
+    count: int | None = None,
+) -> None:
+    """Write window and command metrics in the OpenMetrics text format."""
+    if interval is not None and out is None:
+        click.echo("[error] --interval needs --out.", err=True)
+        return
+    state = MetricsState()
+    db_paths = existing_db_paths(get_atuin_history_db_paths(history_dbs), verbose=verbose)
+    tails = [HistoryTail(path, state.source(path)) for path in db_paths]
+    writes = 0
+    try:
+        while True:
+            text = _update_metrics(state, tails, verbose=verbose)
+            if out is None:
+                click.echo(text, nl=False)
+            else:
+                try:
+                    write_atomic(out, text)
+                except OSError as exc:
+                    click.echo(f"[error] Could not write {out}: {exc}", err=True)
+                    return
+                if verbose:
+                    click.echo(f"[verbose] Wrote {out}")
+            writes += 1
+            if interval is None or (count is not None and writes >= count):
+                break
+            time.sleep(interval)
+    finally:
+        for tail in tails:
+            tail.close()
 
 
 def print_shell_snippet(shell: str) -> None:
@@ -132,33 +1192,49 @@ def print_env_diagnostics():
 
 
 def _collect_kitty_session_diagnostics(
-    windows: list[KittyWindow], *, verbose: bool = False
+    windows: list[KittyWindow],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    deadline: Deadline | None = None,
 ) -> tuple[list, list, list, list]:
     ok = []
     missing_file = []
     corrupt_file = []
     missing_command = []
+    synced = []
+    keys = resolve_registry_keys(windows, session_file_names())
     for win in windows:
-        session_path = get_session_file(str(win.id))
-        if not session_path.exists():
+        session_path = get_session_file(key) if (key := keys[win.id]) else None
+        if session_path is None or not session_path.exists():
             missing_file.append(win)
         else:
             content = session_path.read_text(encoding="utf-8").strip()
             if not content or not content.split():
                 corrupt_file.append((win, content))
             else:
-                session_id = content.split()[0]
-                last_cmd = get_last_command_for_atuin_session(session_id, verbose=verbose)
-                if not last_cmd or last_cmd.startswith("(atuin error)"):
-                    missing_command.append((win, content, last_cmd))
-                else:
-                    ok.append((win, content, last_cmd))
+                synced.append((win, content, content.split()[0]))
+    last_commands = lookup_last_commands(
+        [session_id for _, _, session_id in synced], verbose=verbose, db_paths=db_paths, deadline=deadline
+    )
+    for win, content, session_id in synced:
+        last_cmd = last_commands.get(session_id)
+        if not last_cmd or last_cmd.startswith("(atuin error)"):
+            missing_command.append((win, content, last_cmd))
+        else:
+            ok.append((win, content, last_cmd))
     return ok, missing_file, corrupt_file, missing_command
 
 
-def print_kitty_session_diagnostics(windows: list[KittyWindow], *, verbose: bool = False) -> None:
+def print_kitty_session_diagnostics(
+    windows: list[KittyWindow],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    deadline: Deadline | None = None,
+) -> None:
     ok, missing_file, corrupt_file, missing_command = _collect_kitty_session_diagnostics(
-        windows, verbose=verbose
+        windows, verbose=verbose, db_paths=db_paths, deadline=deadline
     )
     click.secho(f"[OK] Found {len(windows)} Kitty window(s).\n", fg="green")
 
@@ -208,10 +1284,40 @@ def print_kitty_session_diagnostics(windows: list[KittyWindow], *, verbose: bool
         )
 
 
+PERF_STYLES = {"ok": ("[OK]", "green"), "warn": ("[WARN]", "yellow"), "fail": ("[FAIL]", "red")}
+
+
+def print_perf_report(db_paths: Sequence[Path], *, deadline: Deadline | None = None) -> None:
+    findings = run_perf_checks(db_paths, deadline=deadline)
+    for finding in findings:
+        label, color = PERF_STYLES[finding.status]
+        click.secho(f"{label} {finding.check}: {finding.detail}", fg=color)
+        if finding.hint:
+            click.echo(f"    -> {finding.hint}")
+    score = perf_score(findings)
+    color = "green" if score >= 90 else "yellow" if score >= 60 else "red"  # noqa: PLR2004
+    click.secho(f"[INFO] Performance score: {score}/100", fg=color)
+
+
 @main.command()
 @click.option("-v", "--verbose", is_flag=True, help="Show verbose/debug output")
-def doctor(*, verbose: bool = False) -> None:
+@click.option("--perf", is_flag=True, help="Check query plans, DB sizes and kitty/registry latency instead")
+@history_db_option
+@deadline_option
+def doctor(
+    *,
+    verbose: bool = False,
+    perf: bool = False,
+    history_dbs: tuple[Path, ...] = (),
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+) -> None:
     """Diagnose catherd/Kitty/Atuin integration issues."""
+    deadline = Deadline(deadline_ms or None)
+    if perf:
+        click.echo("=== catherd doctor --perf ===")
+        print_perf_report(get_atuin_history_db_paths(history_dbs), deadline=deadline)
+        click.secho("=== Performance check complete ===", fg="blue")
+        return
     click.echo("=== catherd doctor ===")
 
     print_env_diagnostics()
@@ -220,15 +1326,20 @@ def doctor(*, verbose: bool = False) -> None:
 
     if not is_sync_active_in_this_shell():
         print_shell_snippet(shell)
+    if compacted := compact_session_lineage():
+        click.echo(f"[INFO] Compacted {compacted} session lineage file(s).")
 
-    windows = get_kitty_windows(verbose=verbose)
+    windows = get_kitty_windows(verbose=verbose, timeout=deadline.remaining())
     if windows is None or not windows:
         click.secho(
             "[FAIL] No Kitty windows found. Is Kitty running and are there open windows/tabs?", fg="red"
         )
         return
 
-    print_kitty_session_diagnostics(windows, verbose=verbose)
+    db_paths = get_atuin_history_db_paths(history_dbs)
+    if verbose:
+        click.echo(f"[verbose] Atuin history DBs: {', '.join(map(str, db_paths))}")
+    print_kitty_session_diagnostics(windows, verbose=verbose, db_paths=db_paths, deadline=deadline)
 
     if not is_sync_active_in_this_shell():
         click.secho(
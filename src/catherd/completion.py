@@ -0,0 +1,156 @@
+"""
+Shell completion for `-m/--match`, answered from a cached window list.
+
+Completing a window needs its ID and title, and `kitty @ ls` plus
+importing the whole CLI take far longer than a TAB press should. `main`
+is the console entry point: when the shell asks for a `--match` value, it
+answers from `completion_windows.json` in the cache dir, refreshed by one
+`kitty @ ls` once it is older than `COMPLETION_TTL`, and never imports
+`catherd.cli`. Everything else, including other completions, goes to the
+click CLI.
+"""
+
+import contextlib
+import json
+import os
+import time
+from pathlib import Path
+
+import click
+from click.shell_completion import CompletionItem, get_completion_class
+
+from .config import get_xdg_cache_dir, get_xdg_config_dir
+from .fileio import write_atomic
+
+PROG_NAME = "catherd"
+COMPLETE_VAR = "_CATHERD_COMPLETE"
+COMPLETION_SHELLS = ("bash", "zsh", "fish")
+COMPLETION_TTL = 10.0
+COMPLETION_TIMEOUT = 1.0
+# Subcommands whose -m/--match takes a window spec.
+MATCH_COMMANDS = frozenset({"send", "scrollback-grep"})
+MATCH_OPTIONS = frozenset({"-m", "--match"})
+
+
+def get_completion_cache_path() -> Path:
+    return get_xdg_cache_dir() / "completion_windows.json"
+
+
+def get_completion_script_path(shell: str) -> Path:
+    """Return where `catherd install` puts the completion script; fish loads its completions dir itself."""
+    if shell == "fish":
+        xdg_config = os.environ.get("XDG_CONFIG_HOME", str(Path.home() / ".config"))
+        return Path(xdg_config) / "fish" / "completions" / f"{PROG_NAME}.fish"
+    return get_xdg_config_dir() / f"completion.{shell}"
+
+
+def read_completion_cache(path: Path, ttl: float = COMPLETION_TTL) -> list[tuple[str, str]] | None:
+    """Return the cached `(window ID, title)` pairs, or None if the cache is missing, stale or unreadable."""
+    try:
+        if time.time() - path.stat().st_mtime >= ttl:
+            return None
+        return [
+            (str(window_id), str(title)) for window_id, title in json.loads(path.read_text(encoding="utf-8"))
+        ]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def refresh_completion_cache(path: Path) -> list[tuple[str, str]]:
+    """Ask kitty for its windows and cache them; returns [] if kitty does not answer."""
+    # Imported here so that a cache hit does not pay for it.
+    from .kitty import KittyError, KittySnapshot, run_kitty_ls  # noqa: PLC0415
+
+    try:
+        windows = [
+            (win.id, win.title)
+            for win in KittySnapshot.from_ls(run_kitty_ls(timeout=COMPLETION_TIMEOUT)).windows
+        ]
+    except KittyError:
+        return []
+    with contextlib.suppress(OSError):  # The cache only saves time.
+        write_atomic(path, json.dumps(windows))
+    return windows
+
+
+def complete_windows(
+    incomplete: str, *, path: Path | None = None, ttl: float = COMPLETION_TTL
+) -> list[CompletionItem]:
+    """
+    Offer `id:N` for each window, with its title as help.
+
+    A window matches when `id:N` starts with `incomplete`, or when any
+    other text appears in its title, so `-m vim<TAB>` completes to the ID
+    of the window running vim.
+    """
+    path = path or get_completion_cache_path()
+    windows = read_completion_cache(path, ttl)
+    if windows is None:
+        windows = refresh_completion_cache(path)
+    needle = incomplete.casefold()
+    return [
+        CompletionItem(f"id:{window_id}", help=title)
+        for window_id, title in windows
+        if f"id:{window_id}".startswith(incomplete) or (needle and needle in title.casefold())
+    ]
+
+
+def complete_match_option(
+    _ctx: click.Context, _param: click.Parameter, incomplete: str
+) -> list[CompletionItem]:
+    """Click `shell_complete` callback for `-m/--match`."""
+    return complete_windows(incomplete)
+
+
+def completion_script(cli: click.Command, shell: str) -> str:
+    """Return the script that hooks `shell` up to `catherd`'s completion."""
+    comp_cls = get_completion_class(shell)
+    if comp_cls is None:
+        msg = f"No shell completion for {shell!r}"
+        raise ValueError(msg)
+    return comp_cls(cli, {}, PROG_NAME, COMPLETE_VAR).source()
+
+
+def _join_bash_colon_words(args: list[str], incomplete: str) -> tuple[list[str], str, str]:
+    """
+    Undo bash splitting `-m id:12` into `id`, `:` and `12`, as `:` is in COMP_WORDBREAKS.
+
+    Returns the args, the whole `--match` value typed so far, and the part
+    of it before the word bash will replace.
+    """
+    if incomplete == ":" and len(args) > 1 and args[-2] in MATCH_OPTIONS:
+        return args[:-1], f"{args[-1]}:", args[-1]
+    if len(args) > 2 and args[-1] == ":" and args[-3] in MATCH_OPTIONS:  # noqa: PLR2004
+        return args[:-2], f"{args[-2]}:{incomplete}", f"{args[-2]}:"
+    return args, incomplete, ""
+
+
+def _complete_from_cache() -> bool:
+    """Answer a `--match` completion request without the CLI; False if this is not one."""
+    shell, _, action = os.environ.get(COMPLETE_VAR, "").partition("_")
+    comp_cls = get_completion_class(shell) if action == "complete" else None
+    if comp_cls is None:
+        return False
+    comp = comp_cls(click.Command(PROG_NAME), {}, PROG_NAME, COMPLETE_VAR)
+    args, incomplete = comp.get_completion_args()
+    replaced_from = ""
+    if shell == "bash":
+        args, incomplete, replaced_from = _join_bash_colon_words(args, incomplete)
+    if not args or args[0] not in MATCH_COMMANDS or args[-1] not in MATCH_OPTIONS:
+        return False
+    items = [
+        CompletionItem(item.value.removeprefix(replaced_from), help=item.help)
+        for item in complete_windows(incomplete)
+        if item.value.startswith(replaced_from)
+    ]
+    click.echo("\n".join(comp.format_completion(item) for item in items))
+    return True
+
+
+def main() -> None:
+    """Console entry point."""
+    if _complete_from_cache():
+        return
+    from .cli import main as cli_main  # noqa: PLC0415
+
+    cli_main()
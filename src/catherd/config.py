@@ -1,5 +1,8 @@
 import os
+import sys
+import tomllib
 from pathlib import Path
+from typing import Any
 
 
 def get_xdg_cache_dir() -> Path:
@@ -16,3 +19,26 @@ def get_xdg_config_dir() -> Path:
 
 def get_session_file(window_id: str) -> Path:
     return get_xdg_cache_dir() / f"atuin_kitty_{window_id}"
+
+
+def get_config_file() -> Path:
+    return get_xdg_config_dir() / "config.toml"
+
+
+def load_config(*, quiet: bool = False) -> dict[str, Any]:
+    """
+    Load `config.toml` from the catherd config directory.
+
+    Returns an empty dict if the file is missing or cannot be parsed; the
+    parse error is reported on stderr unless `quiet` is set.
+    """
+    path = get_config_file()
+    if not path.exists():
+        return {}
+    try:
+        with path.open("rb") as f:
+            return tomllib.load(f)
+    except tomllib.TOMLDecodeError as exc:
+        if not quiet:
+            print(f"[warning] Ignoring invalid config file {path}: {exc}", file=sys.stderr)
+        return {}
@@ -0,0 +1,46 @@
+"""A time budget shared by every external call of one command."""
+
+import sqlite3
+import time
+
+TIMED_OUT = "(timed out)"
+
+# SQLite calls the progress handler every this many virtual-machine instructions.
+PROGRESS_STEPS = 1000
+
+
+class Deadline:
+    """
+    The time left for a command, handed to each stage that can block.
+
+    `Deadline(None)` never expires, so stages can take one unconditionally.
+    """
+
+    def __init__(self, ms: float | None) -> None:
+        self.ms = ms
+        self.expires = None if ms is None else time.monotonic() + ms / 1000
+
+    def remaining(self) -> float | None:
+        """Return the seconds left, or None for no limit."""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def guard(self, conn: sqlite3.Connection) -> None:
+        """
+        Bound lock waits with busy_timeout and interrupt queries that run past the deadline.
+
+        Raises sqlite3.OperationalError if the deadline has already passed.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return
+        if remaining <= 0:
+            msg = f"deadline of {self.ms:.0f} ms reached"
+            raise sqlite3.OperationalError(msg)
+        conn.execute(f"PRAGMA busy_timeout = {int(remaining * 1000)}")
+        conn.set_progress_handler(lambda: self.expired, PROGRESS_STEPS)
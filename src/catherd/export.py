@@ -0,0 +1,115 @@
+"""Stream the Atuin history of open windows as JSON lines or CSV."""
+
+import csv
+import json
+import sqlite3
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Literal, TextIO
+
+from .atuin import HistoryFilter, connect_atuin_history, history_union_sql
+from .kitty import KittyWindow
+
+ExportFormat = Literal["jsonl", "csv"]
+
+BATCH_SIZE = 1000
+HISTORY_COLUMNS = "session, timestamp, duration, exit, cwd, hostname, command"
+EXPORT_COLUMNS = (
+    "window_id",
+    "tab",
+    "os_window",
+    "window_title",
+    "session",
+    "time",
+    "timestamp",
+    "duration",
+    "exit",
+    "cwd",
+    "hostname",
+    "command",
+)
+
+# Window metadata arrives as one JSON object {session: [id, tab, os_window, title]}.
+# MATERIALIZED plus CROSS JOIN keeps history as the outer loop (in timestamp
+# order) and gives `w` an automatic index, instead of rescanning history per window.
+EXPORT_SQL = """
+WITH w AS MATERIALIZED (
+    SELECT
+        key AS session,
+        json_extract(value, '$[0]') AS window_id,
+        json_extract(value, '$[1]') AS tab,
+        json_extract(value, '$[2]') AS os_window,
+        json_extract(value, '$[3]') AS window_title
+    FROM json_each(?)
+)
+SELECT
+    w.window_id, w.tab, w.os_window, w.window_title, h.session,
+    strftime('%Y-%m-%dT%H:%M:%fZ', h.timestamp / 1000000 / 1e3, 'unixepoch') AS time,
+    h.timestamp, h.duration, h.exit, h.cwd, h.hostname, h.command
+FROM ({union}) AS h CROSS JOIN w ON w.session = h.session
+ORDER BY h.timestamp
+"""
+
+
+def export_query(
+    conn: sqlite3.Connection,
+    windows_by_session: Mapping[str, KittyWindow],
+    fmt: ExportFormat,
+    history_filter: HistoryFilter | None = None,
+) -> tuple[str, list[object]]:
+    """
+    Build the export query; rows come back ready to write.
+
+    For JSON lines each row is a single `json_object(...)` string, so the
+    encoding happens inside SQLite rather than per row in Python.
+    """
+    windows = {
+        session: [win.id, win.tab, win.os_window, win.title] for session, win in windows_by_session.items()
+    }
+    union, params = history_union_sql(
+        conn,
+        HISTORY_COLUMNS,
+        ["session IN (SELECT key FROM json_each(?))"],
+        [json.dumps(windows)],
+        history_filter,
+    )
+    sql = EXPORT_SQL.format(union=union)
+    if fmt == "jsonl":
+        fields = ", ".join(f"'{column}', {column}" for column in EXPORT_COLUMNS)
+        sql = f"SELECT json_object({fields}) FROM ({sql})"  # noqa: S608
+    return sql, [json.dumps(windows), *params]
+
+
+def export_history(
+    windows_by_session: Mapping[str, KittyWindow],
+    out: TextIO,
+    fmt: ExportFormat = "jsonl",
+    *,
+    db_paths: Sequence[Path],
+    history_filter: HistoryFilter | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """
+    Write every history row of the given sessions to `out`, oldest first.
+
+    Rows are fetched `batch_size` at a time and written straight out, so
+    memory does not grow with the size of the history. Returns the number
+    of rows written.
+    """
+    conn = connect_atuin_history(db_paths)
+    try:
+        cursor = conn.execute(*export_query(conn, windows_by_session, fmt, history_filter))
+        csv_writer = None
+        if fmt == "csv":
+            csv_writer = csv.writer(out)
+            csv_writer.writerow(EXPORT_COLUMNS)
+        written = 0
+        while batch := cursor.fetchmany(batch_size):
+            if csv_writer is not None:
+                csv_writer.writerows(batch)
+            else:
+                out.write("".join(f"{line}\n" for (line,) in batch))
+            written += len(batch)
+        return written
+    finally:
+        conn.close()
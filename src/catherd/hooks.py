@@ -0,0 +1,266 @@
+"""
+Run hooks when commands finish, by tailing Atuin's history table.
+
+`HistoryTail` keeps a read-only connection to each history DB and only
+queries it when `PRAGMA data_version` says another connection committed.
+New rows are read from a rowid high-water mark persisted in the cache
+directory. Atuin inserts a row with duration -1 when a command starts and
+updates it when the command ends, so unfinished rows are remembered and
+re-read by rowid until they complete.
+
+Hooks come from `[[hooks]]` tables in config.toml, e.g.
+
+    [[hooks]]
+    name = "notify"
+    exec = 'notify-send "$CATHERD_COMMAND" "exit $CATHERD_EXIT after ${CATHERD_DURATION}s"'
+    min_duration = 30
+    exit = "nonzero"
+    pattern = "^(make|cargo|pytest)"
+    unfocused = true
+    debounce = 10
+"""
+
+import json
+import os
+import re
+import sqlite3
+import subprocess  # noqa: S404
+import time
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+from .atuin import read_only_uri
+from .config import get_xdg_cache_dir
+from .fileio import write_atomic
+from .registry import split_registry_key
+
+ExitFilter = Literal["any", "zero", "nonzero"]
+
+EVENT_COLUMNS = "rowid, session, command, cwd, exit, duration, timestamp"
+MAX_PENDING = 1000
+
+
+def get_hook_state_path() -> Path:
+    return get_xdg_cache_dir() / "hooks_state.json"
+
+
+@dataclass(frozen=True, slots=True)
+class HistoryEvent:
+    """A finished command."""
+
+    rowid: int
+    session: str
+    command: str
+    cwd: str
+    exit: int
+    duration: int  # nanoseconds
+    timestamp: int
+
+
+@dataclass(frozen=True, slots=True)
+class Hook:
+    name: str
+    exec: str
+    min_duration: float = 0.0  # seconds
+    exit: ExitFilter = "any"
+    pattern: re.Pattern[str] | None = None
+    unfocused: bool = False
+    debounce: float = 0.0  # seconds between firings for the same window
+
+    @classmethod
+    def from_config(cls, entry: Mapping[str, Any], index: int = 0) -> "Hook":
+        """Build a hook from one `[[hooks]]` table; raises ValueError if it is invalid."""
+        if not entry.get("exec"):
+            msg = f"hooks[{index}] needs an 'exec' command"
+            raise ValueError(msg)
+        exit_filter = entry.get("exit", "any")
+        if exit_filter not in {"any", "zero", "nonzero"}:
+            msg = f"hooks[{index}].exit must be 'any', 'zero' or 'nonzero', not {exit_filter!r}"
+            raise ValueError(msg)
+        try:
+            pattern = re.compile(entry["pattern"]) if entry.get("pattern") else None
+        except re.error as exc:
+            msg = f"hooks[{index}].pattern is not a valid regex: {exc}"
+            raise ValueError(msg) from exc
+        return cls(
+            name=str(entry.get("name") or f"hook{index}"),
+            exec=str(entry["exec"]),
+            min_duration=float(entry.get("min_duration", 0)),
+            exit=exit_filter,
+            pattern=pattern,
+            unfocused=bool(entry.get("unfocused", False)),
+            debounce=float(entry.get("debounce", 0)),
+        )
+
+    def matches(self, event: HistoryEvent) -> bool:
+        if event.duration < self.min_duration * 1e9:
+            return False
+        if self.exit == "zero" and event.exit != 0:
+            return False
+        if self.exit == "nonzero" and event.exit == 0:
+            return False
+        return self.pattern is None or self.pattern.search(event.command) is not None
+
+
+def load_hooks(entries: Iterable[Mapping[str, Any]]) -> list[Hook]:
+    return [Hook.from_config(entry, index) for index, entry in enumerate(entries)]
+
+
+class HistoryTail:
+    """Follow the rows of one history DB that finished since the last poll."""
+
+    def __init__(self, db_path: Path, state: dict[str, Any]) -> None:
+        self.db_path = db_path
+        # Shared with the caller, which persists it: {"rowid": int, "pending": [rowid, ...]}.
+        self.state = state
+        self._conn: sqlite3.Connection | None = None
+        self._data_version: int | None = None
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(read_only_uri(self.db_path), uri=True)
+            self._data_version = None
+        return self._conn
+
+    def _changed(self, conn: sqlite3.Connection) -> bool:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def poll(self) -> list[HistoryEvent]:
+        """Return the commands that finished since the previous poll, oldest first."""
+        conn = self._connect()
+        if not self._changed(conn):
+            return []
+        newest = conn.execute("SELECT MAX(rowid) FROM history").fetchone()[0] or 0
+        mark = self.state.get("rowid")
+        if mark is None or mark > newest:
+            # First run, or the DB was replaced: start from now rather than replaying history.
+            self.state.update(rowid=newest, pending=[])
+            return []
+        pending = self.state.get("pending", [])
+        rows = conn.execute(
+            f"SELECT {EVENT_COLUMNS} FROM history "  # noqa: S608
+            "WHERE rowid > ? OR rowid IN (SELECT value FROM json_each(?)) ORDER BY rowid",
+            (mark, json.dumps(pending)),
+        ).fetchall()
+        events: list[HistoryEvent] = []
+        still_running: list[int] = []
+        for row in rows:
+            event = HistoryEvent(*row)
+            if event.duration < 0:
+                still_running.append(event.rowid)
+            else:
+                events.append(event)
+        # Not `newest`: a row committed after the MAX(rowid) query is already in `rows`.
+        self.state.update(rowid=max([mark, *(row[0] for row in rows)]), pending=still_running[-MAX_PENDING:])
+        return events
+
+
+class HookState:
+    """High-water marks of every history DB, saved atomically between polls."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_hook_state_path()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self.sources: dict[str, dict[str, Any]] = data if isinstance(data, dict) else {}
+        self._saved = json.dumps(self.sources, sort_keys=True)
+
+    def source(self, db_path: Path) -> dict[str, Any]:
+        return self.sources.setdefault(str(db_path.resolve()), {})
+
+    def save(self) -> None:
+        current = json.dumps(self.sources, sort_keys=True)
+        if current == self._saved:
+            return
+        write_atomic(self.path, current)
+        self._saved = current
+
+
+@dataclass(frozen=True, slots=True)
+class Firing:
+    hook: Hook
+    event: HistoryEvent
+    window_id: str | None
+
+
+def hook_environment(event: HistoryEvent, window_id: str | None) -> dict[str, str]:
+    return {
+        "CATHERD_WINDOW_ID": window_id or "",
+        "CATHERD_SESSION": event.session,
+        "CATHERD_COMMAND": event.command,
+        "CATHERD_CWD": event.cwd,
+        "CATHERD_EXIT": str(event.exit),
+        "CATHERD_DURATION": f"{event.duration / 1e9:.1f}",
+    }
+
+
+class HookRunner:
+    """
+    Match finished commands against hooks and start the hook commands.
+
+    `sessions_to_windows` maps Atuin sessions to registry keys and
+    `focused_window` returns the focused window's key, so windows that
+    share a kitty ID in two instances are told apart for `unfocused` and
+    `debounce`. Hook commands get the bare kitty window ID.
+    """
+
+    def __init__(
+        self,
+        hooks: Sequence[Hook],
+        *,
+        sessions_to_windows: Callable[[], Mapping[str, str]],
+        focused_window: Callable[[], str | None] = lambda: None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.hooks = list(hooks)
+        self.sessions_to_windows = sessions_to_windows
+        self.focused_window = focused_window
+        self.clock = clock
+        self._last_fired: dict[tuple[str, str | None], float] = {}
+        self._children: list[subprocess.Popen[bytes]] = []
+
+    def _debounced(self, hook: Hook, key: str | None, now: float) -> bool:
+        last = self._last_fired.get((hook.name, key))
+        return last is not None and now - last < hook.debounce
+
+    def handle(self, events: Sequence[HistoryEvent]) -> list[Firing]:
+        """Fire every matching hook; the registry and focus are read once per batch, and only if needed."""
+        self._children = [child for child in self._children if child.poll() is None]
+        matched = [(hook, event) for event in events for hook in self.hooks if hook.matches(event)]
+        if not matched:
+            return []
+        windows = self.sessions_to_windows()
+        focused = self.focused_window() if any(hook.unfocused for hook, _ in matched) else None
+        firings: list[Firing] = []
+        for hook, event in matched:
+            key = windows.get(event.session)
+            if hook.unfocused and key is not None and key == focused:
+                continue
+            now = self.clock()
+            if self._debounced(hook, key, now):
+                continue
+            self._last_fired[hook.name, key] = now
+            window_id = split_registry_key(key)[1] if key is not None else None
+            self._children.append(
+                subprocess.Popen(  # noqa: S602
+                    hook.exec,
+                    shell=True,
+                    env={**os.environ, **hook_environment(event, window_id)},
+                    stdin=subprocess.DEVNULL,
+                    start_new_session=True,
+                )
+            )
+            firings.append(Firing(hook, event, window_id))
+        return firings
@@ -0,0 +1,107 @@
+"""
+Discover and query several kitty instances at once.
+
+Sockets come from `--socket` or `kitty_sockets` in config.toml, e.g.
+`kitty_sockets = ["unix:/tmp/kitty-*", "unix:@work"]`. Unix paths may be
+globs. Every instance is asked for `ls` on its own thread, so the total
+wait is that of the slowest instance rather than the sum.
+"""
+
+import glob
+import stat
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from .config import load_config
+from .kitty import KittyError, KittySnapshot
+from .kitty_ls import decode_kitty_ls
+from .remote import KittyRemote
+
+
+def get_kitty_socket_patterns(patterns: Sequence[str] = ()) -> list[str]:
+    """Return socket patterns from `patterns`, else from `kitty_sockets` in config.toml."""
+    if patterns:
+        return list(patterns)
+    return list(load_config().get("kitty_sockets") or [])
+
+
+def _is_socket(path: str) -> bool:
+    try:
+        return stat.S_ISSOCK(Path(path).stat().st_mode)
+    except OSError:
+        return False
+
+
+def discover_kitty_sockets(patterns: Sequence[str]) -> list[str]:
+    """Expand unix-socket globs into addresses; other addresses pass through unchanged."""
+    addresses: list[str] = []
+    for pattern in patterns:
+        kind, _, target = pattern.partition(":")
+        if kind == "unix" and not target.startswith("@") and glob.has_magic(target):
+            # Path.glob cannot take absolute patterns.
+            paths = sorted(glob.glob(target))  # noqa: PTH207
+            matches = [f"unix:{path}" for path in paths if _is_socket(path)]
+        else:
+            matches = [pattern]
+        addresses.extend(address for address in matches if address not in addresses)
+    return addresses
+
+
+def instance_name(address: str) -> str:
+    """Return a short name for the instance behind `address`: its socket file name."""
+    kind, _, target = address.partition(":")
+    if kind == "unix":
+        return target.lstrip("@").rsplit("/", 1)[-1]
+    return target
+
+
+def _instance_names(addresses: Sequence[str]) -> dict[str, str]:
+    names: dict[str, str] = {}
+    for address in addresses:
+        name = instance_name(address)
+        # Same socket name in two directories: fall back to the full address.
+        names[address] = address if name in names.values() else name
+    return names
+
+
+def kitty_ls_over_socket(address: str, *, timeout: float | None = None) -> list[dict[str, Any]]:
+    """Run `ls` through the remote-control socket at `address`."""
+    with KittyRemote(address, timeout=timeout) as remote:
+        response = remote.request("ls")
+    if not response.get("ok"):
+        msg = f"kitty at {address} refused ls: {response.get('error', 'unknown error')}"
+        raise KittyError(msg)
+    data = response.get("data")
+    try:
+        return decode_kitty_ls([data.encode()]) if isinstance(data, str) else data or []
+    except ValueError as exc:
+        msg = f"Invalid ls output from kitty at {address}: {exc}"
+        raise KittyError(msg) from exc
+
+
+def query_kitty_instances(
+    addresses: Sequence[str], *, timeout: float | None = None
+) -> tuple[KittySnapshot, dict[str, KittyError]]:
+    """
+    Query every address concurrently and merge the answers.
+
+    Returns the merged snapshot, with `instance/id` window IDs, and the
+    error of each instance that could not be queried.
+    """
+    names = _instance_names(addresses)
+    results: dict[str, list[dict[str, Any]]] = {}
+    errors: dict[str, KittyError] = {}
+    if not addresses:
+        return KittySnapshot(), errors
+    with ThreadPoolExecutor(max_workers=len(addresses)) as pool:
+        futures = {
+            address: pool.submit(kitty_ls_over_socket, address, timeout=timeout) for address in addresses
+        }
+        for address, future in futures.items():
+            try:
+                results[names[address]] = future.result()
+            except KittyError as exc:
+                errors[address] = exc
+    return KittySnapshot.from_instances(results, {names[address]: address for address in addresses}), errors
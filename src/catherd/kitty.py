@@ -1,61 +1,384 @@
 """Kitty window discovery and data models."""
 
 import json
+import re
+import shlex
 import shutil
 import subprocess  # noqa: S404
 import sys
-from dataclasses import dataclass
+import tempfile
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import IO, Any, Literal
 
+from .kitty_ls import decode_kitty_ls
 
-@dataclass(frozen=True)
+GroupBy = Literal["tab", "os-window"]
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class KittyError(Exception):
+    """Raised when the Kitty window list cannot be obtained."""
+
+
+class KittyTimeoutError(KittyError):
+    """Raised when kitty does not answer before the deadline."""
+
+
+@dataclass(frozen=True, slots=True)
 class KittyWindow:
     id: str
     tab: str | None
     title: str
+    os_window: str | None = None
+    is_focused: bool = False
+    pid: int | None = None
+    cwd: str | None = None
+    instance: str | None = None
+    # Command line of the foreground process, or None while the shell itself is in the foreground.
+    foreground_command: str | None = None
+    # Remote-control address of the instance, for windows of a multi-instance snapshot.
+    address: str | None = None
+
+    @property
+    def kitty_id(self) -> str:
+        """The ID kitty itself uses, without the `instance/` prefix."""
+        return self.id.removeprefix(f"{self.instance}/") if self.instance else self.id
+
+
+@dataclass(slots=True)
+class KittyTab:
+    id: str | None
+    os_window: str | None
+    title: str
+    is_focused: bool = False
+    windows: list[KittyWindow] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class KittyOSWindow:
+    id: str | None
+    is_focused: bool = False
+    tabs: list[KittyTab] = field(default_factory=list)
+
+    @property
+    def windows(self) -> list[KittyWindow]:
+        return [win for tab in self.tabs for win in tab.windows]
+
+
+def _str_id(value: object, instance: str | None = None) -> str | None:
+    if value is None:
+        return None
+    return f"{instance}/{value}" if instance else str(value)
+
+
+def _foreground_command(window_data: Mapping[str, Any]) -> str | None:
+    shell_pid = window_data.get("pid")
+    for process in window_data.get("foreground_processes") or []:
+        if process.get("pid") != shell_pid and process.get("cmdline"):
+            return shlex.join(process["cmdline"])
+    return None
+
+
+class KittySnapshot:
+    """
+    The OS window -> tab -> window tree reported by one `kitty @ ls`.
+
+    Windows, tabs and pids are indexed by hash so lookups never scan the tree.
+    """
+
+    __slots__ = (
+        "_windows",
+        "os_windows",
+        "os_windows_by_id",
+        "tabs_by_id",
+        "windows_by_id",
+        "windows_by_pid",
+    )
+
+    def __init__(self) -> None:
+        self.os_windows: list[KittyOSWindow] = []
+        self.os_windows_by_id: dict[str, KittyOSWindow] = {}
+        self.tabs_by_id: dict[str, KittyTab] = {}
+        self.windows_by_id: dict[str, KittyWindow] = {}
+        self.windows_by_pid: dict[int, KittyWindow] = {}
+        self._windows: list[KittyWindow] | None = None
+
+    @classmethod
+    def from_ls(cls, data: list[dict[str, Any]]) -> "KittySnapshot":
+        """Build a snapshot from decoded `kitty @ ls` output in a single pass."""
+        snapshot = cls()
+        snapshot._load(data)
+        return snapshot
+
+    @classmethod
+    def from_instances(
+        cls,
+        data_by_instance: Mapping[str, list[dict[str, Any]]],
+        addresses: Mapping[str, str] | None = None,
+    ) -> "KittySnapshot":
+        """
+        Merge the `kitty @ ls` output of several kitty instances.
+
+        Window, tab and OS window IDs are qualified as `instance/id` so
+        they stay unique across instances. `addresses` maps each instance
+        to its remote-control address.
+        """
+        snapshot = cls()
+        for instance, data in data_by_instance.items():
+            snapshot._load(data, instance, (addresses or {}).get(instance))
+        return snapshot
+
+    def _load(
+        self, data: list[dict[str, Any]], instance: str | None = None, address: str | None = None
+    ) -> None:
+        for os_window_data in data:
+            os_window = self._add_os_window(
+                _str_id(os_window_data.get("id"), instance),
+                is_focused=bool(os_window_data.get("is_focused", False)),
+            )
+            for tab_data in os_window_data.get("tabs", []):
+                tab = self._add_tab(
+                    os_window,
+                    _str_id(tab_data.get("id"), instance),
+                    title=tab_data.get("title", ""),
+                    is_focused=bool(tab_data.get("is_focused", False)),
+                )
+                for window_data in tab_data.get("windows", []):
+                    self._add_window(
+                        tab,
+                        KittyWindow(
+                            id=_str_id(window_data.get("id"), instance) or "",
+                            tab=tab.id,
+                            title=window_data.get("title", tab.title),
+                            os_window=os_window.id,
+                            is_focused=bool(window_data.get("is_focused", False)),
+                            pid=window_data.get("pid"),
+                            cwd=window_data.get("cwd"),
+                            instance=instance,
+                            foreground_command=_foreground_command(window_data),
+                            address=address,
+                        ),
+                    )
+
+    @property
+    def windows(self) -> list[KittyWindow]:
+        """
+        All windows, in Kitty's tree order for windows present at build time.
+
+        The list is built once and shared until the snapshot changes, so
+        reading it repeatedly is free; callers must not mutate it.
+        """
+        if self._windows is None:
+            self._windows = list(self.windows_by_id.values())
+        return self._windows
+
+    def _add_os_window(self, os_window_id: str | None, *, is_focused: bool = False) -> KittyOSWindow:
+        os_window = KittyOSWindow(id=os_window_id, is_focused=is_focused)
+        self.os_windows.append(os_window)
+        if os_window_id is not None:
+            self.os_windows_by_id[os_window_id] = os_window
+        return os_window
 
+    def _add_tab(
+        self, os_window: KittyOSWindow, tab_id: str | None, *, title: str = "", is_focused: bool = False
+    ) -> KittyTab:
+        tab = KittyTab(id=tab_id, os_window=os_window.id, title=title, is_focused=is_focused)
+        os_window.tabs.append(tab)
+        if tab_id is not None:
+            self.tabs_by_id[tab_id] = tab
+        return tab
 
-def get_kitty_windows(*, verbose: bool = False) -> list[KittyWindow] | None:
+    def _add_window(self, tab: KittyTab, window: KittyWindow) -> None:
+        self._windows = None
+        tab.windows.append(window)
+        self.windows_by_id[window.id] = window
+        if window.pid is not None:
+            self.windows_by_pid[window.pid] = window
+
+    def upsert_window(self, window: KittyWindow) -> None:
+        """Insert or replace a window, creating its tab and OS window nodes if needed."""
+        old = self.windows_by_id.get(window.id)
+        if old is not None and old.tab == window.tab and window.tab in self.tabs_by_id:
+            tab_windows = self.tabs_by_id[window.tab].windows
+            tab_windows[tab_windows.index(old)] = window
+            self.windows_by_id[window.id] = window
+            self._windows = None
+            if old.pid is not None:
+                self.windows_by_pid.pop(old.pid, None)
+            if window.pid is not None:
+                self.windows_by_pid[window.pid] = window
+            return
+        if old is not None:
+            self.remove_window(old.id)
+        tab = self.tabs_by_id.get(window.tab) if window.tab is not None else None
+        if tab is None:
+            os_window = self.os_windows_by_id.get(window.os_window) if window.os_window is not None else None
+            if os_window is None:
+                os_window = self._add_os_window(window.os_window)
+            tab = self._add_tab(os_window, window.tab)
+        self._add_window(tab, window)
+
+    def remove_window(self, window_id: str) -> KittyWindow | None:
+        """Remove a window, pruning its tab and OS window once they are empty."""
+        window = self.windows_by_id.pop(window_id, None)
+        if window is None:
+            return None
+        self._windows = None
+        if window.pid is not None and self.windows_by_pid.get(window.pid) is window:
+            del self.windows_by_pid[window.pid]
+        tab = self.tabs_by_id.get(window.tab) if window.tab is not None else None
+        if tab is not None:
+            tab.windows.remove(window)
+            if not tab.windows:
+                del self.tabs_by_id[window.tab]
+                os_window = self.os_windows_by_id.get(tab.os_window) if tab.os_window is not None else None
+                if os_window is not None:
+                    os_window.tabs.remove(tab)
+                    if not os_window.tabs:
+                        del self.os_windows_by_id[tab.os_window]
+                        self.os_windows.remove(os_window)
+        return window
+
+    def window(self, window_id: str) -> KittyWindow | None:
+        return self.windows_by_id.get(window_id)
+
+    def tab(self, tab_id: str) -> KittyTab | None:
+        return self.tabs_by_id.get(tab_id)
+
+    def window_for_pid(self, pid: int) -> KittyWindow | None:
+        return self.windows_by_pid.get(pid)
+
+    def groups(self, group_by: GroupBy) -> list[tuple[str, list[KittyWindow]]]:
+        """Return `(label, windows)` pairs in Kitty's tree order."""
+        if group_by == "tab":
+            return [
+                (f"Tab {tab.id}: {tab.title}", tab.windows)
+                for os_window in self.os_windows
+                for tab in os_window.tabs
+            ]
+        return [(f"OS window {os_window.id}", os_window.windows) for os_window in self.os_windows]
+
+
+EXACT_MATCH_FIELDS = ("id", "tab", "os_window", "pid")
+REGEX_MATCH_FIELDS = ("title", "cwd")
+
+
+def _window_matcher(spec: str) -> Callable[[KittyWindow], bool]:
+    name, sep, value = spec.partition(":")
+    if not sep or name not in EXACT_MATCH_FIELDS + REGEX_MATCH_FIELDS:
+        name, value = "title", spec
+    if name in EXACT_MATCH_FIELDS:
+        return lambda win: str(getattr(win, name)) == value
+    try:
+        pattern = re.compile(value)
+    except re.error as exc:
+        msg = f"Invalid pattern in match {spec!r}: {exc}"
+        raise ValueError(msg) from exc
+    return lambda win: pattern.search(getattr(win, name) or "") is not None
+
+
+def match_windows(windows: Iterable[KittyWindow], specs: Sequence[str]) -> list[KittyWindow]:
+    """
+    Return the windows matching any of `specs`.
+
+    A spec is `field:value`, where id, tab, os_window and pid compare exactly
+    and title and cwd are regular expressions. Anything else is a title regex.
+
+    Raises ValueError if a pattern is not a valid regular expression.
+    """
+    matchers = [_window_matcher(spec) for spec in specs]
+    return [win for win in windows if any(matcher(win) for matcher in matchers)]
+
+
+def _read_chunks(stream: IO[bytes]) -> Iterator[bytes]:
+    while chunk := stream.read(READ_CHUNK_SIZE):
+        yield chunk
+
+
+def _decode_ls_output(
+    proc: subprocess.Popen[bytes], timeout: float | None
+) -> tuple[list[dict[str, Any]] | None, ValueError | None, bool]:
+    """Decode the output of a running `kitty @ ls`, killing it after `timeout` seconds."""
+    killed = threading.Event()
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, lambda: (killed.set(), proc.kill()))
+        timer.start()
+    data = parse_error = None
+    try:
+        data = decode_kitty_ls(_read_chunks(proc.stdout))
+    except ValueError as exc:
+        parse_error = exc
+        # Drain the rest, so kitty exits normally instead of on a broken pipe.
+        for _ in _read_chunks(proc.stdout):
+            pass
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        if timer is not None:
+            timer.cancel()
+    return data, parse_error, killed.is_set()
+
+
+def run_kitty_ls(*, verbose: bool = False, timeout: float | None = None) -> list[dict[str, Any]]:
+    """
+    Run `kitty @ ls` and return its window list, pruned to the fields catherd uses.
+
+    The output is decoded as it streams in (see `kitty_ls`), so the full
+    text and the unused fields are never held in memory.
+
+    Raises KittyError if kitty is missing, fails, or returns invalid JSON,
+    and KittyTimeoutError if it does not answer within `timeout` seconds.
+    """
     kitty_path = shutil.which("kitty")
     if not kitty_path:
-        print("[error] 'kitty' is not found in PATH.", file=sys.stderr)
-        return None
+        msg = "'kitty' is not found in PATH."
+        raise KittyError(msg)
 
     cmd = [kitty_path, "@", "ls"]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)  # noqa: S603
+        with (
+            tempfile.TemporaryFile() as stderr,
+            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr) as proc,  # noqa: S603
+        ):
+            data, parse_error, timed_out = _decode_ls_output(proc, timeout)
+            returncode = proc.returncode
+            stderr.seek(0)
+            error_output = stderr.read().decode(errors="replace")
     except (FileNotFoundError, subprocess.SubprocessError) as exc:
-        print(f"[error] Failed to run {' '.join(cmd)}: {exc}", file=sys.stderr)
-        return None
+        msg = f"Failed to run {' '.join(cmd)}: {exc}"
+        raise KittyError(msg) from exc
 
-    if result.returncode != 0:
-        print(
-            f"[error] 'kitty @ ls' failed (exit code {result.returncode}):\n{result.stderr}",
-            file=sys.stderr,
-        )
-        return None
+    if timed_out:
+        msg = f"'kitty @ ls' did not answer within {timeout:.2f} s"
+        raise KittyTimeoutError(msg)
+    if returncode != 0:
+        msg = f"'kitty @ ls' failed (exit code {returncode}):\n{error_output}"
+        raise KittyError(msg)
+    if parse_error is not None or data is None:
+        msg = f"Failed to parse output from 'kitty @ ls' as JSON: {parse_error}"
+        raise KittyError(msg) from parse_error
 
     if verbose:
-        print("[verbose] Raw output from 'kitty @ ls':")
-        print(result.stdout)
+        print("[verbose] Decoded output from 'kitty @ ls' (unused fields dropped):")
+        print(json.dumps(data, indent=2))
+    return data
+
+
+def get_kitty_snapshot(*, verbose: bool = False, timeout: float | None = None) -> KittySnapshot | None:
     try:
-        data = json.loads(result.stdout)
-    except json.JSONDecodeError as exc:
-        print(f"[error] Failed to parse output from 'kitty @ ls' as JSON: {exc}", file=sys.stderr)
+        data = run_kitty_ls(verbose=verbose, timeout=timeout)
+    except KittyError as exc:
+        print(f"[error] {exc}", file=sys.stderr)
         return None
+    return KittySnapshot.from_ls(data)
 
-    windows: list[KittyWindow] = []
-    for os_window in data:
-        for tab in os_window.get("tabs", []):
-            tab_id = tab.get("id")
-            tab_title = tab.get("title", "")
-            for window in tab.get("windows", []):
-                win_id = window.get("id")
-                win_title = window.get("title", tab_title)
-                windows.append(
-                    KittyWindow(
-                        id=str(win_id) if win_id is not None else "",
-                        tab=str(tab_id) if tab_id is not None else None,
-                        title=win_title,
-                    )
-                )
-    return windows
+
+def get_kitty_windows(*, verbose: bool = False, timeout: float | None = None) -> list[KittyWindow] | None:
+    snapshot = get_kitty_snapshot(verbose=verbose, timeout=timeout)
+    if snapshot is None:
+        return None
+    return snapshot.windows
@@ -0,0 +1,161 @@
+"""
+Incremental, pruning decoder for `kitty @ ls` output.
+
+`kitty @ ls` reports every window's environment, foreground processes and
+more, which catherd never reads. This decoder consumes the output in
+chunks and only keeps the fields listed in `LS_FIELDS`. Each value inside
+a window is decoded on its own by the C JSON scanner and dropped right
+away unless it is wanted, so neither the full text nor the full object
+graph is ever held in memory.
+"""
+
+import codecs
+import json
+import re
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+# Object kind -> {key: None to keep the whole value, or the kind of the objects in a list}.
+LS_FIELDS: dict[str, dict[str, str | None]] = {
+    "os_window": {"id": None, "is_focused": None, "tabs": "tab"},
+    "tab": {"id": None, "title": None, "is_focused": None, "windows": "window"},
+    "window": {
+        "id": None,
+        "title": None,
+        "is_focused": None,
+        "pid": None,
+        "cwd": None,
+        "foreground_processes": None,
+    },
+}
+
+SPACES = frozenset(" \t\n\r")
+DELIMITERS = SPACES | frozenset(",]}")
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+MEMBER_KEY = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"[ \t\n\r]*:', re.DOTALL)
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.consumed = 0
+        self.eof = False
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at offset {self.consumed + self.pos}")
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping what was already parsed; False at end of input."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if text := self._utf8.decode(chunk):
+                self.consumed += self.pos
+                self.buffer = self.buffer[self.pos :] + text
+                self.pos = 0
+                return True
+        self._utf8.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        if self.pos < len(self.buffer) and self.buffer[self.pos] not in SPACES:
+            return self.buffer[self.pos]
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                msg = "Unexpected end of input"
+                raise self.error(msg)
+
+    def value(self) -> Any:  # noqa: ANN401
+        """Decode the next value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                msg = "Invalid or truncated value"
+                raise self.error(msg) from None
+            # A number cut by a chunk boundary (`-1.` of `-1.5`) decodes too early,
+            # so only accept a value followed by a delimiter or the end of input.
+            if (end < len(self.buffer) and self.buffer[end] in DELIMITERS) or not self.fill():
+                self.pos = end
+                return value
+
+    def key(self) -> str:
+        self.peek()
+        while not (match := MEMBER_KEY.match(self.buffer, self.pos)):
+            if not self.fill():
+                msg = "Expected an object key"
+                raise self.error(msg)
+        self.pos = match.end()
+        raw = match.group(1)
+        return json.loads(f'"{raw}"') if "\\" in raw else raw
+
+    def _items(self, close: str, parse: Callable[[], Any]) -> Iterator[Any]:
+        if self.peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield parse()
+            char = self.peek()
+            self.pos += 1
+            if char == close:
+                return
+            if char != ",":
+                msg = f"Expected ',' or {close!r}"
+                raise self.error(msg)
+
+    def pruned_object(self, kind: str) -> dict[str, Any]:
+        if self.peek() != "{":
+            msg = f"Expected a {kind} object"
+            raise self.error(msg)
+        self.pos += 1
+        spec = LS_FIELDS[kind]
+        result: dict[str, Any] = {}
+        for key in self._items("}", self.key):
+            child = spec.get(key)
+            if child is None:
+                value = self.value()
+                if key in spec:
+                    result[key] = value
+            else:
+                result[key] = self.pruned_list(child)
+        return result
+
+    def pruned_list(self, kind: str) -> list[dict[str, Any]]:
+        if self.peek() != "[":
+            msg = f"Expected a list of {kind} objects"
+            raise self.error(msg)
+        self.pos += 1
+        return list(self._items("]", lambda: self.pruned_object(kind)))
+
+    def finish(self) -> None:
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                msg = "Unexpected data after the window list"
+                raise self.error(msg)
+            if not self.fill():
+                return
+
+
+def decode_kitty_ls(chunks: Iterable[bytes]) -> list[dict[str, Any]]:
+    """
+    Decode `kitty @ ls` output from an iterable of byte chunks, keeping only `LS_FIELDS`.
+
+    Raises ValueError if the input is not a JSON list of OS windows.
+    """
+    reader = _Reader(chunks)
+    result = reader.pruned_list("os_window")
+    reader.finish()
+    return result
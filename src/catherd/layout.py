@@ -0,0 +1,188 @@
+"""
+Save the kitty window layout and rebuild it over one remote-control connection.
+
+A layout is the OS window -> tab -> window tree with each window's cwd and
+last Atuin command. Restoring needs the ID of an existing window to place
+new tabs and windows next to, so it runs in three pipelined rounds on the
+same connection: one `launch` per OS window, then one per further tab, then
+one per further window. A 100-window layout costs three round trips
+rather than a `kitty @ launch` process per window.
+"""
+
+import base64
+import json
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .activity import WindowActivity
+from .config import get_xdg_cache_dir
+from .deadline import TIMED_OUT
+from .fileio import write_atomic
+from .kitty import KittySnapshot
+from .remote import KittyRemote, Request
+
+LAYOUT_VERSION = 1
+# What collect_activity reports instead of a command.
+NOT_A_COMMAND = frozenset({
+    "(no session info)",
+    "(no command)",
+    "(no history db)",
+    "(sqlite error)",
+    TIMED_OUT,
+})
+
+
+def get_layout_path() -> Path:
+    return get_xdg_cache_dir() / "layout.json"
+
+
+@dataclass(frozen=True, slots=True)
+class SavedWindow:
+    title: str = ""
+    cwd: str | None = None
+    last_command: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class SavedTab:
+    title: str = ""
+    windows: list[SavedWindow] = field(default_factory=list)
+
+
+@dataclass(frozen=True, slots=True)
+class SavedOSWindow:
+    tabs: list[SavedTab] = field(default_factory=list)
+
+
+@dataclass(frozen=True, slots=True)
+class RestoreResult:
+    launched: int
+    failed: int
+    # The first error kitty reported, if a launch failed.
+    error: str | None = None
+
+
+def layout_from_snapshot(snapshot: KittySnapshot, activity: Sequence[WindowActivity]) -> list[SavedOSWindow]:
+    """Return the saved form of `snapshot`, skipping OS windows and tabs without windows."""
+    commands = {row.window_id: row.last_command for row in activity if row.last_command not in NOT_A_COMMAND}
+    layout: list[SavedOSWindow] = []
+    for os_window in snapshot.os_windows:
+        tabs: list[SavedTab] = []
+        for tab in os_window.tabs:
+            windows = [SavedWindow(win.title, win.cwd, commands.get(win.id)) for win in tab.windows]
+            if windows:
+                tabs.append(SavedTab(tab.title, windows))
+        if tabs:
+            layout.append(SavedOSWindow(tabs))
+    return layout
+
+
+def save_layout(layout: Sequence[SavedOSWindow], path: Path) -> None:
+    data = {"version": LAYOUT_VERSION, "os_windows": [asdict(os_window) for os_window in layout]}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, json.dumps(data, indent=1) + "\n")
+
+
+def load_layout(path: Path) -> list[SavedOSWindow]:
+    """Read a saved layout; raises ValueError if the file is not one."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict) or data.get("version") != LAYOUT_VERSION:
+        msg = f"{path} is not a catherd layout (version {LAYOUT_VERSION})"
+        raise ValueError(msg)
+    try:
+        layout = [
+            SavedOSWindow([
+                SavedTab(tab.get("title", ""), [SavedWindow(**win) for win in tab["windows"]])
+                for tab in os_window["tabs"]
+            ])
+            for os_window in data["os_windows"]
+        ]
+    except (KeyError, TypeError, AttributeError) as exc:
+        msg = f"{path} is not a valid catherd layout: {exc}"
+        raise ValueError(msg) from exc
+    # restore_layout opens each OS window and tab with its first window.
+    if not all(os_window.tabs and all(tab.windows for tab in os_window.tabs) for os_window in layout):
+        msg = f"{path} is not a valid catherd layout: an OS window or tab has no windows"
+        raise ValueError(msg)
+    return layout
+
+
+def _launch(kind: str, window: SavedWindow, next_to: str | None = None) -> Request:
+    payload: dict[str, Any] = {"type": kind}
+    if window.cwd:
+        payload["cwd"] = window.cwd
+    if next_to is not None:
+        payload["match"] = f"window_id:{next_to}"
+    return "launch", payload
+
+
+def _launch_all(
+    remote: KittyRemote, kind: str, jobs: Sequence[tuple[SavedWindow, str | None]], errors: list[str]
+) -> list[str | None]:
+    """Launch one window per job in a single pipeline and return each new window ID, or None on failure."""
+    responses = remote.pipeline([_launch(kind, window, next_to) for window, next_to in jobs]) if jobs else []
+    ids: list[str | None] = []
+    for response in responses:
+        if response.get("ok") and response.get("data") is not None:
+            ids.append(str(response["data"]))
+        else:
+            ids.append(None)
+            errors.append(str(response.get("error") or "unknown error"))
+    return ids
+
+
+def _prefill_request(window_id: str, command: str) -> Request:
+    return "send-text", {
+        "match": f"id:{window_id}",
+        "data": "base64:" + base64.b64encode(command.encode()).decode(),
+    }
+
+
+def restore_layout(
+    remote: KittyRemote, layout: Sequence[SavedOSWindow], *, prefill: bool = False
+) -> RestoreResult:
+    """
+    Recreate `layout` in the kitty instance behind `remote`.
+
+    Tabs and windows whose OS window or tab failed to open are not
+    launched and count as failed. With `prefill`, each window's last
+    command is typed at its prompt without pressing Enter.
+    """
+    errors: list[str] = []
+    os_window_ids = _launch_all(
+        remote, "os-window", [(os_window.tabs[0].windows[0], None) for os_window in layout], errors
+    )
+    later_tabs = [
+        (tab, next_to)
+        for os_window, next_to in zip(layout, os_window_ids, strict=True)
+        if next_to is not None
+        for tab in os_window.tabs[1:]
+    ]
+    tab_ids = _launch_all(remote, "tab", [(tab.windows[0], next_to) for tab, next_to in later_tabs], errors)
+    first_windows = [
+        (os_window.tabs[0], window_id) for os_window, window_id in zip(layout, os_window_ids, strict=True)
+    ]
+    first_windows += [(tab, window_id) for (tab, _), window_id in zip(later_tabs, tab_ids, strict=True)]
+    later_windows = [
+        (window, window_id)
+        for tab, window_id in first_windows
+        if window_id is not None
+        for window in tab.windows[1:]
+    ]
+    window_ids = _launch_all(remote, "window", later_windows, errors)
+
+    launched = [(tab.windows[0], window_id) for tab, window_id in first_windows]
+    launched += [
+        (window, window_id) for (window, _), window_id in zip(later_windows, window_ids, strict=True)
+    ]
+    launched = [(window, window_id) for window, window_id in launched if window_id is not None]
+    if prefill:
+        remote.pipeline([
+            _prefill_request(window_id, window.last_command)
+            for window, window_id in launched
+            if window.last_command
+        ])
+    total = sum(len(tab.windows) for os_window in layout for tab in os_window.tabs)
+    return RestoreResult(len(launched), total - len(launched), errors[0] if errors else None)
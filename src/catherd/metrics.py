@@ -0,0 +1,171 @@
+"""
+Terminal activity in the OpenMetrics text format, for node_exporter's textfile collector.
+
+Window counts come from one `kitty @ ls` and one scan of the session
+registry. Command and failure counters are kept per Atuin session and
+advanced with the history rows that finished since the previous run (see
+`HistoryTail`), so no run recounts the history table. The output is
+written to a temporary file next to its destination and renamed over it,
+so a scrape never reads a partial file.
+"""
+
+import json
+import os
+from collections import Counter
+from collections.abc import Iterable, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from .config import get_xdg_cache_dir
+from .fileio import write_atomic
+from .hooks import HistoryEvent
+from .kitty import KittyWindow
+from .registry import SESSION_FILE_PREFIX, resolve_registry_keys
+
+SYNC_STATES = ("synced", "missing_file", "corrupt_file")
+
+
+def get_metrics_state_path() -> Path:
+    return get_xdg_cache_dir() / "metrics_state.json"
+
+
+class MetricsState:
+    """
+    History high-water marks and per-session `[commands, failures]` counters.
+
+    Sessions that no longer belong to a window are dropped, which resets
+    their counters the way a restarted exporter would.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_metrics_state_path()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        self.sources: dict[str, dict[str, Any]] = data.get("sources") or {}
+        self.sessions: dict[str, list[int]] = data.get("sessions") or {}
+        self._saved = self._dump()
+
+    def _dump(self) -> str:
+        return json.dumps({"sources": self.sources, "sessions": self.sessions}, sort_keys=True)
+
+    def source(self, db_path: Path) -> dict[str, Any]:
+        return self.sources.setdefault(str(db_path.resolve()), {})
+
+    def count(self, events: Iterable[HistoryEvent]) -> None:
+        for event in events:
+            counters = self.sessions.setdefault(event.session, [0, 0])
+            counters[0] += 1
+            if event.exit != 0:
+                counters[1] += 1
+
+    def prune(self, live_sessions: Iterable[str]) -> None:
+        live = set(live_sessions)
+        self.sessions = {session: counters for session, counters in self.sessions.items() if session in live}
+
+    def save(self) -> None:
+        current = self._dump()
+        if current == self._saved:
+            return
+        write_atomic(self.path, current)
+        self._saved = current
+
+
+def session_file_names(cache_dir: Path | None = None) -> set[str]:
+    """Return the registry keys that have a session file, empty or not."""
+    try:
+        with os.scandir(cache_dir or get_xdg_cache_dir()) as entries:
+            return {
+                entry.name.removeprefix(SESSION_FILE_PREFIX)
+                for entry in entries
+                if entry.name.startswith(SESSION_FILE_PREFIX)
+            }
+    except FileNotFoundError:
+        return set()
+
+
+def sync_state(key: str | None, registry: Mapping[str, str]) -> str:
+    """
+    Classify a window by its session file like `catherd doctor` does, without querying the history.
+
+    `key` is the window's file among all session files, from `resolve_registry_keys`.
+    """
+    if key is None:
+        return "missing_file"
+    return "synced" if key in registry else "corrupt_file"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name: str, labels: Mapping[str, str | None], value: float) -> str:
+    rendered = ",".join(f'{key}="{_escape(label or "")}"' for key, label in labels.items())
+    return f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}"
+
+
+def _family(name: str, kind: str, help_text: str, samples: Iterable[str]) -> list[str]:
+    return [f"# TYPE {name} {kind}", f"# HELP {name} {help_text}", *samples]
+
+
+def render_metrics(
+    windows: Sequence[KittyWindow] | None,
+    registry: Mapping[str, str],
+    session_files: set[str],
+    session_counters: Mapping[str, Sequence[int]],
+) -> str:
+    """Return the OpenMetrics exposition; `windows` is None when kitty did not answer."""
+    lines = _family(
+        "catherd_kitty_up",
+        "gauge",
+        "Whether kitty answered 'kitty @ ls'.",
+        [_sample("catherd_kitty_up", {}, int(windows is not None))],
+    )
+    windows = windows or []
+    per_tab = Counter((win.os_window, win.tab) for win in windows)
+    lines += _family(
+        "catherd_windows",
+        "gauge",
+        "Open kitty windows per OS window and tab.",
+        (
+            _sample("catherd_windows", {"os_window": os_window, "tab": tab}, count)
+            for (os_window, tab), count in per_tab.items()
+        ),
+    )
+    # A file written between the two directory scans is in `registry` only.
+    keys = resolve_registry_keys(windows, session_files | set(registry))
+    states = Counter(sync_state(keys[win.id], registry) for win in windows)
+    lines += _family(
+        "catherd_sync_windows",
+        "gauge",
+        "Kitty windows by Atuin session sync state.",
+        (_sample("catherd_sync_windows", {"state": state}, states[state]) for state in SYNC_STATES),
+    )
+    counted = [
+        (win, session_counters.get(session, (0, 0)))
+        for win in windows
+        if (key := keys[win.id]) and (session := registry.get(key))
+    ]
+    lines += _family(
+        "catherd_window_commands",
+        "counter",
+        "Commands finished in each kitty window.",
+        (
+            _sample("catherd_window_commands_total", {"window": win.id}, counters[0])
+            for win, counters in counted
+        ),
+    )
+    lines += _family(
+        "catherd_window_failures",
+        "counter",
+        "Commands that exited non-zero in each kitty window.",
+        (
+            _sample("catherd_window_failures_total", {"window": win.id}, counters[1])
+            for win, counters in counted
+        ),
+    )
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
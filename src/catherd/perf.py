@@ -0,0 +1,243 @@
+"""Performance diagnostics behind `catherd doctor --perf`."""
+
+import re
+import shlex
+import sqlite3
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from .atuin import connect_atuin_history, last_command_query, last_commands_query
+from .config import get_xdg_cache_dir
+from .deadline import Deadline
+from .kitty import KittyError, KittySnapshot, KittyTimeoutError, run_kitty_ls
+from .registry import (
+    SESSION_FILE_PREFIX,
+    read_session_registry,
+    resolve_registry_keys,
+    split_registry_key,
+    window_instance_key,
+)
+
+Status = Literal["ok", "warn", "fail"]
+PENALTY: dict[Status, int] = {"ok": 0, "warn": 10, "fail": 25}
+
+WAL_WARN_BYTES = 16 << 20
+FREELIST_WARN_RATIO = 0.2
+KITTY_LS_WARN_MS = 250
+KITTY_LS_FAIL_MS = 1000
+REGISTRY_SCAN_WARN_MS = 50
+
+# "SCAN history" or "SCAN main.history", with or without "USING ... INDEX".
+FULL_SCAN = re.compile(r"SCAN (?:\w+\.)?history\b")
+
+
+@dataclass(frozen=True, slots=True)
+class PerfFinding:
+    check: str
+    status: Status
+    detail: str
+    hint: str | None = None
+
+
+def perf_score(findings: Sequence[PerfFinding]) -> int:
+    return max(0, 100 - sum(PENALTY[finding.status] for finding in findings))
+
+
+def _has_session_index(conn: sqlite3.Connection) -> bool:
+    for index in conn.execute("PRAGMA index_list(history)").fetchall():
+        columns = [row[2] for row in conn.execute(f"PRAGMA index_info({index[1]!r})")]
+        if columns[:1] == ["session"]:
+            return True
+    return False
+
+
+def _timed_out(check: str, deadline: Deadline | None) -> PerfFinding:
+    budget = f"{deadline.ms:.0f} ms" if deadline is not None and deadline.ms is not None else "the deadline"
+    return PerfFinding(check, "fail", f"timed out: check did not finish within {budget}", "Raise --deadline.")
+
+
+def check_query_plans(db_path: Path, *, deadline: Deadline | None = None) -> list[PerfFinding]:
+    """Run EXPLAIN QUERY PLAN on catherd's history lookups and flag full scans."""
+    findings: list[PerfFinding] = []
+    conn = connect_atuin_history([db_path], deadline=deadline)
+    try:
+        queries = {
+            "last command": last_command_query(conn, "session"),
+            "batched last commands": last_commands_query(conn, ["session-a", "session-b"]),
+        }
+        for name, (sql, params) in queries.items():
+            details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            plan = "; ".join(details)
+            if any(FULL_SCAN.match(detail) for detail in details):
+                findings.append(
+                    PerfFinding(
+                        f"plan: {name} ({db_path.name})",
+                        "fail",
+                        f"full scan of history: {plan}",
+                        "This Atuin schema has no (session, timestamp) index; upgrade Atuin or rely on "
+                        "catherd's session index (used unless --hostname/--since/--until is given).",
+                    )
+                )
+            elif any("TEMP B-TREE" in detail for detail in details):
+                findings.append(
+                    PerfFinding(
+                        f"plan: {name} ({db_path.name})",
+                        "warn",
+                        f"sorts in a temp b-tree: {plan}",
+                        "An index on history(session, timestamp) lets SQLite skip the sort.",
+                    )
+                )
+            else:
+                findings.append(PerfFinding(f"plan: {name} ({db_path.name})", "ok", plan))
+        if not _has_session_index(conn):
+            findings.append(
+                PerfFinding(
+                    f"indexes ({db_path.name})",
+                    "warn",
+                    "no index on history starting with `session`",
+                    "Lookups need catherd's session index; avoid filters that bypass it on large histories.",
+                )
+            )
+    finally:
+        conn.close()
+    return findings
+
+
+def human_bytes(size: int) -> str:
+    if size < 1 << 10:
+        return f"{size} B"
+    if size < 1 << 20:
+        return f"{size / (1 << 10):.1f} KiB"
+    if size < 1 << 30:
+        return f"{size / (1 << 20):.1f} MiB"
+    return f"{size / (1 << 30):.1f} GiB"
+
+
+def check_storage(db_path: Path, *, deadline: Deadline | None = None) -> list[PerfFinding]:
+    """Report database, WAL and page sizes, flagging a large WAL or free list."""
+    findings: list[PerfFinding] = []
+    wal_path = db_path.with_name(db_path.name + "-wal")
+    db_size = db_path.stat().st_size
+    wal_size = wal_path.stat().st_size if wal_path.exists() else 0
+    conn = connect_atuin_history([db_path], deadline=deadline)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+    findings.append(
+        PerfFinding(
+            f"storage ({db_path.name})",
+            "ok",
+            f"db {human_bytes(db_size)}, wal {human_bytes(wal_size)}, page size {page_size} B",
+        )
+    )
+    if wal_size > WAL_WARN_BYTES:
+        findings.append(
+            PerfFinding(
+                f"wal ({db_path.name})",
+                "warn",
+                f"write-ahead log is {human_bytes(wal_size)}",
+                f"Checkpoint it while Atuin is idle: sqlite3 {db_path} 'PRAGMA wal_checkpoint(TRUNCATE)'",
+            )
+        )
+    if page_count and freelist / page_count > FREELIST_WARN_RATIO:
+        findings.append(
+            PerfFinding(
+                f"free pages ({db_path.name})",
+                "warn",
+                f"{freelist}/{page_count} pages are free",
+                f"Reclaim space while Atuin is idle: sqlite3 {db_path} VACUUM",
+            )
+        )
+    return findings
+
+
+def check_kitty_ls(*, deadline: Deadline | None = None) -> tuple[list[PerfFinding], KittySnapshot | None]:
+    """Time one `kitty @ ls` round trip."""
+    started = time.perf_counter()
+    try:
+        data = run_kitty_ls(timeout=deadline.remaining() if deadline is not None else None)
+    except KittyTimeoutError:
+        return [_timed_out("kitty @ ls", deadline)], None
+    except KittyError as exc:
+        return [
+            PerfFinding("kitty @ ls", "fail", str(exc), "Make sure kitty is running with remote control.")
+        ], None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    snapshot = KittySnapshot.from_ls(data)
+    detail = f"{elapsed_ms:.0f} ms for {len(snapshot.windows)} window(s)"
+    if elapsed_ms > KITTY_LS_FAIL_MS:
+        status: Status = "fail"
+    elif elapsed_ms > KITTY_LS_WARN_MS:
+        status = "warn"
+    else:
+        status = "ok"
+    hint = None if status == "ok" else "Install the watcher (catherd install-watcher) to avoid re-listing."
+    return [PerfFinding("kitty @ ls", status, detail, hint)], snapshot
+
+
+def check_registry(snapshot: KittySnapshot | None) -> list[PerfFinding]:
+    """
+    Time the session-registry scan and count files for windows that no longer exist.
+
+    Only files of the instances in `snapshot`, and bare-ID files from older
+    snippets, are checked; other kitty instances may still be running.
+    """
+    started = time.perf_counter()
+    registry = read_session_registry()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    findings = [
+        PerfFinding(
+            "session registry scan",
+            "warn" if elapsed_ms > REGISTRY_SCAN_WARN_MS else "ok",
+            f"{elapsed_ms:.1f} ms for {len(registry)} session file(s)",
+        )
+    ]
+    if snapshot is not None:
+        used = set(resolve_registry_keys(snapshot.windows, registry).values())
+        instances = {None, *map(window_instance_key, snapshot.windows)}
+        stale = sorted(key for key in registry if key not in used and split_registry_key(key)[0] in instances)
+        if stale:
+            # One plain `rm` per file: brace expansion is not in every shell (fish, csh).
+            commands = "".join(
+                f"\n         rm {shlex.quote(str(get_xdg_cache_dir() / f'{SESSION_FILE_PREFIX}{key}'))}"
+                for key in stale
+            )
+            findings.append(
+                PerfFinding(
+                    "stale session files",
+                    "warn",
+                    f"{len(stale)} file(s) for closed windows",
+                    f"Remove {'them' if len(stale) > 1 else 'it'}:{commands}",
+                )
+            )
+        else:
+            findings.append(PerfFinding("stale session files", "ok", "none"))
+    return findings
+
+
+def run_perf_checks(db_paths: Sequence[Path], *, deadline: Deadline | None = None) -> list[PerfFinding]:
+    """Run every check under one `deadline`, reporting checks it cut short as timed out."""
+    findings: list[PerfFinding] = []
+    for db_path in db_paths:
+        check = f"history db ({db_path.name})"
+        if not db_path.exists():
+            findings.append(PerfFinding(check, "fail", f"not found at {db_path}"))
+            continue
+        try:
+            findings.extend(check_storage(db_path, deadline=deadline))
+            findings.extend(check_query_plans(db_path, deadline=deadline))
+        except sqlite3.DatabaseError as exc:
+            if deadline is not None and deadline.expired:
+                findings.append(_timed_out(check, deadline))
+            else:
+                findings.append(PerfFinding(check, "fail", f"SQLite error: {exc}"))
+    kitty_findings, snapshot = check_kitty_ls(deadline=deadline)
+    findings.extend(kitty_findings)
+    findings.extend(check_registry(snapshot))
+    return findings
@@ -0,0 +1,157 @@
+"""
+Fuzzy window picker behind `catherd pick`.
+
+Extending the query can only shrink the set of matches, so each keystroke
+re-scores just the candidates that matched the previous query. Earlier
+candidate sets are kept on a stack so backspace is free too.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import click
+
+from .activity import WindowActivity
+
+WORD_SEPARATORS = frozenset(" /-_.:@")
+MATCH_SCORE = 1
+CONSECUTIVE_BONUS = 10
+BOUNDARY_BONUS = 8
+
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+KEY_ENTER = ("\r", "\n")
+KEY_BACKSPACE = ("\x7f", "\x08")
+KEY_CANCEL = ("\x1b", "\x03", "\x07")
+KEY_UP = ("\x1b[A", "\x10")
+KEY_DOWN = ("\x1b[B", "\x0e")
+
+
+@dataclass(frozen=True, slots=True)
+class PickEntry:
+    window_id: str
+    tab: str | None
+    title: str
+    last_command: str
+    haystack: str
+
+    @classmethod
+    def from_activity(cls, row: WindowActivity) -> "PickEntry":
+        haystack = f"{row.title} {row.tab or ''} {row.last_command}".lower()
+        return cls(row.window_id, row.tab, row.title, row.last_command, haystack)
+
+
+def fuzzy_score(query: str, text: str) -> int | None:
+    """
+    Score `query` as a subsequence of `text`, or return None if it is not one.
+
+    Both must already be lowercase. Consecutive characters and characters
+    at the start of a word score higher.
+    """
+    score = 0
+    position = 0
+    previous = -2
+    for char in query:
+        found = text.find(char, position)
+        if found == -1:
+            return None
+        score += MATCH_SCORE
+        if found == previous + 1:
+            score += CONSECUTIVE_BONUS
+        if found == 0 or text[found - 1] in WORD_SEPARATORS:
+            score += BOUNDARY_BONUS
+        previous = found
+        position = found + 1
+    return score
+
+
+class FuzzyIndex:
+    """Ranked fuzzy search over pick entries, incremental as the query grows."""
+
+    def __init__(self, entries: Sequence[PickEntry]) -> None:
+        self.entries = list(entries)
+        # (query, matching entry indexes) for each query prefix typed so far.
+        self._stack: list[tuple[str, list[int]]] = [("", list(range(len(self.entries))))]
+        self.scored = 0
+
+    def search(self, query: str) -> list[PickEntry]:
+        query = query.lower()
+        while not query.startswith(self._stack[-1][0]):
+            self._stack.pop()
+        base_query, candidates = self._stack[-1]
+        if query == base_query:
+            if not query:
+                return list(self.entries)
+            return self._rank(query, candidates)
+        ranked: list[tuple[int, int]] = []
+        for index in candidates:
+            self.scored += 1
+            score = fuzzy_score(query, self.entries[index].haystack)
+            if score is not None:
+                ranked.append((score, index))
+        self._stack.append((query, [index for _, index in ranked]))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [self.entries[index] for _, index in ranked]
+
+    def _rank(self, query: str, candidates: list[int]) -> list[PickEntry]:
+        ranked = sorted(
+            candidates, key=lambda index: (-(fuzzy_score(query, self.entries[index].haystack) or 0), index)
+        )
+        return [self.entries[index] for index in ranked]
+
+
+class Picker:
+    """Query, selection and key handling of the interactive picker."""
+
+    def __init__(self, index: FuzzyIndex, *, query: str = "") -> None:
+        self.index = index
+        self.query = query
+        self.selected = 0
+        self.matches = index.search(query)
+
+    def handle_key(self, key: str) -> str | None:
+        """Apply one key press; return "select" or "cancel" when the picker is done."""
+        if key in KEY_ENTER:
+            return "select" if self.matches else None
+        if key in KEY_CANCEL:
+            return "cancel"
+        if key in KEY_UP:
+            self.selected = max(0, self.selected - 1)
+        elif key in KEY_DOWN:
+            self.selected = min(max(0, len(self.matches) - 1), self.selected + 1)
+        elif key in KEY_BACKSPACE:
+            self._set_query(self.query[:-1])
+        elif key.isprintable():
+            self._set_query(self.query + key)
+        return None
+
+    def _set_query(self, query: str) -> None:
+        self.query = query
+        self.matches = self.index.search(query)
+        self.selected = 0
+
+    @property
+    def choice(self) -> PickEntry | None:
+        return self.matches[self.selected] if self.matches else None
+
+    def render(self, height: int) -> str:
+        lines = [f"> {self.query}", f"  {len(self.matches)}/{len(self.index.entries)}"]
+        top = max(0, self.selected - height + 1)
+        for offset, entry in enumerate(self.matches[top : top + height], start=top):
+            marker = ">" if offset == self.selected else " "
+            lines.append(f"{marker} {entry.window_id:>6} | {entry.title[:30]:<30} | {entry.last_command}")
+        return "\n".join(lines)
+
+
+def run_picker(picker: Picker, *, height: int = 15) -> PickEntry | None:
+    """Drive `picker` from the terminal until a window is chosen or the user cancels."""
+    while True:
+        click.echo(CLEAR_SCREEN + picker.render(height), err=True)
+        try:
+            key = click.getchar()
+        except (KeyboardInterrupt, EOFError):
+            return None
+        action = picker.handle_key(key)
+        if action == "select":
+            return picker.choice
+        if action == "cancel":
+            return None
@@ -0,0 +1,125 @@
+"""
+Per-window CPU and memory use from one pass over `/proc`.
+
+Each sample reads every `/proc/<pid>/stat` once, indexes the process tree
+by parent pid, and sums the processes below each window's shell. CPU use
+is the difference in tick counters between two samples, so nothing is
+polled per window and a refresh costs one directory scan.
+"""
+
+import os
+import time
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from .kitty import KittyWindow
+
+PROC_ROOT = Path("/proc")
+
+
+@dataclass(frozen=True, slots=True)
+class ProcStat:
+    pid: int
+    ppid: int
+    start: int  # Start time in ticks since boot; tells a reused pid apart.
+    ticks: int  # User plus system CPU time.
+    rss_pages: int
+
+
+@dataclass(frozen=True, slots=True)
+class WindowLoad:
+    window: KittyWindow
+    cpu_percent: float
+    rss_bytes: int
+    processes: int
+
+
+def parse_stat(text: str) -> ProcStat:
+    """Parse one `/proc/<pid>/stat` line; the command name may contain spaces and parentheses."""
+    head, _, tail = text.rpartition(")")
+    fields = tail.split()
+    # fields[0] is field 3 (state) of proc(5).
+    return ProcStat(
+        pid=int(head.split(" (", 1)[0]),
+        ppid=int(fields[1]),
+        start=int(fields[19]),
+        ticks=int(fields[11]) + int(fields[12]),
+        rss_pages=int(fields[21]),
+    )
+
+
+def read_proc_stats(proc_root: Path = PROC_ROOT) -> dict[int, ProcStat]:
+    """Read the stat line of every process; processes that exit meanwhile are skipped."""
+    stats: dict[int, ProcStat] = {}
+    with os.scandir(proc_root) as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                stat = parse_stat(Path(entry.path, "stat").read_text(encoding="utf-8", errors="replace"))
+            except (OSError, ValueError, IndexError):
+                continue
+            stats[stat.pid] = stat
+    return stats
+
+
+def build_children(stats: Mapping[int, ProcStat]) -> dict[int, list[int]]:
+    children: dict[int, list[int]] = {}
+    for stat in stats.values():
+        children.setdefault(stat.ppid, []).append(stat.pid)
+    return children
+
+
+def descendants(pid: int, children: Mapping[int, list[int]]) -> Iterator[int]:
+    """Yield `pid` and every process below it."""
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(children.get(current, ()))
+
+
+class LoadSampler:
+    """Turn successive `/proc` passes into per-window CPU percentages."""
+
+    def __init__(
+        self,
+        proc_root: Path = PROC_ROOT,
+        *,
+        ticks_per_second: int | None = None,
+        page_size: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.proc_root = proc_root
+        self.ticks_per_second = ticks_per_second or os.sysconf("SC_CLK_TCK")
+        self.page_size = page_size or os.sysconf("SC_PAGE_SIZE")
+        self.clock = clock
+        self._previous_ticks: dict[tuple[int, int], int] = {}
+        self._previous_time: float | None = None
+
+    def sample(self, windows: Sequence[KittyWindow]) -> list[WindowLoad]:
+        """
+        Return the load of each window, busiest first.
+
+        CPU is averaged since the previous sample, so the first sample
+        reports 0%. A process started since then counts all its ticks.
+        """
+        stats = read_proc_stats(self.proc_root)
+        now = self.clock()
+        elapsed = now - self._previous_time if self._previous_time is not None else 0.0
+        children = build_children(stats)
+        loads: list[WindowLoad] = []
+        for win in windows:
+            ticks = rss_pages = processes = 0
+            if win.pid is not None and win.pid in stats:
+                for pid in descendants(win.pid, children):
+                    stat = stats[pid]
+                    ticks += stat.ticks - self._previous_ticks.get((pid, stat.start), 0)
+                    rss_pages += stat.rss_pages
+                    processes += 1
+            cpu = 100 * ticks / self.ticks_per_second / elapsed if elapsed > 0 else 0.0
+            loads.append(WindowLoad(win, cpu, rss_pages * self.page_size, processes))
+        self._previous_ticks = {(stat.pid, stat.start): stat.ticks for stat in stats.values()}
+        self._previous_time = now
+        return sorted(loads, key=lambda load: (-load.cpu_percent, -load.rss_bytes))
@@ -0,0 +1,228 @@
+"""
+The window -> Atuin session registry and session lineage written by the shell snippets.
+
+Kitty numbers windows from 1 in every instance, so the snippets name each
+file `<instance>_<window id>`. The instance is kitty's remote-control
+address, or `pid<kitty pid>` when kitty has none; see `instance_key`.
+Files written by older snippets are named by the bare window ID.
+"""
+
+import os
+import re
+from collections import Counter
+from collections.abc import Collection, Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import get_xdg_cache_dir
+from .fileio import write_atomic
+from .kitty import KittyWindow
+
+SESSION_FILE_PREFIX = "atuin_kitty_"
+# Characters the snippets replace with "_" in a kitty address.
+UNSAFE_IN_KEY = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def instance_key(listen_on: str | None = None, kitty_pid: str | int | None = None) -> str | None:
+    """Name a kitty instance the way the snippets do: its address made file-safe, else its pid."""
+    if listen_on:
+        return UNSAFE_IN_KEY.sub("_", listen_on)
+    return f"pid{kitty_pid}" if kitty_pid else None
+
+
+def current_instance_key() -> str | None:
+    """Return the key of the kitty instance this process runs in, if any."""
+    return instance_key(os.environ.get("KITTY_LISTEN_ON"), os.environ.get("KITTY_PID"))
+
+
+def window_instance_key(window: KittyWindow) -> str | None:
+    """Return the key of the kitty instance `window` belongs to, if known."""
+    return instance_key(window.address) if window.instance else current_instance_key()
+
+
+def registry_key(window_id: str | int, instance: str | None) -> str:
+    return f"{instance}_{window_id}" if instance else str(window_id)
+
+
+def split_registry_key(key: str) -> tuple[str | None, str]:
+    """Return the instance (None for a bare-ID file) and the kitty window ID of a registry key."""
+    instance, _, window_id = key.rpartition("_")
+    return instance or None, window_id
+
+
+def resolve_registry_keys(windows: Sequence[KittyWindow], names: Collection[str]) -> dict[str, str | None]:
+    """
+    Map each window ID to the registry key among `names` that belongs to it, or None.
+
+    Windows of a multi-instance snapshot carry their kitty address; the
+    others belong to the instance catherd runs in. Any other file with the
+    window's kitty ID (a bare-ID file from an older snippet, or any file
+    when that instance is unknown) is used only if it is the only one and
+    no other window in `windows` shares that ID; otherwise it may be
+    another instance's, and the window gets no session rather than a
+    wrong one.
+    """
+    by_kitty_id: dict[str, list[str]] = {}
+    for name in names:
+        by_kitty_id.setdefault(split_registry_key(name)[1], []).append(name)
+    shared_ids = Counter(win.kitty_id for win in windows)
+    keys: dict[str, str | None] = {}
+    for win in windows:
+        instance = window_instance_key(win)
+        qualified = registry_key(win.kitty_id, instance)
+        candidates = by_kitty_id.get(win.kitty_id, [])
+        if instance and qualified in names:
+            keys[win.id] = qualified
+        elif (
+            shared_ids[win.kitty_id] == 1
+            and len(candidates) == 1
+            and (instance is None or candidates[0] == win.kitty_id)
+        ):
+            keys[win.id] = candidates[0]
+        else:
+            keys[win.id] = None
+    return keys
+
+
+def window_sessions(windows: Sequence[KittyWindow], registry: Mapping[str, str]) -> dict[str, str | None]:
+    """Map each window ID to its Atuin session; see `resolve_registry_keys`."""
+    keys = resolve_registry_keys(windows, registry)
+    return {window_id: registry[key] if key else None for window_id, key in keys.items()}
+
+
+def read_session_registry(cache_dir: Path | None = None) -> dict[str, str]:
+    """
+    Map registry keys (`<instance>_<window id>`, or a bare window ID) to Atuin session IDs with one scan.
+
+    Empty or unreadable session files are left out.
+    """
+    registry: dict[str, str] = {}
+    directory = cache_dir or get_xdg_cache_dir()
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return registry
+    for entry in entries:
+        if not entry.name.startswith(SESSION_FILE_PREFIX) or not entry.is_file():
+            continue
+        try:
+            content = Path(entry.path).read_text(encoding="utf-8").split()
+        except OSError:
+            continue
+        if content:
+            registry[entry.name.removeprefix(SESSION_FILE_PREFIX)] = content[0]
+    return registry
+
+
+# Each shell start appends `<session> <unix start time> <kitty pid>` to lineage/<registry key>.
+LINEAGE_DIRNAME = "lineage"
+LINEAGE_COMPACT_BYTES = 4096
+MAX_LINEAGE_SESSIONS = 16
+
+
+@dataclass(frozen=True, slots=True)
+class LineageEntry:
+    session: str
+    started: int | None = None  # Unix time
+    kitty_pid: str | None = None
+
+
+def parse_lineage(text: str) -> list[LineageEntry]:
+    """
+    Return the sessions of one lineage file, oldest first, each once.
+
+    Entries of every kitty pid are kept, even interleaved ones; see
+    `earlier_sessions`.
+    """
+    entries: dict[str, LineageEntry] = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        started = int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else None
+        entry = LineageEntry(fields[0], started, fields[2] if len(fields) > 2 else None)  # noqa: PLR2004
+        entries.setdefault(entry.session, entry)
+    return list(entries.values())
+
+
+def format_lineage(entries: Sequence[LineageEntry]) -> str:
+    return "".join(
+        " ".join([entry.session, str(entry.started or 0), *([entry.kitty_pid] if entry.kitty_pid else [])])
+        + "\n"
+        for entry in entries
+    )
+
+
+def _lineage_files(cache_dir: Path | None) -> list[os.DirEntry[str]]:
+    directory = (cache_dir or get_xdg_cache_dir()) / LINEAGE_DIRNAME
+    try:
+        with os.scandir(directory) as entries:
+            return [entry for entry in entries if not entry.name.startswith(".") and entry.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+def read_session_lineage(cache_dir: Path | None = None) -> dict[str, list[LineageEntry]]:
+    """
+    Map registry keys to every Atuin session started in that window, oldest first.
+
+    This only reads; large files are cut down by `compact_session_lineage`.
+    """
+    lineage: dict[str, list[LineageEntry]] = {}
+    for entry in _lineage_files(cache_dir):
+        try:
+            sessions = parse_lineage(Path(entry.path).read_text(encoding="utf-8"))
+        except OSError:
+            continue
+        if sessions:
+            lineage[entry.name] = sessions
+    return lineage
+
+
+def compact_session_lineage(cache_dir: Path | None = None) -> int:
+    """
+    Cut files past `LINEAGE_COMPACT_BYTES` down to their newest `MAX_LINEAGE_SESSIONS` sessions.
+
+    Returns how many files were rewritten. A line a shell appends while its
+    file is rewritten is lost, so this runs only from `catherd doctor`,
+    never while reading.
+    """
+    compacted = 0
+    for entry in _lineage_files(cache_dir):
+        path = Path(entry.path)
+        try:
+            if entry.stat().st_size <= LINEAGE_COMPACT_BYTES:
+                continue
+            entries = parse_lineage(path.read_text(encoding="utf-8"))
+            write_atomic(path, format_lineage(entries[-MAX_LINEAGE_SESSIONS:]))
+        except OSError:
+            continue
+        compacted += 1
+    return compacted
+
+
+def earlier_sessions(
+    registry: Mapping[str, str], lineage: Mapping[str, Sequence[LineageEntry]]
+) -> dict[str, list[str]]:
+    """
+    Map the current session of each window to the other sessions started in that window.
+
+    Only sessions started by the same kitty process (pid) as the current
+    one count: kitty numbers windows from 1 again when it restarts, and
+    older snippets wrote window N of every instance to one bare-ID file,
+    which a key falls back to when it has no file of its own.
+    """
+    result: dict[str, list[str]] = {}
+    for key, session in registry.items():
+        entries = lineage.get(key) or lineage.get(split_registry_key(key)[1], ())
+        current = next((entry for entry in entries if entry.session == session), None)
+        if current is None:
+            continue
+        earlier = [
+            entry.session
+            for entry in entries
+            if entry.kitty_pid == current.kitty_pid and entry.session != session
+        ]
+        if earlier:
+            result[session] = earlier
+    return result
@@ -0,0 +1,190 @@
+"""
+Talk to kitty's remote-control socket directly.
+
+One connection carries many requests, so batches of commands cost one
+connect instead of one `kitty @` subprocess each. Password-protected
+(encrypted) remote control is not supported.
+"""
+
+import json
+import os
+import socket
+from collections import deque
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Any, Self
+
+from .deadline import Deadline
+from .kitty import KittyError, KittyTimeoutError
+
+PREFIX = b"\x1bP@kitty-cmd"
+SUFFIX = b"\x1b\\"
+PROTOCOL_VERSION = (0, 26, 0)
+PIPELINE_DEPTH = 64
+
+Request = tuple[str, dict[str, Any]]
+
+
+class KittyRemoteError(KittyError):
+    """Raised when kitty's remote-control socket cannot be used."""
+
+
+class KittyRemoteTimeoutError(KittyRemoteError, KittyTimeoutError):
+    """Raised when kitty does not answer on the socket before the deadline."""
+
+
+def get_listen_on(to: str | None = None) -> str:
+    """Return the remote-control address from `to` or $KITTY_LISTEN_ON."""
+    address = to or os.environ.get("KITTY_LISTEN_ON")
+    if not address:
+        msg = "No kitty socket: pass --to or set $KITTY_LISTEN_ON (kitty --listen-on / listen_on)."
+        raise KittyRemoteError(msg)
+    return address
+
+
+def encode_request(cmd: str, payload: dict[str, Any] | None = None) -> bytes:
+    message: dict[str, Any] = {"cmd": cmd, "version": list(PROTOCOL_VERSION), "no_response": False}
+    if payload is not None:
+        message["payload"] = payload
+    return PREFIX + json.dumps(message, separators=(",", ":")).encode() + SUFFIX
+
+
+def _open_socket(address: str, timeout: float | None) -> socket.socket:
+    kind, _, target = address.partition(":")
+    if kind == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # A leading "@" names a Linux abstract socket.
+        path = "\0" + target[1:] if target.startswith("@") else target
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+    if kind == "tcp":
+        host, _, port = target.rpartition(":")
+        return socket.create_connection((host, int(port)), timeout=timeout)
+    msg = f"Unsupported kitty socket address: {address!r}"
+    raise KittyRemoteError(msg)
+
+
+class KittyRemote:
+    """A persistent remote-control connection to one kitty instance."""
+
+    def __init__(
+        self, address: str, *, timeout: float | None = 5.0, deadline: Deadline | None = None
+    ) -> None:
+        self.address = address
+        self.timeout = timeout
+        self.deadline = deadline
+        self._sock: socket.socket | None = None
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def __enter__(self) -> Self:
+        """Connect and return the connection."""
+        self.connect()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the connection."""
+        self.close()
+
+    def connect(self) -> None:
+        self._socket()
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def _timeout(self) -> float | None:
+        remaining = self.deadline.remaining() if self.deadline is not None else None
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            msg = f"Deadline of {self.deadline.ms:.0f} ms reached talking to kitty at {self.address}"
+            raise KittyRemoteTimeoutError(msg)
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    def _socket(self) -> socket.socket:
+        if self._sock is None:
+            try:
+                self._sock = _open_socket(self.address, self._timeout())
+            except OSError as exc:
+                msg = f"Could not connect to kitty at {self.address}: {exc}"
+                raise KittyRemoteError(msg) from exc
+        elif self.deadline is not None:
+            self._sock.settimeout(self._timeout())
+        return self._sock
+
+    def _send(self, data: bytes) -> None:
+        try:
+            self._socket().sendall(data)
+        except OSError as exc:
+            msg = f"Lost connection to kitty at {self.address}: {exc}"
+            raise KittyRemoteError(msg) from exc
+
+    def _read_response(self) -> dict[str, Any]:
+        while True:
+            start = self._buffer.find(PREFIX)
+            if start != -1:
+                # Resume where the last search stopped, so a large reply is scanned once, not once per chunk.
+                end = self._buffer.find(SUFFIX, max(start + len(PREFIX), self._scanned))
+                if end != -1:
+                    body = self._buffer[start + len(PREFIX) : end]
+                    del self._buffer[: end + len(SUFFIX)]
+                    self._scanned = 0
+                    try:
+                        return json.loads(body)
+                    except json.JSONDecodeError as exc:
+                        msg = f"Invalid response from kitty: {exc}"
+                        raise KittyRemoteError(msg) from exc
+                self._scanned = len(self._buffer) - len(SUFFIX) + 1
+            sock = self._socket()
+            try:
+                chunk = sock.recv(65536)
+            except TimeoutError as exc:
+                msg = f"No response from kitty at {self.address} in time"
+                raise KittyRemoteTimeoutError(msg) from exc
+            except OSError as exc:
+                msg = f"No response from kitty at {self.address}: {exc}"
+                raise KittyRemoteError(msg) from exc
+            if not chunk:
+                msg = f"kitty at {self.address} closed the connection"
+                raise KittyRemoteError(msg)
+            self._buffer.extend(chunk)
+
+    def request(self, cmd: str, payload: dict[str, Any] | None = None) -> dict[str, Any]:
+        self._send(encode_request(cmd, payload))
+        return self._read_response()
+
+    def pipeline(self, requests: Sequence[Request], *, depth: int = PIPELINE_DEPTH) -> list[dict[str, Any]]:
+        """
+        Send many requests without waiting for each reply.
+
+        At most `depth` requests are in flight at once; responses are
+        returned in request order.
+        """
+        responses: list[dict[str, Any]] = []
+        pending: deque[Request] = deque(requests)
+        in_flight = 0
+        while pending or in_flight:
+            batch = b""
+            while pending and in_flight < depth:
+                cmd, payload = pending.popleft()
+                batch += encode_request(cmd, payload)
+                in_flight += 1
+            if batch:
+                self._send(batch)
+            responses.append(self._read_response())
+            in_flight -= 1
+        return responses
@@ -0,0 +1,160 @@
+"""
+Resolve the git repository of each window's cwd.
+
+Walking up from every cwd with a stat per level, or running `git rev-parse`
+per window, is too slow for dozens of windows. `RepoResolver` memoizes
+every directory it visits, so sibling cwds share the walk over their common
+parents, and keeps found roots on disk with the inode and mtime of every
+directory from the cwd up to the root, so a later run checks a cached cwd
+with one stat per level instead of a stat of each level's `.git`.
+"""
+
+import contextlib
+import json
+import os
+from collections.abc import Sequence
+from pathlib import Path
+
+from .config import get_xdg_cache_dir
+from .fileio import write_atomic
+from .kitty import KittyWindow
+
+GIT_MARKER = ".git"  # A directory, or a file in worktrees and submodules.
+MAX_CACHED_ROOTS = 4096
+NO_REPO = "(no repo)"
+
+Signature = list[int]
+
+
+def get_repo_cache_path() -> Path:
+    return get_xdg_cache_dir() / "repo_roots.json"
+
+
+def _signature(path: str) -> Signature | None:
+    try:
+        st = os.stat(path)  # noqa: PTH116
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+
+def _path_signatures(cwd: str, root: str) -> list[Signature] | None:
+    """Return the signatures of `cwd` and each parent up to `root`, or None if one cannot be read."""
+    signatures: list[Signature] = []
+    path = cwd
+    while True:
+        signature = _signature(path)
+        if signature is None:
+            return None
+        signatures.append(signature)
+        parent = os.path.dirname(path)  # noqa: PTH120
+        if path in {root, parent}:
+            return signatures
+        path = parent
+
+
+class RepoResolver:
+    """
+    Map directories to the root of the git repository containing them.
+
+    Cached roots stay valid while no directory from the cwd up to the root
+    changed, so a `.git` created at any level (`git init`, a submodule)
+    invalidates them; only found roots are cached, since a directory
+    outside any repository could gain one through a parent.
+    """
+
+    def __init__(self, cache_path: Path | None = None) -> None:
+        self.cache_path = cache_path or get_repo_cache_path()
+        self._memo: dict[str, str | None] = {}
+        self._disk = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict[str, list]:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def save(self) -> None:
+        """Write the on-disk cache if anything changed, keeping the most recent entries."""
+        if not self._dirty:
+            return
+        entries = list(self._disk.items())[-MAX_CACHED_ROOTS:]
+        write_atomic(self.cache_path, json.dumps(dict(entries)))
+        self._dirty = False
+
+    def _cached(self, cwd: str) -> str | None:
+        entry = self._disk.get(cwd)
+        if not entry:
+            return None
+        root, signatures = entry if len(entry) == 2 else (None, None)  # noqa: PLR2004
+        if not isinstance(root, str) or _path_signatures(cwd, root) != signatures:
+            del self._disk[cwd]
+            self._dirty = True
+            return None
+        return root
+
+    def _walk(self, directory: str) -> str | None:
+        # Plain strings and os.path: this runs once per directory level and must stay cheap.
+        visited: list[str] = []
+        path = directory
+        while True:
+            if path in self._memo:
+                root = self._memo[path]
+                break
+            visited.append(path)
+            if os.path.lexists(os.path.join(path, GIT_MARKER)):  # noqa: PTH118
+                root = path
+                break
+            parent = os.path.dirname(path)  # noqa: PTH120
+            if parent == path:
+                root = None
+                break
+            path = parent
+        for seen in visited:
+            self._memo[seen] = root
+        return root
+
+    def resolve(self, cwd: str | None) -> str | None:
+        """Return the repository root of `cwd`, or None outside any repository."""
+        if not cwd:
+            return None
+        cwd = os.path.normpath(cwd)
+        if cwd in self._memo:
+            return self._memo[cwd]
+        root = self._cached(cwd)
+        if root is not None:
+            self._memo[cwd] = root
+            return root
+        root = self._walk(cwd)
+        if root is not None and (signatures := _path_signatures(cwd, root)):
+            self._disk.pop(cwd, None)
+            self._disk[cwd] = [root, signatures]
+            self._dirty = True
+        return root
+
+
+def repo_label(root: str) -> str:
+    home = str(Path.home())
+    return "~" + root[len(home) :] if root == home or root.startswith(home + os.sep) else root
+
+
+def group_windows_by_repo(
+    windows: Sequence[KittyWindow], resolver: RepoResolver | None = None
+) -> list[tuple[str, list[KittyWindow]]]:
+    """
+    Return `(label, windows)` pairs, one per repository, in order of first appearance.
+
+    Windows outside any repository (or without a cwd) come last.
+    """
+    resolver = resolver or RepoResolver()
+    groups: dict[str | None, list[KittyWindow]] = {}
+    for win in windows:
+        groups.setdefault(resolver.resolve(win.cwd), []).append(win)
+    with contextlib.suppress(OSError):  # The cache only saves time.
+        resolver.save()
+    ordered = [root for root in groups if root is not None]
+    if None in groups:
+        ordered.append(None)
+    return [(f"Repo {repo_label(root)}" if root else NO_REPO, groups[root]) for root in ordered]
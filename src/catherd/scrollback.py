@@ -0,0 +1,79 @@
+"""
+Search the scrollback of many kitty windows at once.
+
+Each window's text is fetched with `get-text --extent all` over the
+remote-control socket by a bounded pool of workers. A worker scans its
+buffer as soon as it arrives and keeps only the matching lines, so at most
+`jobs` buffers are in memory at any time.
+"""
+
+import re
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from .deadline import Deadline
+from .kitty import KittyError, KittyWindow
+from .remote import KittyRemote, KittyRemoteError
+
+DEFAULT_JOBS = 8
+
+
+@dataclass(frozen=True, slots=True)
+class ScrollbackMatches:
+    window: KittyWindow
+    # (1-based line number, line) for every line with a match.
+    lines: list[tuple[int, str]] = field(default_factory=list)
+    error: KittyError | None = None
+
+
+def scan_text(pattern: re.Pattern[str], text: str) -> list[tuple[int, str]]:
+    """Return the matching lines of `text`, each once, without splitting the whole buffer."""
+    lines: list[tuple[int, str]] = []
+    line_number, line_start, next_line = 1, 0, -1
+    for match in pattern.finditer(text):
+        if match.start() < next_line:
+            continue  # Another match on a line already reported.
+        line_number += text.count("\n", line_start, match.start())
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        line_end = text.find("\n", match.start())
+        next_line = len(text) if line_end == -1 else line_end + 1
+        lines.append((line_number, text[line_start:next_line].rstrip("\r\n")))
+    return lines
+
+
+def fetch_scrollback(address: str, window: KittyWindow, *, deadline: Deadline | None = None) -> str:
+    """Return the whole scrollback of `window` as plain text."""
+    with KittyRemote(address, deadline=deadline) as remote:
+        response = remote.request("get-text", {"match": f"id:{window.kitty_id}", "extent": "all"})
+    if not response.get("ok"):
+        msg = f"get-text failed: {response.get('error', 'unknown error')}"
+        raise KittyRemoteError(msg)
+    return response.get("data") or ""
+
+
+def _search_window(
+    address: str, window: KittyWindow, pattern: re.Pattern[str], deadline: Deadline | None
+) -> ScrollbackMatches:
+    try:
+        text = fetch_scrollback(address, window, deadline=deadline)
+    except KittyError as exc:
+        return ScrollbackMatches(window, error=exc)
+    return ScrollbackMatches(window, scan_text(pattern, text))
+
+
+def grep_scrollback(
+    windows: Sequence[KittyWindow],
+    pattern: re.Pattern[str],
+    *,
+    address: str,
+    jobs: int = DEFAULT_JOBS,
+    deadline: Deadline | None = None,
+) -> Iterator[ScrollbackMatches]:
+    """Yield the matches of each window as soon as its scrollback has been searched."""
+    if not windows:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(windows)))) as pool:
+        futures = [pool.submit(_search_window, address, win, pattern, deadline) for win in windows]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,249 @@
+"""
+A small sidecar table of the last command per Atuin session.
+
+Atuin's `history` table holds millions of rows and its indexes depend on the
+Atuin version. catherd keeps `session -> (last_ts, last_command, count)` in
+its own SQLite file and tails each history DB from a stored rowid
+high-water mark, so a refresh reads only rows inserted since the previous
+one and lookups are primary-key probes. Rows are kept per history DB, so a
+DB that is replaced or dropped is re-read on its own.
+"""
+
+import json
+import sqlite3
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from .atuin import (
+    existing_db_paths,
+    get_atuin_history_db_paths,
+    newest_in_lineage,
+    read_only_uri,
+    with_lineage,
+)
+from .config import get_xdg_cache_dir
+from .deadline import TIMED_OUT, Deadline
+
+SCHEMA_VERSION = 2
+# Version 1 had one session_last row per session for all sources together.
+DROP_SCHEMA = """
+DROP TABLE IF EXISTS session_last;
+DROP TABLE IF EXISTS high_water;
+"""
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_last (
+    session TEXT NOT NULL,
+    source TEXT NOT NULL,
+    last_ts INTEGER NOT NULL,
+    last_command TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (session, source)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS high_water (
+    source TEXT PRIMARY KEY,
+    max_rowid INTEGER NOT NULL,
+    max_rowid_ts INTEGER
+) WITHOUT ROWID;
+"""
+
+UPSERT_NEW_ROWS = """
+INSERT INTO session_last (session, source, last_ts, last_command, count)
+SELECT session, ?, MAX(timestamp), command, COUNT(*)
+FROM src.history
+WHERE rowid > ? AND rowid <= ?
+GROUP BY session
+ON CONFLICT (session, source) DO UPDATE SET
+    last_command = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_command ELSE last_command END,
+    last_ts = MAX(last_ts, excluded.last_ts),
+    count = count + excluded.count
+"""
+
+
+def get_session_index_path() -> Path:
+    return get_xdg_cache_dir() / "session_index.db"
+
+
+class SessionIndex:
+    """The sidecar table, refreshed incrementally from one or more history DBs."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_session_index_path()
+
+    def _connect(self, deadline: Deadline | None = None) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        try:
+            if deadline is not None:
+                deadline.guard(conn)
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript(DROP_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.executescript(SCHEMA)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def refresh(self, db_paths: Sequence[Path], *, deadline: Deadline | None = None) -> int:
+        """
+        Fold rows added since the last refresh into the table.
+
+        Returns the number of history rows read. If a history DB was
+        replaced or vacuumed so that the stored high-water mark no longer
+        points at the same row, that DB's rows are rebuilt from scratch;
+        the rows of DBs no longer in `db_paths` are dropped.
+        """
+        sources = [str(path.resolve()) for path in db_paths]
+        conn = self._connect(deadline)
+        try:
+            with conn:
+                stale = {row[0] for row in conn.execute("SELECT source FROM high_water")} - set(sources)
+                for source in stale:
+                    self._reset(conn, source)
+            rows_read = 0
+            for source in sources:
+                conn.execute("ATTACH DATABASE ? AS src", (read_only_uri(Path(source)),))
+                try:
+                    rows_read += self._refresh_source(conn, source)
+                finally:
+                    conn.execute("DETACH DATABASE src")
+            return rows_read
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _reset(conn: sqlite3.Connection, source: str) -> None:
+        conn.execute("DELETE FROM session_last WHERE source = ?", (source,))
+        conn.execute("DELETE FROM high_water WHERE source = ?", (source,))
+
+    def _refresh_source(self, conn: sqlite3.Connection, source: str) -> int:
+        with conn:
+            mark = conn.execute(
+                "SELECT max_rowid, max_rowid_ts FROM high_water WHERE source = ?", (source,)
+            ).fetchone()
+            max_rowid = 0
+            if mark is not None:
+                max_rowid, max_rowid_ts = mark
+                still_there = conn.execute(
+                    "SELECT timestamp FROM src.history WHERE rowid = ?", (max_rowid,)
+                ).fetchone()
+                if still_there is None or still_there[0] != max_rowid_ts:
+                    self._reset(conn, source)
+                    return self._refresh_source(conn, source)
+            newest = conn.execute(
+                "SELECT rowid, timestamp FROM src.history WHERE rowid > ? ORDER BY rowid DESC LIMIT 1",
+                (max_rowid,),
+            ).fetchone()
+            if newest is None:
+                return 0
+            rows_read = conn.execute(
+                "SELECT COUNT(*) FROM src.history WHERE rowid > ? AND rowid <= ?", (max_rowid, newest[0])
+            ).fetchone()[0]
+            conn.execute(UPSERT_NEW_ROWS, (source, max_rowid, newest[0]))
+            conn.execute(
+                "INSERT OR REPLACE INTO high_water (source, max_rowid, max_rowid_ts) VALUES (?, ?, ?)",
+                (source, newest[0], newest[1]),
+            )
+            return rows_read
+
+    def lookup(
+        self, session_ids: Sequence[str], *, deadline: Deadline | None = None
+    ) -> dict[str, tuple[int, str, int]]:
+        """Return `session -> (last_ts, last_command, count)` for the sessions present."""
+        conn = self._connect(deadline)
+        try:
+            # With MAX(), SQLite takes last_command from the row holding the maximum.
+            rows = conn.execute(
+                "SELECT session, MAX(last_ts), last_command, SUM(count) FROM session_last "
+                "WHERE session IN (SELECT value FROM json_each(?)) GROUP BY session",
+                (json.dumps(list(session_ids)),),
+            ).fetchall()
+        finally:
+            conn.close()
+        return {session: (last_ts, command, count) for session, last_ts, command, count in rows}
+
+    def recent(
+        self,
+        session_windows: Mapping[str, str],
+        *,
+        limit: int,
+        oldest: bool = False,
+        deadline: Deadline | None = None,
+    ) -> list[tuple[str, str, int]]:
+        """Return the `limit` windows whose sessions ran a command most (or least) recently."""
+        conn = self._connect(deadline)
+        try:
+            rows = conn.execute(
+                "SELECT w.value, s.last_command, MAX(s.last_ts) AS ts FROM json_each(?) AS w "  # noqa: S608
+                "JOIN session_last AS s ON s.session = w.key "
+                f"GROUP BY w.value ORDER BY ts {'ASC' if oldest else 'DESC'}, w.value LIMIT ?",
+                (json.dumps(dict(session_windows)), limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(window, command, ts) for window, command, ts in rows]
+
+
+def get_indexed_recent_windows(
+    session_windows: Mapping[str, str],
+    *,
+    limit: int,
+    oldest: bool = False,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    index: SessionIndex | None = None,
+    deadline: Deadline | None = None,
+) -> list[tuple[str, str, int]] | None:
+    """Refresh the sidecar index and rank windows like `get_recent_windows_for_atuin_sessions`."""
+    if not session_windows:
+        return []
+    if db_paths is None:
+        db_paths = get_atuin_history_db_paths()
+    existing = existing_db_paths(db_paths, verbose=verbose)
+    if not existing:
+        return None
+    index = index or SessionIndex()
+    try:
+        index.refresh(existing, deadline=deadline)
+        return index.recent(session_windows, limit=limit, oldest=oldest, deadline=deadline)
+    except sqlite3.DatabaseError as e:
+        if verbose:
+            print(f"[verbose] SQLite error: {e}")
+        return None
+
+
+def get_indexed_last_commands(
+    session_ids: Sequence[str],
+    *,
+    verbose: bool = False,
+    db_paths: Sequence[Path] | None = None,
+    index: SessionIndex | None = None,
+    deadline: Deadline | None = None,
+    lineage: Mapping[str, Sequence[str]] | None = None,
+) -> dict[str, str]:
+    """
+    Refresh the sidecar index and return the last command of each session.
+
+    Uses the same placeholders and `lineage` as `get_last_commands_for_atuin_sessions`.
+    """
+    unique_ids = list(dict.fromkeys(session_ids))
+    if not unique_ids:
+        return {}
+    if db_paths is None:
+        db_paths = get_atuin_history_db_paths()
+    existing = existing_db_paths(db_paths, verbose=verbose)
+    if not existing:
+        return dict.fromkeys(unique_ids, "(no history db)")
+    index = index or SessionIndex()
+    try:
+        rows_read = index.refresh(existing, deadline=deadline)
+        found = index.lookup(with_lineage(unique_ids, lineage), deadline=deadline)
+    except sqlite3.DatabaseError as e:
+        if deadline is not None and deadline.expired:
+            return dict.fromkeys(unique_ids, TIMED_OUT)
+        if verbose:
+            print(f"[verbose] SQLite error: {e}")
+        return dict.fromkeys(unique_ids, "(sqlite error)")
+    if verbose:
+        print(f"[verbose] Session index refreshed from {rows_read} new history row(s)")
+    newest = {session: (last_ts, command) for session, (last_ts, command, _count) in found.items()}
+    return {session: newest_in_lineage(newest, session, lineage) or "(no command)" for session in unique_ids}
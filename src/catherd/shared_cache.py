@@ -0,0 +1,118 @@
+"""
+A result cache shared by every catherd process on the machine.
+
+Each entry is one JSON file in the cache directory next to a lock file.
+When an entry is stale, the first process to take the lock refreshes it;
+the others wait up to `wait` seconds for the new value and then fall back
+to the stale one, so a burst of processes costs one `kitty @ ls`.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .config import get_xdg_cache_dir
+from .fileio import write_atomic
+from .timings import Timings
+
+POLL_INTERVAL = 0.01
+
+
+def get_shared_cache_dir() -> Path:
+    path = get_xdg_cache_dir() / "shared"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class SharedCache:
+    """One named entry, refreshed by at most one process at a time."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl: float,
+        wait: float = 0.5,
+        directory: Path | None = None,
+        timings: Timings | None = None,
+    ) -> None:
+        directory = directory or get_shared_cache_dir()
+        self.path = directory / f"{name}.json"
+        self.lock_path = directory / f"{name}.lock"
+        self.ttl = ttl
+        self.wait = wait
+        self.timings = timings or Timings()
+
+    def _read(self, key: str) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None
+        return entry
+
+    def _fresh(self, entry: dict[str, Any] | None) -> bool:
+        return entry is not None and time.time() - entry.get("ts", 0) < self.ttl
+
+    def _write(self, key: str, value: Any) -> None:  # noqa: ANN401
+        # The cache only saves time: a full disk must not fail the command.
+        with contextlib.suppress(OSError):
+            write_atomic(self.path, json.dumps({"key": key, "ts": time.time(), "value": value}))
+
+    def _acquire(self, fd: int) -> bool:
+        deadline = time.monotonic() + self.wait
+        waited = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if not waited:
+                    self.timings.count("cache wait")
+                    waited = True
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(POLL_INTERVAL)
+            else:
+                return True
+
+    def get(self, key: str, compute: Callable[[], Any], *, store: Callable[[Any], bool] | None = None) -> Any:  # noqa: ANN401
+        """
+        Return the cached value for `key`, refreshing it with `compute` if stale.
+
+        `compute` must return JSON-serializable data. Exceptions from it
+        propagate and leave the previous entry in place, as do values
+        rejected by `store`.
+        """
+        entry = self._read(key)
+        if self._fresh(entry):
+            self.timings.count("cache hit")
+            return entry["value"]
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if not self._acquire(fd):
+                if entry is not None:
+                    self.timings.count("cache stale")
+                    return entry["value"]
+                self.timings.count("cache miss")
+                return compute()
+            try:
+                # Whoever held the lock may have just refreshed the entry.
+                entry = self._read(key)
+                if self._fresh(entry):
+                    self.timings.count("cache hit")
+                    return entry["value"]
+                self.timings.count("cache miss")
+                value = compute()
+                if store is None or store(value):
+                    self._write(key, value)
+                return value
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
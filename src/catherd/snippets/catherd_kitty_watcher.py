@@ -0,0 +1,75 @@
+"""
+Kitty watcher that appends window events to catherd's event log.
+
+Load it from kitty.conf with `watcher /path/to/catherd_kitty_watcher.py`
+(`catherd install-watcher` does this for you). It runs inside the kitty
+process, so it must only use the standard library and never block.
+
+Each event is one compact JSON line:
+`{"e": "title", "w": 12, "t": 3, "o": 1, "title": "vim", "ts": 1700000000.0}`.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+EVENT_LOG_NAME = "kitty_events.jsonl"
+MAX_LOG_BYTES = 1 << 20
+
+
+def _event_log_path() -> Path:
+    cache = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache) / "catherd" / EVENT_LOG_NAME
+
+
+def _append(event: dict[str, Any]) -> None:
+    event["ts"] = round(time.time(), 3)
+    line = json.dumps(event, separators=(",", ":")) + "\n"
+    path = _event_log_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size > MAX_LOG_BYTES:
+            # Readers notice the new inode and resync with a single `kitty @ ls`.
+            path.replace(path.with_name(path.name + ".1"))
+        # One short O_APPEND write per event keeps lines whole across kitty processes.
+        with path.open("a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError:
+        pass
+
+
+def _window_event(kind: str, window: Any, **extra: Any) -> dict[str, Any]:  # noqa: ANN401
+    event: dict[str, Any] = {
+        "e": kind,
+        "w": getattr(window, "id", None),
+        "t": getattr(window, "tab_id", None),
+        "o": getattr(window, "os_window_id", None),
+    }
+    event.update(extra)
+    return event
+
+
+def on_load(_boss: Any, _data: dict[str, Any]) -> None:  # noqa: ANN401
+    _append({"e": "load"})
+
+
+def on_close(_boss: Any, window: Any, _data: dict[str, Any]) -> None:  # noqa: ANN401
+    _append(_window_event("close", window))
+
+
+def on_title_change(_boss: Any, window: Any, data: dict[str, Any]) -> None:  # noqa: ANN401
+    child = getattr(window, "child", None)
+    _append(
+        _window_event(
+            "title",
+            window,
+            title=data.get("title", getattr(window, "title", "")),
+            pid=getattr(child, "pid", None),
+        )
+    )
+
+
+def on_focus_change(_boss: Any, window: Any, data: dict[str, Any]) -> None:  # noqa: ANN401
+    _append(_window_event("focus", window, focused=bool(data.get("focused"))))
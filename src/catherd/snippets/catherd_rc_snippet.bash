@@ -1,4 +1,13 @@
 if [[ -n "$KITTY_WINDOW_ID" && -n "$ATUIN_SESSION" ]]; then
-  mkdir -p "${XDG_CACHE_HOME:-$HOME/.cache}/catherd"
-  echo "$ATUIN_SESSION $KITTY_WINDOW_ID" >"${XDG_CACHE_HOME:-$HOME/.cache}/catherd/atuin_kitty_${KITTY_WINDOW_ID}"
+  # Window IDs repeat across kitty instances, so qualify them with the instance.
+  catherd_key="$KITTY_WINDOW_ID"
+  if [[ -n "$KITTY_LISTEN_ON" ]]; then
+    catherd_key="${KITTY_LISTEN_ON//[^A-Za-z0-9._-]/_}_${KITTY_WINDOW_ID}"
+  elif [[ -n "$KITTY_PID" ]]; then
+    catherd_key="pid${KITTY_PID}_${KITTY_WINDOW_ID}"
+  fi
+  mkdir -p "${XDG_CACHE_HOME:-$HOME/.cache}/catherd/lineage"
+  echo "$ATUIN_SESSION $KITTY_WINDOW_ID" >"${XDG_CACHE_HOME:-$HOME/.cache}/catherd/atuin_kitty_${catherd_key}"
+  echo "$ATUIN_SESSION $(date +%s) ${KITTY_PID:-}" >>"${XDG_CACHE_HOME:-$HOME/.cache}/catherd/lineage/${catherd_key}"
+  unset catherd_key
 fi
@@ -1,4 +1,12 @@
 if set -q KITTY_WINDOW_ID; and set -q ATUIN_SESSION
-    mkdir -p "${XDG_CACHE_HOME:-$HOME/.cache}/catherd"
-    echo "$ATUIN_SESSION $KITTY_WINDOW_ID" > "${XDG_CACHE_HOME:-$HOME/.cache}/catherd/atuin_kitty_${KITTY_WINDOW_ID}"
+    # Window IDs repeat across kitty instances, so qualify them with the instance.
+    set -l catherd_key $KITTY_WINDOW_ID
+    if test -n "$KITTY_LISTEN_ON"
+        set catherd_key (string replace -ra '[^A-Za-z0-9._-]' _ -- $KITTY_LISTEN_ON)_$KITTY_WINDOW_ID
+    else if test -n "$KITTY_PID"
+        set catherd_key pid{$KITTY_PID}_$KITTY_WINDOW_ID
+    end
+    mkdir -p "${XDG_CACHE_HOME:-$HOME/.cache}/catherd/lineage"
+    echo "$ATUIN_SESSION $KITTY_WINDOW_ID" > "${XDG_CACHE_HOME:-$HOME/.cache}/catherd/atuin_kitty_$catherd_key"
+    echo "$ATUIN_SESSION "(date +%s)" $KITTY_PID" >> "${XDG_CACHE_HOME:-$HOME/.cache}/catherd/lineage/$catherd_key"
 end
@@ -0,0 +1,158 @@
+"""
+Append-only time series of window activity.
+
+Samples are stored in one SQLite file per UTC day. Each file starts with a
+checkpoint (every window), later samples store only windows that changed or
+disappeared, and a new checkpoint is written every `checkpoint_every`
+samples. Replaying a moment reads the nearest checkpoint and the deltas
+after it, never the whole log.
+"""
+
+import sqlite3
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+
+from .activity import WindowActivity
+from .atuin import read_only_uri
+from .config import get_xdg_cache_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts INTEGER PRIMARY KEY,
+    checkpoint INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS windows (
+    ts INTEGER NOT NULL,
+    window_id TEXT NOT NULL,
+    tab TEXT,
+    title TEXT,
+    session TEXT,
+    last_command TEXT,
+    gone INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ts, window_id)
+) WITHOUT ROWID;
+"""
+
+
+def get_timeline_dir() -> Path:
+    path = get_xdg_cache_dir() / "timeline"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=UTC).strftime("%Y-%m-%d")
+
+
+def _timeline_file(directory: Path, day: str) -> Path:
+    return directory / f"timeline-{day}.db"
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class TimelineRecorder:
+    """Write samples, storing only what changed since the previous one."""
+
+    def __init__(
+        self, directory: Path | None = None, *, checkpoint_every: int = 60, keep_days: int | None = None
+    ) -> None:
+        self.directory = directory or get_timeline_dir()
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.keep_days = None if keep_days is None else max(1, keep_days)
+        self._conn: sqlite3.Connection | None = None
+        self._day: str | None = None
+        self._last: dict[str, WindowActivity] = {}
+        self._since_checkpoint = 0
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _rotate(self, day: str) -> sqlite3.Connection:
+        self.close()
+        current = _timeline_file(self.directory, day)
+        conn = _connect(current)
+        self._day = day
+        # Every file must be replayable on its own.
+        self._since_checkpoint = 0
+        if self.keep_days is not None:
+            # The file just opened always counts as one of the days kept.
+            older = sorted(path for path in self.directory.glob("timeline-*.db") if path != current)
+            for old in older[: max(0, len(older) - self.keep_days + 1)]:
+                old.unlink()
+        return conn
+
+    def record(self, rows: Sequence[WindowActivity], ts_ms: int) -> int:
+        """Append one sample and return the number of window rows written."""
+        day = _day(ts_ms)
+        if day != self._day or self._conn is None:
+            self._conn = self._rotate(day)
+        conn = self._conn
+        checkpoint = self._since_checkpoint % self.checkpoint_every == 0
+        current = {row.window_id: row for row in rows}
+        if checkpoint:
+            changed = list(current.values())
+            gone: list[str] = []
+        else:
+            changed = [row for row in rows if self._last.get(row.window_id) != row]
+            gone = [window_id for window_id in self._last if window_id not in current]
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO samples (ts, checkpoint) VALUES (?, ?)", (ts_ms, int(checkpoint))
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO windows (ts, window_id, tab, title, session, last_command, gone) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                [(ts_ms, r.window_id, r.tab, r.title, r.session, r.last_command) for r in changed],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO windows (ts, window_id, gone) VALUES (?, ?, 1)",
+                [(ts_ms, window_id) for window_id in gone],
+            )
+        self._last = current
+        self._since_checkpoint += 1
+        return len(changed) + len(gone)
+
+
+def replay(at_ms: int, directory: Path | None = None) -> list[WindowActivity] | None:
+    """
+    Rebuild the snapshot recorded at or before `at_ms`.
+
+    Returns None if nothing was recorded before that time.
+    """
+    directory = directory or get_timeline_dir()
+    day = _day(at_ms)
+    candidates = sorted(
+        (path for path in directory.glob("timeline-*.db") if path.stem.removeprefix("timeline-") <= day),
+        reverse=True,
+    )
+    for path in candidates:
+        conn = sqlite3.connect(read_only_uri(path), uri=True)
+        try:
+            row = conn.execute(
+                "SELECT MAX(ts) FROM samples WHERE checkpoint = 1 AND ts <= ?", (at_ms,)
+            ).fetchone()
+            if row is None or row[0] is None:
+                continue
+            state: dict[str, WindowActivity] = {}
+            for window_id, tab, title, session, last_command, gone in conn.execute(
+                "SELECT window_id, tab, title, session, last_command, gone FROM windows "
+                "WHERE ts >= ? AND ts <= ? ORDER BY ts",
+                (row[0], at_ms),
+            ):
+                if gone:
+                    state.pop(window_id, None)
+                else:
+                    state[window_id] = WindowActivity(
+                        window_id, tab, title or "", session, last_command or ""
+                    )
+            return list(state.values())
+        finally:
+            conn.close()
+    return None
@@ -0,0 +1,30 @@
+"""Stage timings and counters reported by `--timings`."""
+
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Timings:
+    stages: dict[str, float] = field(default_factory=dict)
+    counters: Counter[str] = field(default_factory=Counter)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Add the time spent in the block to stage `name`, in milliseconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def report(self) -> list[str]:
+        lines = [f"[timings] {name}: {ms:.1f} ms" for name, ms in self.stages.items()]
+        lines.extend(f"[timings] {name}: {n}" for name, n in sorted(self.counters.items()))
+        return lines
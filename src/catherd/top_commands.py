@@ -0,0 +1,209 @@
+"""
+Rank the commands run in open windows by a normalized key.
+
+`command_key` reduces a command line to its program name, plus the
+subcommand for CLIs such as `git` or `kubectl` whose first argument selects
+what they do. By default the key is computed by an SQLite function inside
+the `GROUP BY`, so one row per key comes back. With a sketch size the
+history is read in a single streaming pass into a `SpaceSaving` sketch
+instead, which keeps at most that many keys however large the history is.
+"""
+
+import json
+import re
+import sqlite3
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from .atuin import HistoryFilter, connect_atuin_history, history_union_sql
+
+DEFAULT_TOP = 20
+BATCH_SIZE = 1000
+
+# Programs whose first argument is a subcommand worth telling apart.
+MULTI_LEVEL_CLIS = frozenset({
+    "apt",
+    "aws",
+    "az",
+    "brew",
+    "cargo",
+    "docker",
+    "gcloud",
+    "gh",
+    "git",
+    "go",
+    "helm",
+    "kubectl",
+    "nix",
+    "npm",
+    "pip",
+    "pnpm",
+    "podman",
+    "poetry",
+    "systemctl",
+    "terraform",
+    "uv",
+    "yarn",
+})
+# Prefixes that run the next word as the command.
+WRAPPERS = frozenset({"builtin", "command", "doas", "exec", "nice", "nohup", "sudo", "time"})
+# Wrapper options that take the next word as their value, e.g. `sudo -u root make`.
+WRAPPER_VALUE_OPTIONS = {
+    "doas": frozenset({"-C", "-u"}),
+    "nice": frozenset({"-n"}),
+    "sudo": frozenset({"-C", "-D", "-g", "-h", "-p", "-R", "-r", "-T", "-t", "-U", "-u"}),
+    "time": frozenset({"-f", "-o"}),
+}
+ASSIGNMENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*=")
+MAX_WORDS = 8  # Enough to get past wrappers and assignments without splitting long command lines.
+
+TOP_COMMANDS_SQL = """
+SELECT key, n, failures, SUM(n) OVER () FROM (
+    SELECT key, COUNT(*) AS n, SUM(failed) AS failures FROM (
+        SELECT command_key(command) AS key, exit != 0 AS failed FROM ({union})
+    )
+    WHERE key IS NOT NULL
+    GROUP BY key
+)
+ORDER BY n DESC, key
+LIMIT ?
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class CommandCount:
+    key: str
+    count: int
+    failures: int
+    # Upper bound on how much `count` overestimates; only a sketch makes it non-zero.
+    error: int = 0
+
+
+def command_key(command: str | None) -> str | None:
+    """Return e.g. "make" for `FOO=1 /usr/bin/make -j8` and "git commit" for `sudo -u me git commit -m x`."""
+    words = command.split(None, MAX_WORDS) if command else []
+    index = 0
+    wrapper = None
+    while index < len(words):
+        word = words[index]
+        if word in WRAPPERS:
+            wrapper = word
+        elif wrapper and word.startswith("-"):
+            if word == "--":
+                wrapper = None
+            elif word in WRAPPER_VALUE_OPTIONS.get(wrapper, ()):
+                index += 1
+        elif not ASSIGNMENT.match(word):
+            break
+        index += 1
+    if index >= len(words):
+        return None
+    if index == len(words):
+        return None
+    program = words[index].rsplit("/", 1)[-1] or words[index]
+    subcommand = words[index + 1] if index + 1 < len(words) else ""
+    if program in MULTI_LEVEL_CLIS and subcommand and not subcommand.startswith("-"):
+        return f"{program} {subcommand}"
+    return program
+
+
+class SpaceSaving:
+    """
+    Approximate heavy hitters in fixed memory (the Space-Saving algorithm).
+
+    At most `capacity` keys are tracked. An untracked key replaces one with
+    the smallest count and inherits that count as its error, so every
+    reported count overestimates by at most its `error`. Keys are bucketed
+    by count, which makes each update O(1).
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._counts: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        self._failures: dict[str, int] = {}
+        self._buckets: dict[int, dict[str, None]] = {}
+        self._min = 0
+
+    def _unlink(self, key: str, count: int) -> None:
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+    def add(self, key: str, *, failed: bool = False) -> None:
+        count = self._counts.get(key)
+        if count is not None:
+            self._unlink(key, count)
+        elif len(self._counts) < self.capacity:
+            count = 0
+            self._errors[key] = self._failures[key] = 0
+        else:
+            count = self._min
+            victim = next(iter(self._buckets[count]))
+            self._unlink(victim, count)
+            del self._counts[victim], self._errors[victim], self._failures[victim]
+            self._errors[key] = count
+            self._failures[key] = 0
+        self._counts[key] = count + 1
+        self._buckets.setdefault(count + 1, {})[key] = None
+        self._failures[key] += failed
+        if count == 0:
+            self._min = 1
+        elif count == self._min and count not in self._buckets:
+            self._min = count + 1
+
+    def top(self, n: int) -> list[CommandCount]:
+        keys = sorted(self._counts, key=lambda key: (-self._counts[key], key))[:n]
+        return [CommandCount(key, self._counts[key], self._failures[key], self._errors[key]) for key in keys]
+
+
+def _history_query(
+    conn: sqlite3.Connection, session_ids: Sequence[str], history_filter: HistoryFilter | None
+) -> tuple[str, list[object]]:
+    return history_union_sql(
+        conn,
+        "command, exit",
+        ["session IN (SELECT value FROM json_each(?))"],
+        [json.dumps(list(session_ids))],
+        history_filter,
+    )
+
+
+def top_commands(
+    session_ids: Sequence[str],
+    *,
+    db_paths: Sequence[Path],
+    top: int = DEFAULT_TOP,
+    sketch_size: int | None = None,
+    history_filter: HistoryFilter | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> tuple[list[CommandCount], int]:
+    """
+    Return the `top` commands of the given sessions and the number of commands counted.
+
+    Without `sketch_size` the grouping runs in SQLite and the counts are
+    exact; with it, rows are streamed `batch_size` at a time into a sketch.
+    """
+    if not session_ids:
+        return [], 0
+    conn = connect_atuin_history(db_paths)
+    try:
+        union, params = _history_query(conn, session_ids, history_filter)
+        if sketch_size is None:
+            conn.create_function("command_key", 1, command_key, deterministic=True)
+            rows = conn.execute(TOP_COMMANDS_SQL.format(union=union), [*params, top]).fetchall()
+            total = rows[0][3] if rows else 0
+            return [CommandCount(key, count, failures) for key, count, failures, _ in rows], total
+        sketch = SpaceSaving(sketch_size)
+        total = 0
+        cursor = conn.execute(union, params)
+        while batch := cursor.fetchmany(batch_size):
+            for command, exit_code in batch:
+                if (key := command_key(command)) is not None:
+                    sketch.add(key, failed=bool(exit_code))
+                    total += 1
+        return sketch.top(top), total
+    finally:
+        conn.close()
@@ -0,0 +1,180 @@
+"""Consume window events written by catherd's Kitty watcher."""
+
+import dataclasses
+import json
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .config import get_xdg_cache_dir
+from .kitty import KittySnapshot, KittyWindow, get_kitty_snapshot
+
+WATCHER_FILENAME = "catherd_kitty_watcher.py"
+EVENT_LOG_NAME = "kitty_events.jsonl"
+
+
+def get_watcher_path() -> Path:
+    return Path(__file__).parent / "snippets" / WATCHER_FILENAME
+
+
+def get_event_log_path() -> Path:
+    return get_xdg_cache_dir() / EVENT_LOG_NAME
+
+
+def get_kitty_conf_path() -> Path:
+    """Return kitty.conf, honouring $KITTY_CONFIG_DIRECTORY and $XDG_CONFIG_HOME."""
+    config_dir = os.environ.get("KITTY_CONFIG_DIRECTORY")
+    if config_dir:
+        return Path(config_dir) / "kitty.conf"
+    xdg_config = os.environ.get("XDG_CONFIG_HOME", str(Path.home() / ".config"))
+    return Path(xdg_config) / "kitty" / "kitty.conf"
+
+
+def _str_or_none(value: object) -> str | None:
+    return str(value) if value is not None else None
+
+
+@dataclass(frozen=True, slots=True)
+class KittyEvent:
+    kind: str
+    window_id: str | None = None
+    tab: str | None = None
+    os_window: str | None = None
+    title: str | None = None
+    is_focused: bool | None = None
+    pid: int | None = None
+    ts: float = 0.0
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "KittyEvent":
+        return cls(
+            kind=data.get("e", ""),
+            window_id=_str_or_none(data.get("w")),
+            tab=_str_or_none(data.get("t")),
+            os_window=_str_or_none(data.get("o")),
+            title=data.get("title"),
+            is_focused=data.get("focused"),
+            pid=data.get("pid"),
+            ts=data.get("ts", 0.0),
+        )
+
+
+class KittyEventLog:
+    """
+    Incremental reader for the watcher's append-only event log.
+
+    Only bytes appended since the previous read are parsed. A rotated or
+    truncated log is reported so the caller can resync from `kitty @ ls`.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_event_log_path()
+        self._inode: int | None = None
+        self._offset = 0
+
+    def seek_end(self) -> None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._inode, self._offset = None, 0
+            return
+        self._inode, self._offset = stat.st_ino, stat.st_size
+
+    def read_events(self) -> tuple[list[KittyEvent], bool]:
+        """Return `(new_events, rotated)`."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            rotated = self._inode is not None
+            self._inode, self._offset = None, 0
+            return [], rotated
+        rotated = self._inode is not None and (stat.st_ino != self._inode or stat.st_size < self._offset)
+        if rotated or self._inode is None:
+            self._inode, self._offset = stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return [], rotated
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(stat.st_size - self._offset)
+        # Leave a partially written trailing line for the next read.
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        events: list[KittyEvent] = []
+        for line in chunk[:end].splitlines():
+            try:
+                events.append(KittyEvent.from_json(json.loads(line)))
+            except (json.JSONDecodeError, AttributeError):
+                continue
+        return events, rotated
+
+
+def apply_kitty_event(snapshot: KittySnapshot, event: KittyEvent) -> bool:
+    """
+    Apply one watcher event to `snapshot` in place.
+
+    Returns False when the event cannot be applied as a delta and the caller
+    should rebuild the snapshot from `kitty @ ls`.
+    """
+    if event.kind == "load" or event.window_id is None:
+        return False
+    if event.kind == "close":
+        snapshot.remove_window(event.window_id)
+        return True
+    if event.kind not in {"title", "focus"}:
+        return True
+    window = snapshot.window(event.window_id)
+    if window is None:
+        if event.tab is None:
+            return False
+        window = KittyWindow(id=event.window_id, tab=event.tab, title="", os_window=event.os_window)
+    changes: dict[str, Any] = {}
+    if event.title is not None:
+        changes["title"] = event.title
+    if event.is_focused is not None:
+        changes["is_focused"] = event.is_focused
+    if event.pid is not None:
+        changes["pid"] = event.pid
+    snapshot.upsert_window(dataclasses.replace(window, **changes))
+    return True
+
+
+class LiveKittyModel:
+    """
+    A window model kept current from the event log.
+
+    `kitty @ ls` runs once at start and again only when the log is rotated or
+    an event cannot be applied as a delta.
+    """
+
+    def __init__(
+        self,
+        *,
+        log: KittyEventLog | None = None,
+        loader: Callable[[], KittySnapshot | None] = get_kitty_snapshot,
+    ) -> None:
+        self.log = log or KittyEventLog()
+        self.loader = loader
+        self.snapshot: KittySnapshot | None = None
+        self.resyncs = 0
+
+    def _resync(self) -> None:
+        self.log.seek_end()
+        self.snapshot = self.loader()
+        self.resyncs += 1
+
+    def refresh(self) -> list[KittyEvent]:
+        """Bring the model up to date and return the events applied."""
+        if self.snapshot is None:
+            self._resync()
+            return []
+        events, rotated = self.log.read_events()
+        if rotated:
+            self._resync()
+            return events
+        for event in events:
+            if self.snapshot is None or not apply_kitty_event(self.snapshot, event):
+                self._resync()
+                break
+        return events
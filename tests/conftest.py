@@ -1,3 +1,10 @@
+import json
+import socket
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
 import pytest
 from click.testing import CliRunner
 
@@ -26,6 +33,17 @@ def pytest_runtest_logreport(report: pytest.TestReport) -> None:
         report.sections = new_sections
 
 
+@pytest.fixture(autouse=True)
+def isolated_xdg_dirs(monkeypatch, tmp_path_factory):
+    """Keep tests away from the real catherd config, cache and Atuin data."""
+    base = tmp_path_factory.mktemp("xdg")
+    for name in ("XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_DATA_HOME"):
+        monkeypatch.setenv(name, str(base / name.lower()))
+    # Session files are keyed by the kitty instance the tests run in.
+    for name in ("KITTY_LISTEN_ON", "KITTY_PID"):
+        monkeypatch.delenv(name, raising=False)
+
+
 @pytest.fixture
 def runner():
     runner = CliRunner()
@@ -46,3 +64,157 @@ def runner():
 
     runner.invoke = invoke
     return runner
+
+
+class FakeKittyServer:
+    """A kitty remote-control socket that answers with `handler(message)`."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.messages = []
+        self.connections = 0
+        self._dir = tempfile.TemporaryDirectory()  # short path: AF_UNIX paths are limited
+        self.path = Path(self._dir.name) / "kitty.sock"
+        self.address = f"unix:{self.path}"
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(str(self.path))
+        self._sock.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        buffer = b""
+        with conn:
+            while True:
+                try:
+                    chunk = conn.recv(65536)
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                buffer += chunk
+                while (end := buffer.find(b"\x1b\\")) != -1:
+                    body = buffer[len(b"\x1bP@kitty-cmd") : end]
+                    buffer = buffer[end + 2 :]
+                    message = json.loads(body)
+                    self.messages.append(message)
+                    response = self.handler(message)
+                    if response is not None:
+                        conn.sendall(b"\x1bP@kitty-cmd" + json.dumps(response).encode() + b"\x1b\\")
+
+    def close(self):
+        self._sock.close()
+        self._dir.cleanup()
+
+
+@pytest.fixture
+def fake_kitty_server():
+    servers = []
+
+    def start(handler=lambda _message: {"ok": True}):
+        server = FakeKittyServer(handler)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+class HistoryDB:
+    """
+    A scratch Atuin history DB; every write commits, so readers see it at once.
+
+    Columns a row leaves out get a default, so each test only names what it checks.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS history ("
+        "id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))), timestamp INTEGER DEFAULT 1, "
+        "duration INTEGER DEFAULT 1, exit INTEGER DEFAULT 0, command TEXT, cwd TEXT DEFAULT '/work', "
+        "session TEXT DEFAULT 's1', hostname TEXT DEFAULT 'h:u', deleted_at INTEGER)"
+    )
+
+    def __init__(self, path, *, index=False):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.con = sqlite3.connect(path)
+        self.con.execute(self.SCHEMA)
+        if index:
+            self.con.execute("CREATE INDEX IF NOT EXISTS idx_session_ts ON history (session, timestamp)")
+        self.con.commit()
+
+    def add(self, command, **columns):
+        """Insert one row and return its rowid."""
+        values = {"command": command, **columns}
+        cur = self.con.execute(
+            f"INSERT INTO history ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",  # noqa: S608
+            list(values.values()),
+        )
+        self.con.commit()
+        return cur.lastrowid
+
+    def add_rows(self, rows, columns=("session", "command", "timestamp")):
+        self.con.executemany(
+            f"INSERT INTO history ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",  # noqa: S608
+            rows,
+        )
+        self.con.commit()
+        return self
+
+    def close(self):
+        self.con.close()
+
+
+@pytest.fixture
+def history_db(tmp_path):
+    """Return a factory for `HistoryDB`s, by default `history.db` in `tmp_path`."""
+    dbs = []
+
+    def make(path=None, rows=(), *, columns=("session", "command", "timestamp"), index=False):
+        db = HistoryDB(path or tmp_path / "history.db", index=index).add_rows(rows, columns)
+        dbs.append(db)
+        return db
+
+    yield make
+    for db in dbs:
+        db.close()
+
+
+@pytest.fixture
+def started_hooks(monkeypatch):
+    """Stub out the hook runner's `Popen` and collect `(command, env)` for every hook it starts."""
+    started = []
+
+    class FakePopen:
+        def __init__(self, command, **kwargs):
+            started.append((command, kwargs["env"]))
+
+        def poll(self):  # noqa: PLR6301
+            return 0
+
+    monkeypatch.setattr("catherd.hooks.subprocess.Popen", FakePopen)
+    return started
+
+
+@pytest.fixture
+def write_proc():
+    """Return `write(root, {pid: (comm, ppid, utime, stime, start, rss)})`, laying out a fake `/proc`."""
+
+    def write(root, processes):
+        for pid, (comm, ppid, utime, stime, start, rss) in processes.items():
+            # Fields 3..24 of proc(5): state, ppid, 9 others, utime, stime, 6 others, starttime, vsize, rss.
+            fields = ["S", ppid, *[0] * 9, utime, stime, *[0] * 6, start, 0, rss, 0, 0]
+            (root / str(pid)).mkdir(parents=True, exist_ok=True)
+            (root / str(pid) / "stat").write_text(f"{pid} ({comm}) {' '.join(map(str, fields))}\n")
+
+    return write
@@ -0,0 +1,113 @@
+from catherd import activity
+from catherd.activity import (
+    RunningCommand,
+    WindowActivity,
+    collect_activity,
+    collect_recent_activity,
+    collect_running,
+    format_elapsed,
+    lookup_last_commands,
+)
+from catherd.atuin import HistoryFilter
+from catherd.kitty import KittyWindow
+from catherd.registry import LineageEntry
+
+
+def test_collect_activity(monkeypatch):
+    calls = []
+
+    def fake_lookup(session_ids, **kwargs):
+        calls.append((list(session_ids), kwargs))
+        return {"s1": "ls", "s2": "(no command)"}
+
+    monkeypatch.setattr(activity, "read_session_registry", lambda: {"1": "s1", "2": "s2"})
+    monkeypatch.setattr(
+        activity, "read_session_lineage", lambda: {"1": [LineageEntry("s0"), LineageEntry("s1")]}
+    )
+    monkeypatch.setattr(activity, "lookup_last_commands", fake_lookup)
+    windows = [
+        KittyWindow(id="1", tab="t", title="a"),
+        KittyWindow(id="2", tab="t", title="b"),
+        KittyWindow(id="3", tab=None, title="c"),
+    ]
+    rows = collect_activity(windows, db_paths=["x"])
+    assert rows == [
+        WindowActivity("1", "t", "a", "s1", "ls"),
+        WindowActivity("2", "t", "b", "s2", "(no command)"),
+        WindowActivity("3", None, "c", None, "(no session info)"),
+    ]
+    assert len(calls) == 1
+    assert calls[0][0] == ["s1", "s2"]
+    assert calls[0][1]["db_paths"] == ["x"]
+    assert calls[0][1]["lineage"] == {"s1": ["s0"]}
+
+
+def test_lookup_last_commands_uses_index_unless_filtered(monkeypatch):
+    monkeypatch.setattr(
+        activity, "get_indexed_last_commands", lambda ids, **_kwargs: dict.fromkeys(ids, "idx")
+    )
+    monkeypatch.setattr(
+        activity, "get_last_commands_for_atuin_sessions", lambda ids, **_kwargs: dict.fromkeys(ids, "raw")
+    )
+    assert lookup_last_commands(["s"]) == {"s": "idx"}
+    assert lookup_last_commands(["s"], history_filter=HistoryFilter()) == {"s": "idx"}
+    assert lookup_last_commands(["s"], history_filter=HistoryFilter(hostname="h")) == {"s": "raw"}
+
+
+def test_collect_running(monkeypatch):
+    calls = []
+
+    def fake_running(session_ids, **_kwargs):
+        calls.append(list(session_ids))
+        return {"s1": ("make test", 1_000_000_000)}
+
+    monkeypatch.setattr(activity, "get_running_commands_for_atuin_sessions", fake_running)
+    windows = [
+        KittyWindow(id="1", tab="t", title="a", foreground_command="make test"),
+        KittyWindow(id="2", tab="t", title="b", foreground_command="vim x"),
+        KittyWindow(id="3", tab="t", title="c"),
+    ]
+    running = collect_running(windows, {"1": "s1", "2": None, "3": "s3"}, now=91_000_000_000)
+    assert running == {"1": RunningCommand("make test", 90.0), "2": RunningCommand("vim x")}
+    assert calls == [["s1"]]
+
+
+def test_format_elapsed():
+    assert format_elapsed(None) == "?"
+    assert format_elapsed(5.7) == "5s"
+    assert format_elapsed(133) == "2m13s"
+    assert format_elapsed(3 * 3600 + 120) == "3h02m"
+
+
+def test_collect_recent_activity(monkeypatch):
+    calls = []
+
+    def fake_recent(session_windows, **kwargs):
+        calls.append((session_windows, kwargs))
+        return [("3", "make", 9)]
+
+    monkeypatch.setattr(activity, "read_session_registry", lambda: {"1": "s1", "3": "s3", "4": "s4"})
+    monkeypatch.setattr(
+        activity, "read_session_lineage", lambda: {"3": [LineageEntry("s0"), LineageEntry("s3")]}
+    )
+    monkeypatch.setattr(activity, "lookup_recent_windows", fake_recent)
+    windows = [KittyWindow(id=str(i), tab="t", title=f"w{i}") for i in range(1, 5)]
+    rows = collect_recent_activity(windows, limit=3, oldest=True)
+    assert rows == [
+        WindowActivity("3", "t", "w3", "s3", "make"),
+        WindowActivity("1", "t", "w1", "s1", "(no command)"),
+        WindowActivity("2", "t", "w2", None, "(no session info)"),
+    ]
+    assert calls[0][0] == {"s1": "1", "s3": "3", "s0": "3", "s4": "4"}
+    assert calls[0][1]["limit"] == 3
+    assert calls[0][1]["oldest"] is True
+
+    monkeypatch.setattr(activity, "lookup_recent_windows", lambda *_args, **_kwargs: None)
+    assert collect_recent_activity(windows) is None
+
+
+def test_lookup_recent_windows_uses_index_unless_filtered(monkeypatch):
+    monkeypatch.setattr(activity, "get_indexed_recent_windows", lambda *_args, **_kwargs: "idx")
+    monkeypatch.setattr(activity, "get_recent_windows_for_atuin_sessions", lambda *_args, **_kwargs: "raw")
+    assert activity.lookup_recent_windows({}, limit=1) == "idx"
+    assert activity.lookup_recent_windows({}, limit=1, history_filter=HistoryFilter(hostname="h")) == "raw"
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from catherd import api
+from catherd.activity import WindowActivity
+from catherd.config import get_config_file, get_session_file
+from catherd.kitty import KittyError
+
+LS = [
+    {
+        "id": 1,
+        "tabs": [{"id": 2, "windows": [{"id": 3, "title": "zsh"}, {"id": 4, "title": "vim"}]}],
+    }
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    api.clear_cache()
+    yield
+    api.clear_cache()
+
+
+@pytest.fixture
+def history(history_db):
+    get_session_file("3").write_text("s3\n")
+    return history_db(
+        rows=[("s3", "make test", 10, "h:u"), ("s3", "ls", 5, "h:u")],
+        columns=("session", "command", "timestamp", "hostname"),
+    ).path
+
+
+def test_snapshot_from_ls_data(history):
+    rows = api.snapshot(ls_data=LS, db_paths=[history])
+    assert rows == [
+        WindowActivity("3", "2", "zsh", "s3", "make test"),
+        WindowActivity("4", "2", "vim", None, "(no session info)"),
+    ]
+
+
+def test_snapshot_caches_kitty_ls(monkeypatch, history):
+    calls = []
+
+    def fake_ls(**kwargs):
+        calls.append(kwargs)
+        return LS
+
+    monkeypatch.setattr(api, "run_kitty_ls", fake_ls)
+    first = api.snapshot(db_paths=[history])
+    assert api.snapshot(db_paths=[history]) == first
+    assert calls == [{"timeout": api.LS_TIMEOUT}]
+    api.snapshot(db_paths=[history], ttl=0)
+    assert len(calls) == 2
+
+
+def test_cache_is_bounded_and_caches_db_paths(monkeypatch, history):
+    resolved = []
+
+    def fake_paths(paths, **_kwargs):
+        resolved.append(paths)
+        return [history]
+
+    monkeypatch.setattr(api, "get_atuin_history_db_paths", fake_paths)
+    monkeypatch.setattr(api, "MAX_CACHE_ENTRIES", 8)
+    for window in range(20):
+        get_session_file(str(window)).write_text(f"s{window}\n")
+    for window in range(20):
+        api.last_command(window)
+    assert resolved == [()]
+    assert len(api._cache) == 8
+
+
+def test_snapshot_raises_kitty_errors(monkeypatch):
+    def fail(**_kwargs):
+        msg = "kitty is not running"
+        raise KittyError(msg)
+
+    monkeypatch.setattr(api, "run_kitty_ls", fail)
+    with pytest.raises(KittyError):
+        api.snapshot()
+
+
+def test_last_command(history):
+    assert api.last_command(3, db_paths=[history]) == "make test"
+    assert api.last_command("4", db_paths=[history]) is None
+
+
+def test_last_command_never_prints(capsys, tmp_path):
+    get_config_file().write_text("not = [valid")
+    get_session_file("3").write_text("s3\n")
+    assert api.last_command("3", db_paths=[tmp_path / "missing.db"]) == "(no history db)"
+    assert api.snapshot(ls_data=LS)[0].last_command == "(no history db)"
+    captured = capsys.readouterr()
+    assert not captured.out
+    assert not captured.err
+
+
+def test_async_variants(history):
+    rows = asyncio.run(api.snapshot_async(ls_data=LS, db_paths=[history]))
+    assert rows[0].last_command == "make test"
+    assert asyncio.run(api.last_command_async("3", db_paths=[history])) == "make test"
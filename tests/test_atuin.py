@@ -1,6 +1,22 @@
 import sqlite3
 
-from catherd.atuin import get_atuin_history_db_path, get_last_command_for_atuin_session
+import pytest
+
+from catherd.atuin import (
+    HistoryFilter,
+    connect_atuin_history,
+    get_atuin_history_db_path,
+    get_atuin_history_db_paths,
+    get_last_command_for_atuin_session,
+    get_last_commands_for_atuin_sessions,
+    get_recent_windows_for_atuin_sessions,
+    get_running_commands_for_atuin_sessions,
+    history_union_sql,
+)
+from catherd.config import get_config_file
+from catherd.deadline import TIMED_OUT, Deadline
+
+HOST_COLUMNS = ("session", "command", "timestamp", "hostname")
 
 
 def test_atuin_history_db_path(monkeypatch, tmp_path):
@@ -41,3 +57,194 @@ def test_get_last_command_db_error(monkeypatch, tmp_path):
     # Should hit the except block and return "(sqlite error)"
     result = get_last_command_for_atuin_session("sess", verbose=True)
     assert result == "(sqlite error)"
+
+
+def test_history_db_paths_precedence(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    assert get_atuin_history_db_paths() == [get_atuin_history_db_path()]
+
+    config = tmp_path / "config" / "catherd" / "config.toml"
+    config.write_text('history_dbs = ["/data/a.db", "/data/b.db", "/data/a.db"]\n')
+    assert [str(p) for p in get_atuin_history_db_paths()] == ["/data/a.db", "/data/b.db"]
+    assert [str(p) for p in get_atuin_history_db_paths(["/x.db"])] == ["/x.db"]
+
+
+def test_history_dbs_must_be_a_list_of_paths(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    config = get_config_file()
+    for value in ['"~/x.db"', "[1, 2]"]:
+        config.write_text(f"history_dbs = {value}\n")
+        assert get_atuin_history_db_paths() == [get_atuin_history_db_path()]
+        assert "[warning] Ignoring history_dbs = " in capsys.readouterr().err
+    assert get_atuin_history_db_paths(quiet=True) == [get_atuin_history_db_path()]
+    assert not capsys.readouterr().err
+
+
+def test_last_command_merges_attached_dbs(tmp_path, history_db):
+    main = history_db(tmp_path / "main.db", [("s1", "old", 10, "laptop:me")], columns=HOST_COLUMNS).path
+    synced = history_db(
+        tmp_path / "synced.db", [("s1", "newer", 20, "desktop:me")], columns=HOST_COLUMNS
+    ).path
+    archive = history_db(
+        tmp_path / "archive.db", [("s2", "other", 30, "laptop:me")], columns=HOST_COLUMNS
+    ).path
+    paths = [main, synced, archive]
+
+    assert get_last_command_for_atuin_session("s1", db_paths=paths) == "newer"
+    assert get_last_command_for_atuin_session("s2", db_paths=paths) == "other"
+    assert (
+        get_last_command_for_atuin_session(
+            "s1", db_paths=paths, history_filter=HistoryFilter(hostname="laptop")
+        )
+        == "old"
+    )
+    assert (
+        get_last_command_for_atuin_session(
+            "s1", db_paths=paths, history_filter=HistoryFilter(hostname="desktop:me")
+        )
+        == "newer"
+    )
+    assert (
+        get_last_command_for_atuin_session("s1", db_paths=paths, history_filter=HistoryFilter(until=20))
+        == "old"
+    )
+    assert (
+        get_last_command_for_atuin_session("s1", db_paths=paths, history_filter=HistoryFilter(since=21))
+        == "(no command)"
+    )
+
+
+def test_last_command_skips_missing_dbs(tmp_path, capsys, history_db):
+    db = history_db(tmp_path / "a.db", [("s", "cmd", 1, "h:u")], columns=HOST_COLUMNS).path
+    missing = tmp_path / "missing.db"
+    assert get_last_command_for_atuin_session("s", verbose=True, db_paths=[missing, db]) == "cmd"
+    assert "not found" in capsys.readouterr().out
+
+
+def test_history_union_sql_pushes_filters_into_each_branch(tmp_path, history_db):
+    paths = [history_db(tmp_path / f"{n}.db").path for n in "abc"]
+    conn = connect_atuin_history(paths)
+    try:
+        sql, params = history_union_sql(
+            conn, "command", ["session = ?"], ["s"], HistoryFilter(hostname="web_1", since=5)
+        )
+        assert sql.count("UNION ALL") == 2
+        assert sql.count("WHERE session = ? AND hostname LIKE ?") == 3
+        assert params == ["s", "web\\_1:%", 5] * 3
+        assert conn.execute(sql, params).fetchall() == []
+    finally:
+        conn.close()
+
+
+def test_connection_is_read_only(tmp_path, history_db):
+    db = history_db(tmp_path / "a.db").path
+    conn = connect_atuin_history([db])
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("INSERT INTO history (session) VALUES ('s')")
+    finally:
+        conn.close()
+
+
+def test_last_commands_batched(tmp_path, history_db):
+    a = history_db(
+        tmp_path / "a.db", [("s1", "first", 1, "h:u"), ("s1", "second", 2, "h:u")], columns=HOST_COLUMNS
+    ).path
+    b = history_db(
+        tmp_path / "b.db", [("s2", "other", 5, "h:u"), ("s1", "third", 3, "x:u")], columns=HOST_COLUMNS
+    ).path
+    assert get_last_commands_for_atuin_sessions(["s1", "s2", "s3", "s1"], db_paths=[a, b]) == {
+        "s1": "third",
+        "s2": "other",
+        "s3": "(no command)",
+    }
+    assert get_last_commands_for_atuin_sessions(
+        ["s1"], db_paths=[a, b], history_filter=HistoryFilter(hostname="h")
+    ) == {"s1": "second"}
+    assert get_last_commands_for_atuin_sessions([], db_paths=[a]) == {}
+
+
+def test_last_commands_batched_errors(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path))
+    assert get_last_commands_for_atuin_sessions(["s"]) == {"s": "(no history db)"}
+    bad = tmp_path / "bad.db"
+    bad.write_text("NOTADB")
+    assert get_last_commands_for_atuin_sessions(["s"], verbose=True, db_paths=[bad]) == {
+        "s": "(sqlite error)"
+    }
+    assert "SQLite error" in capsys.readouterr().out
+
+
+def test_expired_deadline_marks_results_timed_out(tmp_path, history_db):
+    db = history_db(tmp_path / "history.db", [("s1", "ls", 1, "h:u")], columns=HOST_COLUMNS).path
+    deadline = Deadline(0)
+    assert get_last_command_for_atuin_session("s1", db_paths=[db], deadline=deadline) == TIMED_OUT
+    assert get_last_commands_for_atuin_sessions(["s1", "s2"], db_paths=[db], deadline=deadline) == {
+        "s1": TIMED_OUT,
+        "s2": TIMED_OUT,
+    }
+    assert get_last_command_for_atuin_session("s1", db_paths=[db], deadline=Deadline(None)) == "ls"
+
+
+def test_running_commands_are_unfinished_latest_rows(tmp_path):
+    db = tmp_path / "history.db"
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE history (session TEXT, command TEXT, timestamp INTEGER, duration INTEGER)")
+    con.executemany(
+        "INSERT INTO history VALUES (?, ?, ?, ?)",
+        [
+            ("busy", "ls", 1, 10),
+            ("busy", "make test", 2, -1),
+            ("idle", "crashed", 1, -1),
+            ("idle", "pwd", 2, 5),
+        ],
+    )
+    con.commit()
+    con.close()
+    assert get_running_commands_for_atuin_sessions(["busy", "idle", "gone"], db_paths=[db]) == {
+        "busy": ("make test", 2)
+    }
+    assert get_running_commands_for_atuin_sessions([], db_paths=[db]) == {}
+    assert get_running_commands_for_atuin_sessions(["busy"], db_paths=[tmp_path / "missing.db"]) == {}
+
+
+def test_last_commands_follow_lineage(tmp_path, history_db):
+    db = history_db(
+        tmp_path / "a.db",
+        [("outer", "vim", 1, "h:u"), ("nested", "make", 2, "h:u"), ("outer", "git push", 3, "h:u")],
+        columns=HOST_COLUMNS,
+    ).path
+    lineage = {"nested": ["outer"], "fresh": ["nested", "outer"]}
+    assert get_last_commands_for_atuin_sessions(["nested", "fresh"], db_paths=[db], lineage=lineage) == {
+        "nested": "git push",
+        "fresh": "git push",
+    }
+    assert get_last_commands_for_atuin_sessions(["nested"], db_paths=[db]) == {"nested": "make"}
+
+
+def test_recent_windows_ranked_in_sqlite(tmp_path, history_db):
+    a = history_db(
+        tmp_path / "a.db",
+        [("s1", "vim", 1, "h:u"), ("s2", "make", 5, "h:u"), ("s3", "ls", 3, "x:u"), ("s1b", "git", 4, "h:u")],
+        columns=HOST_COLUMNS,
+    ).path
+    session_windows = {"s1": "1", "s1b": "1", "s2": "2", "s3": "3", "s4": "4"}
+    assert get_recent_windows_for_atuin_sessions(session_windows, limit=2, db_paths=[a]) == [
+        ("2", "make", 5),
+        ("1", "git", 4),
+    ]
+    assert get_recent_windows_for_atuin_sessions(session_windows, limit=1, oldest=True, db_paths=[a]) == [
+        ("3", "ls", 3)
+    ]
+    filtered = get_recent_windows_for_atuin_sessions(
+        session_windows, limit=5, db_paths=[a], history_filter=HistoryFilter(hostname="h")
+    )
+    assert [window for window, _, _ in filtered] == ["2", "1"]
+    assert get_recent_windows_for_atuin_sessions({}, limit=1, db_paths=[a]) == []
+    assert (
+        get_recent_windows_for_atuin_sessions(session_windows, limit=1, db_paths=[tmp_path / "no.db"]) is None
+    )
+    bad = tmp_path / "bad.db"
+    bad.write_text("NOTADB")
+    assert get_recent_windows_for_atuin_sessions(session_windows, limit=1, db_paths=[bad]) is None
@@ -1,14 +1,22 @@
+import re
 from unittest.mock import patch
 
 from click.testing import CliRunner
 
 import catherd.__main__  # noqa: F401
 from catherd import cli
+from catherd.activity import RunningCommand, WindowActivity
 from catherd.cli import (
     _collect_kitty_session_diagnostics,
     print_kitty_session_diagnostics,
 )
-from catherd.kitty import KittyWindow
+from catherd.config import get_config_file, get_xdg_cache_dir
+from catherd.deadline import TIMED_OUT
+from catherd.kitty import KittySnapshot, KittyWindow
+from catherd.perf import PerfFinding
+from catherd.proctree import LoadSampler
+from catherd.registry import LINEAGE_DIRNAME, LineageEntry
+from catherd.scrollback import ScrollbackMatches
 
 
 def test_main_entrypoint_exits_zero():
@@ -18,19 +26,62 @@ def test_main_entrypoint_exits_zero():
 
 
 @patch("catherd.cli.get_kitty_windows")
-@patch("catherd.cli.get_atuin_session_for_window")
-@patch("catherd.cli.get_last_command_for_atuin_session")
-def test_show_prints_commands(mock_last, mock_sess, mock_win):
+@patch("catherd.activity.read_session_registry")
+@patch("catherd.activity.lookup_last_commands")
+def test_show_prints_commands(mock_last, mock_registry, mock_win):
     mock_win.return_value = [
         KittyWindow(id="a", tab="t1", title="foo"),
         KittyWindow(id="b", tab="t2", title="bar"),
     ]
-    mock_sess.side_effect = ["sessA", "sessB"]
-    mock_last.side_effect = ["cmdA", "cmdB"]
+    mock_registry.return_value = {"a": "sessA", "b": "sessB"}
+    mock_last.return_value = {"sessA": "cmdA", "sessB": "cmdB"}
     result = CliRunner().invoke(cli.main, ["show"])
     assert "Kitty WinID" in result.output
     assert "cmdA" in result.output
     assert "cmdB" in result.output
+    mock_last.assert_called_once()
+
+
+@patch("catherd.cli.get_kitty_snapshot")
+@patch("catherd.activity.read_session_registry", return_value={})
+def test_show_group_by_tab(mock_registry, mock_snap):
+    _ = mock_registry
+    mock_snap.return_value = KittySnapshot.from_ls([
+        {
+            "id": 1,
+            "tabs": [
+                {"id": 1, "title": "one", "windows": [{"id": 11, "title": "a"}, {"id": 12, "title": "b"}]},
+                {"id": 2, "title": "two", "windows": [{"id": 21, "title": "c"}]},
+            ],
+        }
+    ])
+    out = CliRunner().invoke(cli.main, ["show", "--group-by", "tab"]).output
+    lines = out.splitlines()
+    assert lines.index("[Tab 1: one]") < lines.index("[Tab 2: two]")
+    assert sum("no session info" in line for line in lines) == 3
+
+
+@patch("catherd.cli.get_kitty_snapshot", return_value=None)
+def test_show_group_by_none_snapshot(mock_snap):
+    _ = mock_snap
+    result = CliRunner().invoke(cli.main, ["show", "--group-by", "os-window"])
+    assert "Could not get Kitty windows" in result.output
+
+
+@patch("catherd.cli.get_kitty_windows", return_value=[KittyWindow(id="a", tab="t1", title="foo")])
+@patch("catherd.activity.read_session_registry", return_value={"a": "sessA"})
+@patch("catherd.activity.get_last_commands_for_atuin_sessions", return_value={"sessA": "cmdA"})
+def test_show_history_db_options(mock_last, mock_registry, mock_win, tmp_path):
+    _ = mock_registry, mock_win
+    args = ["show", "--history-db", str(tmp_path / "a.db"), "--history-db", str(tmp_path / "b.db")]
+    args += ["--hostname", "laptop", "--since", "1970-01-02"]
+    result = CliRunner().invoke(cli.main, args)
+    assert "cmdA" in result.output
+    kwargs = mock_last.call_args.kwargs
+    assert kwargs["db_paths"] == [tmp_path / "a.db", tmp_path / "b.db"]
+    assert kwargs["history_filter"].hostname == "laptop"
+    assert kwargs["history_filter"].since > 0
+    assert kwargs["history_filter"].until is None
 
 
 @patch("catherd.cli.get_kitty_windows", return_value=[])
@@ -72,15 +123,25 @@ def test_doctor_no_windows(mock_sync, mock_win):
     assert "No Kitty windows found" in out
 
 
+@patch("catherd.cli.get_kitty_windows", return_value=None)
+def test_doctor_compacts_session_lineage(mock_win):
+    _ = mock_win
+    lineage_dir = get_xdg_cache_dir() / LINEAGE_DIRNAME
+    lineage_dir.mkdir(parents=True)
+    (lineage_dir / "pid1_1").write_text("".join(f"s{i} 1700000000 1\n" for i in range(500)))
+    out = CliRunner().invoke(cli.main, ["doctor"]).output
+    assert "[INFO] Compacted 1 session lineage file(s)." in out
+
+
 @patch("catherd.cli.get_kitty_windows")
 def test_doctor_basic(mock_win):
     mock_win.return_value = [KittyWindow(id="X", tab="T", title="Y")]
     with (
         patch("catherd.cli.get_session_file") as gsf,
-        patch("catherd.cli.get_last_command_for_atuin_session") as glc,
+        patch("catherd.cli.lookup_last_commands") as llc,
     ):
         gsf.return_value.exists.return_value = False
-        glc.return_value = None
+        llc.return_value = {}
         out = CliRunner().invoke(cli.main, ["doctor"]).output
         assert "sync snippet" in out or "Add this to your shell rc file" in out
 
@@ -110,6 +171,8 @@ def test_show_env_verbose(monkeypatch):
     class FakeWin:
         def __init__(self):
             self.id = "w"
+            self.kitty_id = "w"
+            self.instance = None
             self.tab = "t"
             self.title = "tit"
 
@@ -135,7 +198,7 @@ def test__collect_kitty_session_diagnostics(monkeypatch, tmp_path):
     session_file = tmp_path / "atuin_kitty_id"
     session_file.write_text("sessid")
     monkeypatch.setattr(cli, "get_session_file", lambda *_args, **_kwargs: session_file)
-    monkeypatch.setattr(cli, "get_last_command_for_atuin_session", lambda *_args, **_kwargs: "cmd")
+    monkeypatch.setattr(cli, "lookup_last_commands", lambda ids, **_kwargs: dict.fromkeys(ids, "cmd"))
     ok, missing, corrupt, missing_cmd = _collect_kitty_session_diagnostics([win], verbose=True)
     assert ok or missing or corrupt or missing_cmd
 
@@ -258,28 +321,18 @@ def test__collect_kitty_session_diagnostics_branches(tmp_path, monkeypatch):
     w_nocommand = KittyWindow(id="c", tab=None, title="")
     w_ok = KittyWindow(id="d", tab=None, title="")
 
-    # Make get_session_file behave differently per ID
-    def fake_session_file(window_id):
-        p = tmp_path / f"atuin_kitty_{window_id}"
-        if window_id == "b":
-            p.write_text("")  # corrupt
-        elif window_id == "c":
-            p.write_text("sess_c")
-        elif window_id == "d":
-            p.write_text("sess_d")
-        return p
-
+    # Session files for every window but "a"; "b" is corrupt
     monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
-    monkeypatch.setattr(cli, "get_session_file", fake_session_file)
+    (tmp_path / "catherd").mkdir()
+    for window_id, content in (("b", ""), ("c", "sess_c"), ("d", "sess_d")):
+        (tmp_path / "catherd" / f"atuin_kitty_{window_id}").write_text(content)
 
-    # get_last_command_for_atuin_session returns error for "c", normal for "d"
-    def fake_last(session_id, *, verbose=False):
+    # lookup_last_commands returns error for "c", normal for "d"
+    def fake_last(session_ids, *, verbose=False, **_kwargs):
         # only the "c" session errors
-        if session_id == "sess_c" and verbose:
-            return "(atuin error)"
-        return "cmd"
+        return {sid: "(atuin error)" if sid == "sess_c" and verbose else "cmd" for sid in session_ids}
 
-    monkeypatch.setattr(cli, "get_last_command_for_atuin_session", fake_last)
+    monkeypatch.setattr(cli, "lookup_last_commands", fake_last)
 
     ok, missing, corrupt, missing_cmd = _collect_kitty_session_diagnostics(
         [w_no_file, w_corrupt, w_nocommand, w_ok], verbose=True
@@ -290,3 +343,341 @@ def test__collect_kitty_session_diagnostics_branches(tmp_path, monkeypatch):
     assert missing_cmd[0][0] == w_nocommand
     assert len(ok) == 1
     assert ok[0][0] == w_ok
+
+
+def test_record_and_replay(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: [KittyWindow(id="1", tab="t", title="w")])
+    monkeypatch.setattr(
+        cli, "collect_activity", lambda _windows, **_kwargs: [WindowActivity("1", "t", "w", "s", "make test")]
+    )
+    monkeypatch.setattr(cli.time, "sleep", lambda _s: None)
+    result = CliRunner().invoke(cli.main, ["record", "--count", "2", "-v"])
+    assert "Sample 1: 1 row(s) written" in result.output
+    assert "Sample 2: 0 row(s) written" in result.output
+
+    result = CliRunner().invoke(cli.main, ["replay", "--at", "2999-01-01"])
+    assert "make test" in result.output
+    result = CliRunner().invoke(cli.main, ["replay", "--at", "2000-01-01"])
+    assert "Nothing was recorded" in result.output
+
+
+def test_record_skips_failed_samples(monkeypatch):
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: None)
+    result = CliRunner().invoke(cli.main, ["record", "--count", "1", "-v"])
+    assert result.exit_code == 0
+    assert "Sample" not in result.output
+
+
+def test_doctor_perf_prints_scored_report(monkeypatch):
+    findings = [
+        PerfFinding("kitty @ ls", "ok", "12 ms for 3 window(s)"),
+        PerfFinding("stale session files", "warn", "2 file(s) for closed windows", "Remove them"),
+    ]
+    deadlines = []
+
+    def fake_checks(_paths, *, deadline):
+        deadlines.append(deadline)
+        return findings
+
+    monkeypatch.setattr(cli, "run_perf_checks", fake_checks)
+    out = CliRunner().invoke(cli.main, ["doctor", "--perf", "--deadline", "250"]).output
+    assert deadlines[0].ms == 250
+    assert "[OK] kitty @ ls: 12 ms" in out
+    assert "[WARN] stale session files" in out
+    assert "-> Remove them" in out
+    assert "Performance score: 90/100" in out
+
+
+def test_show_shared_cache_and_timings(monkeypatch):
+    calls = []
+
+    def fake_ls(**_kwargs):
+        calls.append(1)
+        return [{"id": 1, "tabs": [{"id": 2, "windows": [{"id": 3, "title": "zsh"}]}]}]
+
+    monkeypatch.setattr(cli, "run_kitty_ls", fake_ls)
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda windows, **_kwargs: [
+            WindowActivity(win.id, win.tab, win.title, "s", "make") for win in windows
+        ],
+    )
+    runner = CliRunner(mix_stderr=False)
+    first = runner.invoke(cli.main, ["show", "--cache-ttl", "60", "--timings"])
+    second = runner.invoke(cli.main, ["show", "--cache-ttl", "60", "--timings"])
+    assert "make" in second.stdout
+    assert len(calls) == 1
+    assert "[timings] cache miss: 2" in first.stderr
+    assert "[timings] cache hit: 2" in second.stderr
+
+
+def test_show_ignores_invalid_cache_ttl_in_config(monkeypatch):
+    get_config_file().write_text('cache_ttl = "fast"\n', encoding="utf-8")
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: [KittyWindow(id="1", tab="t", title="a")])
+    monkeypatch.setattr(
+        cli, "collect_activity", lambda _windows, **_kwargs: [WindowActivity("1", "t", "a", "s", "make")]
+    )
+    result = CliRunner(mix_stderr=False).invoke(cli.main, ["show"])
+    assert result.exit_code == 0
+    assert "make" in result.stdout
+    assert "[warning] Ignoring cache_ttl = 'fast'" in result.stderr
+
+
+def test_show_reports_deadline_partial_results(monkeypatch):
+    seen = {}
+
+    def fake_windows(**kwargs):
+        seen.update(kwargs)
+        return [KittyWindow(id="1", tab="t", title="a")]
+
+    monkeypatch.setattr(cli, "get_kitty_windows", fake_windows)
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda windows, **_kwargs: [
+            WindowActivity(win.id, win.tab, win.title, "s", TIMED_OUT) for win in windows
+        ],
+    )
+    result = CliRunner(mix_stderr=False).invoke(cli.main, ["show", "--deadline", "200"])
+    assert 0 < seen["timeout"] <= 0.2
+    assert TIMED_OUT in result.stdout
+    assert "Deadline of 200 ms reached" in result.stderr
+    result = CliRunner(mix_stderr=False).invoke(cli.main, ["show", "--deadline", "0"])
+    assert seen["timeout"] is None
+
+
+def test_show_running_column(monkeypatch):
+    monkeypatch.setattr(
+        cli,
+        "get_kitty_windows",
+        lambda **_kwargs: [
+            KittyWindow(id="1", tab="t", title="busy", foreground_command="make test"),
+            KittyWindow(id="2", tab="t", title="idle"),
+        ],
+    )
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda windows, **_kwargs: [
+            WindowActivity(win.id, win.tab, win.title, f"s{win.id}", "ls") for win in windows
+        ],
+    )
+    seen = {}
+
+    def fake_running(_windows, sessions, **_kwargs):
+        seen["sessions"] = sessions
+        return {"1": RunningCommand("make test", 133)}
+
+    monkeypatch.setattr(cli, "collect_running", fake_running)
+    out = CliRunner().invoke(cli.main, ["show", "--running"]).output
+    lines = out.splitlines()
+    assert "| Running " in lines[0]
+    assert "| make test (2m13s)" in lines[2]
+    assert lines[3].endswith("|                                | ls")
+    assert seen["sessions"] == {"1": "s1", "2": "s2"}
+    assert "Running" not in CliRunner().invoke(cli.main, ["show"]).output
+
+
+def test_scrollback_grep(monkeypatch):
+    windows = [KittyWindow(id="1", tab="t", title="build"), KittyWindow(id="2", tab="u", title="logs")]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    seen = {}
+
+    def fake_grep(targets, regex, **kwargs):
+        seen.update(kwargs, targets=targets, regex=regex)
+        yield ScrollbackMatches(targets[0], [(3, "Error: boom")])
+
+    monkeypatch.setattr(cli, "grep_scrollback", fake_grep)
+    args = ["scrollback-grep", "-i", "-m", "id:1", "--to", "unix:@k", "-j", "3", "error"]
+    result = CliRunner(mix_stderr=False).invoke(cli.main, args)
+    assert "         1 |     t | build                     |      3: Error: boom" in result.stdout
+    assert "1 match(es) in 1 of 1 window(s)" in result.stderr
+    assert seen["targets"] == windows[:1]
+    assert seen["regex"].flags & re.IGNORECASE
+    assert seen["address"] == "unix:@k"
+    assert seen["jobs"] == 3
+    bad = CliRunner().invoke(cli.main, ["scrollback-grep", "--to", "unix:@k", "("])
+    assert "[FAIL] Invalid pattern" in bad.output
+
+
+def test_show_group_by_repo(monkeypatch):
+    windows = [KittyWindow(id="1", tab="t", title="a", cwd="/r/x"), KittyWindow(id="2", tab="t", title="b")]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(
+        cli, "group_windows_by_repo", lambda wins: [("Repo /r", wins[:1]), ("(no repo)", wins[1:])]
+    )
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda wins, **_kwargs: [WindowActivity(win.id, win.tab, win.title, "s", "ls") for win in wins],
+    )
+    lines = CliRunner().invoke(cli.main, ["show", "--group-by", "repo"]).output.splitlines()
+    assert lines.index("[Repo /r]") < lines.index("[(no repo)]")
+
+
+def test_top(monkeypatch, tmp_path, write_proc):
+    write_proc(tmp_path, {10: ("zsh", 1, 0, 0, 1, 10), 20: ("zsh", 1, 0, 0, 2, 10)})
+    windows = [
+        KittyWindow(id="1", tab="t", title="quiet", pid=10),
+        KittyWindow(id="2", tab="t", title="hot", pid=20),
+    ]
+    now = [0.0]
+
+    def fake_sleep(seconds):
+        now[0] += seconds
+        write_proc(tmp_path, {21: ("cc", 20, 100, 0, 3, 256)})
+
+    monkeypatch.setattr(cli, "PROC_ROOT", tmp_path)
+    monkeypatch.setattr(
+        cli,
+        "LoadSampler",
+        lambda: LoadSampler(tmp_path, ticks_per_second=100, page_size=4096, clock=lambda: now[0]),
+    )
+    monkeypatch.setattr(cli.time, "sleep", fake_sleep)
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda wins, **_kwargs: [
+            WindowActivity(win.id, win.tab, win.title, "s", f"cmd{win.id}") for win in wins
+        ],
+    )
+    lines = CliRunner().invoke(cli.main, ["top", "-n", "1", "--interval", "2"]).output.splitlines()
+    assert "CPU%" in lines[0]
+    assert lines[2].startswith("         2 |   50.0 |    1.0 MiB |     2 | hot")
+    assert lines[2].endswith("| cmd2")
+    assert lines[3].startswith("         1 |    0.0 |")
+    monkeypatch.setattr(cli, "PROC_ROOT", tmp_path / "missing")
+    assert "needs /proc" in CliRunner().invoke(cli.main, ["top", "-n", "1"]).output
+
+
+def test_hooks_run_fires_on_finished_commands(monkeypatch, history_db, started_hooks):
+    db = history_db()
+    db.add("old")
+
+    def fake_sleep(_seconds):
+        db.add("make", duration=3_000_000_000, exit=2)
+
+    monkeypatch.setattr(cli.time, "sleep", fake_sleep)
+    monkeypatch.setattr(cli, "read_session_registry", lambda: {"7": "s1"})
+    args = [
+        "hooks",
+        "run",
+        "--history-db",
+        str(db.path),
+        "--count",
+        "2",
+        "--exec",
+        "notify",
+        "--exit",
+        "nonzero",
+    ]
+    result = CliRunner().invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    assert "[INFO] exec: window 7 | make (exit 2, 3s)" in result.output
+    assert [command for command, _env in started_hooks] == ["notify"]
+
+
+def test_hooks_run_needs_hooks():
+    result = CliRunner().invoke(cli.main, ["hooks", "run", "--count", "1"])
+    assert "[error] No hooks" in result.output
+    result = CliRunner().invoke(cli.main, ["hooks", "run", "--count", "1", "--exec", "x", "--pattern", "("])
+    assert "[FAIL] hooks[0].pattern is not a valid regex" in result.output
+
+
+def test_metrics_counts_new_history_rows(monkeypatch, tmp_path, history_db):
+    db = history_db()
+    db.add("old", exit=1)
+    out = tmp_path / "catherd.prom"
+
+    def fake_sleep(_seconds):
+        db.add("make", exit=2)
+        db.add("ls")
+
+    monkeypatch.setattr(cli.time, "sleep", fake_sleep)
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: [KittyWindow(id="7", tab="1", title="w")])
+    monkeypatch.setattr(cli, "read_session_registry", lambda: {"7": "s1"})
+    args = ["metrics", "--history-db", str(db.path), "--out", str(out), "--interval", "1", "--count", "2"]
+    result = CliRunner().invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    text = out.read_text(encoding="utf-8")
+    assert 'catherd_window_commands_total{window="7"} 2' in text
+    assert 'catherd_window_failures_total{window="7"} 1' in text
+
+    # A later run continues from the stored high-water mark.
+    db.add("pytest")
+    result = CliRunner().invoke(cli.main, ["metrics", "--history-db", str(db.path)])
+    assert 'catherd_window_commands_total{window="7"} 3' in result.output
+
+
+def test_metrics_interval_needs_out():
+    result = CliRunner().invoke(cli.main, ["metrics", "--interval", "1"])
+    assert "[error] --interval needs --out." in result.output
+
+
+def test_show_sort_recent_limit(monkeypatch):
+    windows = [KittyWindow(id=str(i), tab="t", title=f"w{i}") for i in range(1, 4)]
+    calls = []
+
+    def fake_recent(_windows, **kwargs):
+        calls.append(kwargs)
+        return [WindowActivity("3", "t", "w3", "s3", "make"), WindowActivity("1", "t", "w1", "s1", "ls")]
+
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(cli, "collect_recent_activity", fake_recent)
+    result = CliRunner().invoke(cli.main, ["show", "--sort", "recent", "--limit", "2"])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()[2:]
+    assert [line.split("|")[0].strip() for line in lines] == ["3", "1"]
+    assert calls[0]["limit"] == 2
+    assert calls[0]["oldest"] is False
+
+
+def test_show_sort_title_limit_reads_history_for_shown_windows(monkeypatch):
+    windows = [KittyWindow(id="1", tab="t", title="b"), KittyWindow(id="2", tab="t", title="A")]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda wins, **_kwargs: [WindowActivity(win.id, win.tab, win.title, None, "cmd") for win in wins],
+    )
+    result = CliRunner().invoke(cli.main, ["show", "--sort", "title", "--limit", "1"])
+    assert [line.split("|")[0].strip() for line in result.output.splitlines()[2:]] == ["2"]
+
+
+def test_show_sort_falls_back_and_rejects_group_by(monkeypatch):
+    windows = [KittyWindow(id="1", tab="t", title="a"), KittyWindow(id="2", tab="t", title="b")]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(cli, "collect_recent_activity", lambda *_args, **_kwargs: None)
+    monkeypatch.setattr(
+        cli,
+        "collect_activity",
+        lambda wins, **_kwargs: [WindowActivity(win.id, win.tab, win.title, None, "cmd") for win in wins],
+    )
+    result = CliRunner().invoke(cli.main, ["show", "--sort", "oldest", "--limit", "1"])
+    assert "[warning] Could not rank windows" in result.output
+    assert [line.split("|")[0].strip() for line in result.output.splitlines()[3:]] == ["1"]
+    result = CliRunner().invoke(cli.main, ["show", "--group-by", "tab", "--limit", "1"])
+    assert "[error] --sort and --limit cannot be combined with --group-by." in result.output
+
+
+def test_top_commands(monkeypatch, history_db):
+    db = history_db()
+    for command, exit_code, session in [("make", 2, "s1"), ("make", 0, "s0"), ("git pull", 0, "s1")]:
+        db.add(command, exit=exit_code, session=session)
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: [KittyWindow(id="7", tab="1", title="w")])
+    monkeypatch.setattr(cli, "read_session_registry", lambda: {"7": "s1"})
+    monkeypatch.setattr(cli, "read_session_lineage", lambda: {"7": [LineageEntry("s0"), LineageEntry("s1")]})
+    result = CliRunner().invoke(cli.main, ["top-commands", "--history-db", str(db.path)])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[2].split("|") == ["       2 ", "      1 ", " make"]
+    assert lines[3].endswith("| git pull")
+    assert "[INFO] 3 command(s) from 2 session(s) of 1 window(s)." in result.output
+
+    result = CliRunner().invoke(
+        cli.main, ["top-commands", "--history-db", str(db.path), "--sketch-size", "1"]
+    )
+    assert "[INFO] Counts are approximate" in result.output
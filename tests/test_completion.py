@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from catherd import cli, completion, kitty
+
+LS = [
+    {
+        "id": 1,
+        "tabs": [{"id": 1, "windows": [{"id": 11, "title": "vim main.py"}, {"id": 12, "title": "htop"}]}],
+    }
+]
+
+
+def fake_ls(calls):
+    def run_kitty_ls(**_kwargs):
+        calls.append(1)
+        return LS
+
+    return run_kitty_ls
+
+
+def test_complete_windows_caches_kitty_ls(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(kitty, "run_kitty_ls", fake_ls(calls))
+    path = tmp_path / "windows.json"
+    items = completion.complete_windows("", path=path)
+    assert [(item.value, item.help) for item in items] == [("id:11", "vim main.py"), ("id:12", "htop")]
+    assert [item.value for item in completion.complete_windows("id:12", path=path)] == ["id:12"]
+    assert [item.value for item in completion.complete_windows("VIM", path=path)] == ["id:11"]
+    assert calls == [1]
+    assert json.loads(path.read_text(encoding="utf-8")) == [["11", "vim main.py"], ["12", "htop"]]
+
+    os.utime(path, (0, 0))
+    assert completion.read_completion_cache(path) is None
+    completion.complete_windows("", path=path)
+    assert calls == [1, 1]
+
+
+def test_complete_windows_without_kitty(monkeypatch, tmp_path):
+    def failing_ls(**_kwargs):
+        msg = "no kitty"
+        raise kitty.KittyError(msg)
+
+    monkeypatch.setattr(kitty, "run_kitty_ls", failing_ls)
+    assert completion.complete_windows("", path=tmp_path / "windows.json") == []
+    (tmp_path / "bad.json").write_text("{", encoding="utf-8")
+    assert completion.read_completion_cache(tmp_path / "bad.json") is None
+
+
+def test_main_answers_match_completion_from_cache(monkeypatch, capsys):
+    completion.get_completion_cache_path().write_text('[["11", "vim"]]', encoding="utf-8")
+    monkeypatch.setattr(cli, "main", lambda: print("cli"))
+    monkeypatch.setenv("_CATHERD_COMPLETE", "zsh_complete")
+    monkeypatch.setenv("COMP_WORDS", "catherd send -m ")
+    monkeypatch.setenv("COMP_CWORD", "3")
+    completion.main()
+    assert capsys.readouterr().out == "plain\nid:11\nvim\n"
+
+    monkeypatch.setenv("COMP_WORDS", "catherd show --sort ")
+    completion.main()
+    assert capsys.readouterr().out == "cli\n"
+
+
+def test_bash_completes_after_the_colon_it_split_on(monkeypatch, capsys):
+    completion.get_completion_cache_path().write_text('[["11", "vim"], ["12", "sh"]]', encoding="utf-8")
+    monkeypatch.setenv("_CATHERD_COMPLETE", "bash_complete")
+    # Bash splits "-m id:1" into "id", ":" and "1", and replaces only the word under the cursor.
+    for words, cword, expected in [
+        ("catherd send -m id : ", "5", "plain,11\nplain,12\n"),
+        ("catherd send -m id : 1", "5", "plain,11\nplain,12\n"),
+        ("catherd send -m id : 12", "5", "plain,12\n"),
+        ("catherd send -m id :", "4", "plain,:11\nplain,:12\n"),
+    ]:
+        monkeypatch.setenv("COMP_WORDS", words)
+        monkeypatch.setenv("COMP_CWORD", cword)
+        completion.main()
+        assert capsys.readouterr().out == expected, words
+
+
+def test_fast_path_does_not_import_the_cli(tmp_path):
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(Path(completion.__file__).parents[1]),
+        "XDG_CACHE_HOME": str(tmp_path),
+        "_CATHERD_COMPLETE": "bash_complete",
+        "COMP_WORDS": "catherd send -m id:",
+        "COMP_CWORD": "3",
+    }
+    (tmp_path / "catherd").mkdir()
+    (tmp_path / "catherd" / "completion_windows.json").write_text('[["7", "x"]]', encoding="utf-8")
+    code = "import sys; from catherd.completion import main; main(); print('catherd.cli' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert out == "plain,id:7\nFalse\n"
+
+
+def test_match_options_use_the_completer():
+    for name in completion.MATCH_COMMANDS:
+        (option,) = [p for p in cli.main.commands[name].params if p.name == "specs"]
+        assert set(option.opts) == completion.MATCH_OPTIONS
+        assert option._custom_shell_complete is completion.complete_match_option
+
+
+def test_install_adds_completion(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "get_shell_info", lambda *_args: "bash")
+    rc = tmp_path / ".bashrc"
+    monkeypatch.setattr(cli, "get_shell_rc_path", lambda _shell: rc)
+    for _ in range(2):
+        result = CliRunner().invoke(cli.main, ["install", "--shell", "bash"])
+    script = completion.get_completion_script_path("bash")
+    assert f"[OK] Tab completion installed in {script}" in result.output
+    assert "_CATHERD_COMPLETE=bash_complete" in script.read_text(encoding="utf-8")
+    assert rc.read_text(encoding="utf-8").count(f"[ -f {script} ] && . {script}") == 1
+
+    monkeypatch.setattr(cli, "get_shell_info", lambda *_args: "csh")
+    monkeypatch.setattr(cli, "load_snippet_for_shell", lambda _shell: "# snippet")
+    result = CliRunner(mix_stderr=False).invoke(cli.main, ["install", "--shell", "csh"])
+    assert "No tab completion for csh" in result.stderr
@@ -29,3 +29,17 @@ def test_get_session_file(monkeypatch, tmp_path):
     session_path = config.get_session_file(fid)
     assert session_path.name == f"atuin_kitty_{fid}"
     assert "catherd" in str(session_path.parent)
+
+
+def test_load_config(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    assert config.load_config() == {}
+    config.get_config_file().write_text('history_dbs = ["~/a.db"]\n')
+    assert config.load_config() == {"history_dbs": ["~/a.db"]}
+
+
+def test_load_config_invalid(monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    config.get_config_file().write_text("not = [valid")
+    assert config.load_config() == {}
+    assert "Ignoring invalid config file" in capsys.readouterr().err
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.atuin import HistoryFilter
+from catherd.config import get_session_file
+from catherd.export import EXPORT_COLUMNS, export_history
+from catherd.kitty import KittyWindow
+
+WINDOWS = {
+    "s1": KittyWindow(id="1", tab="10", title="vim", os_window="100"),
+    "s2": KittyWindow(id="2", tab="20", title="zsh", os_window="100"),
+}
+
+
+COLUMNS = ("session", "command", "timestamp", "exit")
+ROWS = [
+    ("s1", "vim a", 2_000_000_000, 0),
+    ("s2", "make", 1_000_000_000, 2),
+    ("s3", "ignored", 1_500_000_000, 0),
+    ("s1", "ls", 3_000_500_000, 0),
+]
+
+
+def test_export_jsonl_streams_in_batches(history_db):
+    db = history_db(rows=ROWS, columns=COLUMNS).path
+    out = io.StringIO()
+    assert export_history(WINDOWS, out, "jsonl", db_paths=[db], batch_size=1) == 3
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["command"] for r in records] == ["make", "vim a", "ls"]
+    assert list(records[0]) == list(EXPORT_COLUMNS)
+    assert records[0]["window_id"] == "2"
+    assert records[0]["tab"] == "20"
+    assert records[0]["os_window"] == "100"
+    assert records[0]["exit"] == 2
+    assert records[0]["time"] == "1970-01-01T00:00:01.000Z"
+    assert records[2]["time"] == "1970-01-01T00:00:03.000Z"
+
+
+def test_export_csv_with_filter(history_db):
+    db = history_db(rows=ROWS, columns=COLUMNS).path
+    out = io.StringIO()
+    written = export_history(
+        WINDOWS, out, "csv", db_paths=[db], history_filter=HistoryFilter(since=1_500_000_000)
+    )
+    assert written == 2
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert [row[-1] for row in rows[1:]] == ["vim a", "ls"]
+    assert rows[1][:4] == ["1", "10", "100", "vim"]
+
+
+def test_export_command(monkeypatch, tmp_path, history_db):
+    db = history_db(rows=ROWS, columns=COLUMNS).path
+    get_session_file("1").write_text("s1\n")
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: [WINDOWS["s1"], WINDOWS["s2"]])
+    out_file = tmp_path / "out.csv"
+    result = CliRunner(mix_stderr=False).invoke(
+        cli.main, ["export", "--format", "csv", "-o", str(out_file), "--history-db", str(db)]
+    )
+    assert "Exported 2 row(s) from 1 window(s)" in result.stderr
+    assert out_file.read_text().count("\n") == 3
+    result = CliRunner(mix_stderr=False).invoke(
+        cli.main, ["export", "--history-db", str(tmp_path / "none.db")]
+    )
+    assert "No Atuin history DB found" in result.stderr
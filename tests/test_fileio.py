@@ -0,0 +1,19 @@
+import pytest
+
+from catherd.fileio import write_atomic
+
+
+def test_write_atomic_replaces_file(tmp_path):
+    path = tmp_path / "catherd.prom"
+    path.write_text("old", encoding="utf-8")
+    write_atomic(path, "new\n")
+    assert path.read_text(encoding="utf-8") == "new\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["catherd.prom"]
+
+
+def test_write_atomic_leaves_no_temporary_file_on_error(tmp_path):
+    path = tmp_path / "catherd.prom"
+    path.mkdir()
+    with pytest.raises(IsADirectoryError):
+        write_atomic(path, "new\n")
+    assert [p.name for p in tmp_path.iterdir()] == ["catherd.prom"]
@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+
+import pytest
+
+from catherd.hooks import HistoryEvent, HistoryTail, Hook, HookRunner, HookState, load_hooks
+
+
+def event(command="make", *, exit_code=0, seconds=1.0, session="s1"):
+    return HistoryEvent(1, session, command, "/work", exit_code, int(seconds * 1e9), 1)
+
+
+def test_hook_from_config_validates():
+    with pytest.raises(ValueError, match=r"hooks\[0\] needs an 'exec'"):
+        Hook.from_config({})
+    with pytest.raises(ValueError, match="exit must be"):
+        Hook.from_config({"exec": "true", "exit": "sometimes"})
+    with pytest.raises(ValueError, match="not a valid regex"):
+        Hook.from_config({"exec": "true", "pattern": "("})
+    hooks = load_hooks([{"exec": "true"}, {"name": "n", "exec": "true"}])
+    assert [hook.name for hook in hooks] == ["hook0", "n"]
+
+
+def test_hook_matches():
+    hook = Hook.from_config({"exec": "true", "min_duration": 5, "exit": "nonzero", "pattern": "^make"})
+    assert hook.matches(event(exit_code=2, seconds=6))
+    assert not hook.matches(event(exit_code=2, seconds=4))
+    assert not hook.matches(event(exit_code=0, seconds=6))
+    assert not hook.matches(event("ls", exit_code=2, seconds=6))
+    assert Hook("h", "true", exit="zero").matches(event())
+
+
+def test_history_tail_follows_finished_rows(history_db):
+    db = history_db()
+    db.add("old")
+    state = {}
+    tail = HistoryTail(db.path, state)
+    assert tail.poll() == []  # The first poll only sets the mark.
+    assert state == {"rowid": 1, "pending": []}
+    assert tail.poll() == []  # Nothing committed since.
+
+    running = db.add("make", duration=-1)
+    db.add("ls", duration=5)
+    assert [e.command for e in tail.poll()] == ["ls"]
+    assert state["pending"] == [running]
+
+    db.con.execute("UPDATE history SET duration = 7, exit = 2 WHERE rowid = ?", (running,))
+    db.con.commit()
+    (finished,) = tail.poll()
+    assert (finished.command, finished.exit, finished.duration) == ("make", 2, 7)
+    assert state == {"rowid": 3, "pending": []}
+    tail.close()
+
+
+def test_history_tail_resumes_from_saved_mark(history_db):
+    db = history_db()
+    db.add("old")
+    db.add("missed")
+    tail = HistoryTail(db.path, {"rowid": 1, "pending": []})
+    assert [e.command for e in tail.poll()] == ["missed"]
+    tail.close()
+
+
+def test_history_tail_marks_rows_committed_during_a_poll(history_db):
+    db = history_db()
+    db.add("a")
+    tail = HistoryTail(db.path, {"rowid": 1, "pending": []})
+    db.add("b")
+
+    class CommitAfterMax:
+        """Commit a row between the first poll's two queries."""
+
+        def __init__(self, conn):
+            self.conn = conn
+            self.committed = False
+
+        def execute(self, sql, *args):
+            cursor = self.conn.execute(sql, *args)
+            if "MAX(rowid)" not in sql or self.committed:
+                return cursor
+            row = cursor.fetchone()
+            db.add("c")
+            self.committed = True
+            return SimpleNamespace(fetchone=lambda: row)
+
+        def close(self):
+            self.conn.close()
+
+    tail._conn = CommitAfterMax(tail._connect())
+    assert [e.command for e in tail.poll()] == ["b", "c"]
+    db.add("d")
+    assert [e.command for e in tail.poll()] == ["d"]
+    tail.close()
+
+
+def test_hook_state_roundtrip(tmp_path):
+    path = tmp_path / "state.json"
+    state = HookState(path)
+    state.source(tmp_path / "a.db").update(rowid=4, pending=[3])
+    state.save()
+    assert HookState(path).source(tmp_path / "a.db") == {"rowid": 4, "pending": [3]}
+
+
+def test_hook_runner_debounce_and_focus(started_hooks):
+    now = [0.0]
+    lookups = []
+
+    def sessions():
+        lookups.append(1)
+        return {"s1": "1", "s2": "2"}
+
+    hooks = [Hook("notify", "notify-send", debounce=10, unfocused=True)]
+    runner = HookRunner(hooks, sessions_to_windows=sessions, focused_window=lambda: "2", clock=lambda: now[0])
+    assert runner.handle([]) == []
+    assert lookups == []
+
+    firings = runner.handle([event(session="s1"), event(session="s2"), event(session="s1")])
+    assert [firing.window_id for firing in firings] == ["1"]  # s2 has focus; s1 is debounced.
+    command, env = started_hooks[0]
+    assert command == "notify-send"
+    assert env["CATHERD_WINDOW_ID"] == "1"
+    assert env["CATHERD_DURATION"] == "1.0"
+
+    now[0] = 11
+    assert [firing.window_id for firing in runner.handle([event(session="s1")])] == ["1"]
+    assert len(lookups) == 2
+
+
+def test_hook_runner_tells_instances_apart(started_hooks):
+    # Window 3 of instances a and b; a's has focus.
+    hooks = [Hook("notify", "notify-send", debounce=10, unfocused=True)]
+    runner = HookRunner(
+        hooks, sessions_to_windows=lambda: {"sa": "a_3", "sb": "b_3"}, focused_window=lambda: "a_3"
+    )
+    firings = runner.handle([event(session="sa"), event(session="sb")])
+    assert [(firing.event.session, firing.window_id) for firing in firings] == [("sb", "3")]
+    assert started_hooks[0][1]["CATHERD_WINDOW_ID"] == "3"
+
+    runner = HookRunner(hooks[:1], sessions_to_windows=lambda: {"sa": "a_3", "sb": "b_3"})
+    firings = runner.handle([event(session="sa"), event(session="sb")])
+    assert [firing.event.session for firing in firings] == ["sa", "sb"]  # Debounced per instance.
@@ -0,0 +1,89 @@
+import json
+import socket
+import time
+
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.config import get_config_file, get_session_file
+from catherd.instances import (
+    discover_kitty_sockets,
+    get_kitty_socket_patterns,
+    instance_name,
+    query_kitty_instances,
+)
+from catherd.kitty import KittySnapshot
+
+
+def ls_handler(window_ids, *, delay=0.0):
+    def handler(_message):
+        time.sleep(delay)
+        data = [{"id": 1, "tabs": [{"id": 1, "windows": [{"id": i, "title": f"w{i}"} for i in window_ids]}]}]
+        return {"ok": True, "data": json.dumps(data)}
+
+    return handler
+
+
+def test_discover_expands_globs_to_sockets(tmp_path):
+    sockets = []
+    for name in ("kitty-a", "kitty-b"):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.bind(str(tmp_path / name))
+        sockets.append(sock)
+    (tmp_path / "kitty-not-a-socket").write_text("")
+    try:
+        found = discover_kitty_sockets([f"unix:{tmp_path}/kitty-*", "unix:@work", f"unix:{tmp_path}/kitty-a"])
+    finally:
+        for sock in sockets:
+            sock.close()
+    assert found == [f"unix:{tmp_path}/kitty-a", f"unix:{tmp_path}/kitty-b", "unix:@work"]
+
+
+def test_socket_patterns_from_config():
+    assert get_kitty_socket_patterns() == []
+    get_config_file().write_text('kitty_sockets = ["unix:/run/kitty-*"]\n')
+    assert get_kitty_socket_patterns() == ["unix:/run/kitty-*"]
+    assert get_kitty_socket_patterns(["tcp:localhost:1"]) == ["tcp:localhost:1"]
+
+
+def test_instance_name():
+    assert instance_name("unix:/run/user/1000/kitty-work") == "kitty-work"
+    assert instance_name("unix:@kitty-main") == "kitty-main"
+    assert instance_name("tcp:localhost:5000") == "localhost:5000"
+
+
+def test_query_instances_concurrently_and_merge(fake_kitty_server):
+    first = fake_kitty_server(ls_handler([1, 2], delay=0.2))
+    second = fake_kitty_server(ls_handler([1], delay=0.2))
+    second_name = f"unix:{second.path.parent}/other.sock"
+    second.path.rename(second.path.parent / "other.sock")
+    started = time.perf_counter()
+    snapshot, errors = query_kitty_instances([first.address, second_name, "unix:/nonexistent/kitty"])
+    assert time.perf_counter() - started < 0.35
+    assert list(errors) == ["unix:/nonexistent/kitty"]
+    assert [w.id for w in snapshot.windows] == ["kitty.sock/1", "kitty.sock/2", "other.sock/1"]
+    window = snapshot.window("other.sock/1")
+    assert window.instance == "other.sock"
+    assert window.kitty_id == "1"
+    assert window.tab == "other.sock/1"
+    assert len(snapshot.os_windows) == 2
+
+
+def test_from_instances_keeps_plain_ids_for_single_ls():
+    window = KittySnapshot.from_ls([{"id": 1, "tabs": [{"id": 2, "windows": [{"id": 3}]}]}]).windows[0]
+    assert window.id == window.kitty_id == "3"
+    assert window.instance is None
+
+
+def test_show_with_sockets(monkeypatch, fake_kitty_server):
+    server = fake_kitty_server(ls_handler([7]))
+    get_session_file("7").write_text("s7\n")
+    monkeypatch.setattr(
+        "catherd.activity.lookup_last_commands", lambda ids, **_kwargs: dict.fromkeys(ids, "htop")
+    )
+    result = CliRunner(mix_stderr=False).invoke(
+        cli.main, ["show", "--socket", server.address, "--socket", "unix:/nope"]
+    )
+    assert "kitty.sock/7" in result.stdout
+    assert "htop" in result.stdout
+    assert "Skipping kitty at unix:/nope" in result.stderr
@@ -1,7 +1,81 @@
+import io
 import json
-from unittest.mock import MagicMock, patch
+import threading
 
-from catherd.kitty import KittyWindow, get_kitty_windows
+import pytest
+
+from catherd.kitty import (
+    KittyError,
+    KittySnapshot,
+    KittyTimeoutError,
+    KittyWindow,
+    get_kitty_snapshot,
+    get_kitty_windows,
+    match_windows,
+    run_kitty_ls,
+)
+
+LS_TREE = [
+    {
+        "id": 1,
+        "is_focused": True,
+        "tabs": [
+            {
+                "id": 10,
+                "title": "editor",
+                "is_focused": True,
+                "windows": [
+                    {"id": 100, "title": "vim", "is_focused": True, "pid": 1000, "cwd": "/src"},
+                    {"id": 101, "pid": 1001, "cwd": "/var"},
+                ],
+            },
+            {"id": 11, "title": "logs", "windows": [{"id": 110, "title": "tail", "pid": 1100}]},
+        ],
+    },
+    {"id": 2, "tabs": [{"id": 20, "title": "scratch", "windows": [{"id": 200, "title": "sh"}]}]},
+]
+
+
+class FakePopen:
+    """Stands in for subprocess.Popen; `hang` blocks reads until the process is killed."""
+
+    def __init__(self, stdout="", *, returncode=0, stderr="", hang=False):
+        self.output = stdout.encode()
+        self.returncode = returncode
+        self.error_output = stderr.encode()
+        self.hang = hang
+        self.killed = threading.Event()
+        self.reads = 0
+
+    def __call__(self, _cmd, **kwargs):
+        kwargs["stderr"].write(self.error_output)
+        self.buffer = io.BytesIO(self.output)
+        self.stdout = self
+        return self
+
+    def __enter__(self):  # noqa: D105
+        return self
+
+    def __exit__(self, *_exc):  # noqa: D105
+        return False
+
+    def read(self, size):
+        self.reads += 1
+        if self.hang:
+            self.killed.wait(5)
+            return b""
+        return self.buffer.read(size)
+
+    def close(self):
+        pass
+
+    def kill(self):
+        self.killed.set()
+
+    def wait(self):
+        if self.killed.is_set():
+            self.returncode = -9
+        return self.returncode
 
 
 def test_kittywindow_dataclass():
@@ -11,15 +85,11 @@ def test_kittywindow_dataclass():
     assert w.title == "foo"
 
 
-@patch("shutil.which", return_value="/usr/bin/kitty")
-@patch("subprocess.run")
-def test_get_kitty_windows_json_parsing(mock_run, mock_which):  # noqa: ARG001
+def test_get_kitty_windows_json_parsing(monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
     # Use a fake kitty ls output
-    mock_run.return_value = MagicMock(
-        returncode=0,
-        stdout=json.dumps([{"tabs": [{"id": 1, "title": "tab", "windows": [{"id": 11, "title": "w1"}]}]}]),
-        stderr="",
-    )
+    ls = [{"tabs": [{"id": 1, "title": "tab", "windows": [{"id": 11, "title": "w1"}]}]}]
+    monkeypatch.setattr("subprocess.Popen", FakePopen(json.dumps(ls)))
     windows = get_kitty_windows()
     assert isinstance(windows, list)
     assert isinstance(windows[0], KittyWindow)
@@ -47,46 +117,29 @@ def test_get_kitty_windows_subprocess_error(monkeypatch):
         msg = "fail"
         raise FileNotFoundError(msg)
 
-    monkeypatch.setattr("subprocess.run", raise_exc)
+    monkeypatch.setattr("subprocess.Popen", raise_exc)
     result = get_kitty_windows()
     assert result is None
 
 
-def test_get_kitty_windows_nonzero_return(monkeypatch):
+def test_get_kitty_windows_nonzero_return(monkeypatch, capsys):
     monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
-
-    class R:
-        returncode = 1
-        stdout = ""
-        stderr = "fail"
-
-    monkeypatch.setattr("subprocess.run", lambda *_a, **_k: R())
+    monkeypatch.setattr("subprocess.Popen", FakePopen("", returncode=1, stderr="fail"))
     result = get_kitty_windows()
     assert result is None
+    assert "exit code 1):\nfail" in capsys.readouterr().err
 
 
 def test_get_kitty_windows_json_decode_error(monkeypatch):
     monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
-
-    class R:
-        returncode = 0
-        stdout = "{not-json"
-        stderr = ""
-
-    monkeypatch.setattr("subprocess.run", lambda *_a, **_k: R())
+    monkeypatch.setattr("subprocess.Popen", FakePopen("{not-json"))
     result = get_kitty_windows()
     assert result is None
 
 
 def test_get_kitty_windows_no_windows(monkeypatch):
     monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
-
-    class R:
-        returncode = 0
-        stdout = json.dumps([])
-        stderr = ""
-
-    monkeypatch.setattr("subprocess.run", lambda *_a, **_k: R())
+    monkeypatch.setattr("subprocess.Popen", FakePopen(json.dumps([])))
     result = get_kitty_windows()
     assert isinstance(result, list)
     assert result == []
@@ -94,13 +147,140 @@ def test_get_kitty_windows_no_windows(monkeypatch):
 
 def test_get_kitty_windows_verbose_branch(monkeypatch, capsys):
     monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
-
-    class R:
-        returncode = 0
-        stdout = '[{"tabs":[]}]'
-        stderr = ""
-
-    monkeypatch.setattr("subprocess.run", lambda *_a, **_k: R())
+    monkeypatch.setattr("subprocess.Popen", FakePopen('[{"tabs":[], "env": {"SECRET": "x"}}]'))
     get_kitty_windows(verbose=True)
     out = capsys.readouterr().out
-    assert "Raw output" in out
+    assert "Decoded output" in out
+    assert "SECRET" not in out
+
+
+def test_snapshot_from_ls_keeps_tree_and_indexes():
+    snap = KittySnapshot.from_ls(LS_TREE)
+    assert [w.id for w in snap.windows] == ["100", "101", "110", "200"]
+    assert [osw.id for osw in snap.os_windows] == ["1", "2"]
+    assert snap.os_windows[0].is_focused
+    assert [tab.id for tab in snap.os_windows[0].tabs] == ["10", "11"]
+
+    win = snap.window("100")
+    assert win == KittyWindow(
+        id="100", tab="10", title="vim", os_window="1", is_focused=True, pid=1000, cwd="/src"
+    )
+    assert snap.window("101").title == "editor"  # falls back to the tab title
+    assert snap.window("nope") is None
+    assert snap.tab("11").windows == [snap.window("110")]
+    assert snap.tab("11").os_window == "1"
+    assert snap.window_for_pid(1100).id == "110"
+    assert snap.window_for_pid(4242) is None
+
+
+def test_snapshot_groups():
+    snap = KittySnapshot.from_ls(LS_TREE)
+    by_tab = snap.groups("tab")
+    assert [label for label, _ in by_tab] == ["Tab 10: editor", "Tab 11: logs", "Tab 20: scratch"]
+    assert [len(group) for _, group in by_tab] == [2, 1, 1]
+    by_os = snap.groups("os-window")
+    assert [label for label, _ in by_os] == ["OS window 1", "OS window 2"]
+    assert [w.id for w in by_os[0][1]] == ["100", "101", "110"]
+
+
+def test_kittywindow_uses_slots():
+    w = KittyWindow(id="w", tab="t", title="foo")
+    assert not hasattr(w, "__dict__")
+
+
+def test_run_kitty_ls_raises(monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda _x: None)
+    with pytest.raises(KittyError, match="not found in PATH"):
+        run_kitty_ls()
+
+
+def test_run_kitty_ls_timeout(monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
+    popen = FakePopen(hang=True)
+    monkeypatch.setattr("subprocess.Popen", popen)
+    with pytest.raises(KittyTimeoutError, match=r"did not answer within 0\.05 s"):
+        run_kitty_ls(timeout=0.05)
+    assert popen.killed.is_set()
+
+
+def test_run_kitty_ls_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
+    monkeypatch.setattr("catherd.kitty.READ_CHUNK_SIZE", 7)
+    popen = FakePopen(json.dumps(LS_TREE))
+    monkeypatch.setattr("subprocess.Popen", popen)
+    assert run_kitty_ls() == LS_TREE
+    assert popen.reads > len(json.dumps(LS_TREE)) // 7
+
+
+def test_get_kitty_snapshot(monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda _x: "/usr/bin/kitty")
+    monkeypatch.setattr("subprocess.Popen", FakePopen(json.dumps(LS_TREE)))
+    snap = get_kitty_snapshot()
+    assert snap is not None
+    assert len(snap.windows) == 4
+
+
+def test_get_kitty_snapshot_error(monkeypatch, capsys):
+    monkeypatch.setattr("shutil.which", lambda _x: None)
+    assert get_kitty_snapshot() is None
+    assert "[error] 'kitty' is not found in PATH." in capsys.readouterr().err
+
+
+def test_snapshot_upsert_and_remove_window():
+    snap = KittySnapshot.from_ls(LS_TREE)
+    assert snap.windows is snap.windows
+    renamed = KittyWindow(id="101", tab="10", title="renamed", os_window="1", pid=1001)
+    snap.upsert_window(renamed)
+    assert snap.window("101") is renamed
+    assert renamed in snap.windows
+    assert snap.tab("10").windows[1] is renamed
+    assert snap.window_for_pid(1001) is renamed
+
+    moved = KittyWindow(id="101", tab="11", title="moved", os_window="1", pid=1002)
+    snap.upsert_window(moved)
+    assert [w.id for w in snap.tab("11").windows] == ["110", "101"]
+    assert snap.window_for_pid(1001) is None
+    assert moved in snap.windows
+
+    assert snap.remove_window("200").id == "200"
+    assert snap.tab("20") is None
+    assert [osw.id for osw in snap.os_windows] == ["1"]
+    assert snap.remove_window("200") is None
+    assert len(snap.windows) == 3
+
+
+def test_match_windows():
+    windows = KittySnapshot.from_ls(LS_TREE).windows
+
+    def ids(specs):
+        return [w.id for w in match_windows(windows, specs)]
+
+    assert ids(["id:101"]) == ["101"]
+    assert ids(["tab:10"]) == ["100", "101"]
+    assert ids(["os_window:2", "pid:1100"]) == ["110", "200"]
+    assert ids(["title:^(vim|tail)$"]) == ["100", "110"]
+    assert ids(["cwd:^/src"]) == ["100"]
+    assert ids(["scratch|sh"]) == ["200"]
+    assert ids(["nope:vim"]) == []
+    with pytest.raises(ValueError, match="Invalid pattern"):
+        match_windows(windows, ["title:("])
+
+
+def test_snapshot_foreground_command():
+    shell = {"pid": 5, "cmdline": ["-zsh"]}
+    snap = KittySnapshot.from_ls([
+        {
+            "id": 1,
+            "tabs": [
+                {
+                    "id": 2,
+                    "windows": [
+                        {"id": 3, "pid": 5, "foreground_processes": [shell]},
+                        {"id": 4, "pid": 5, "foreground_processes": [{"pid": 9, "cmdline": ["make", "a b"]}]},
+                        {"id": 6, "pid": 5},
+                    ],
+                }
+            ],
+        }
+    ])
+    assert [win.foreground_command for win in snap.windows] == [None, "make 'a b'", None]
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from catherd.kitty_ls import decode_kitty_ls
+
+NOISY_LS = [
+    {
+        "id": 1,
+        "is_focused": True,
+        "platform_window_id": 123,
+        "tabs": [
+            {
+                "id": 10,
+                "title": 'say "hi" \\ [x] {y}',
+                "layout_state": {"main": [1, {"x": "]"}], "nested": [[[]]]},
+                "windows": [
+                    {
+                        "id": 100,
+                        "title": "vim ünïcode ☃",
+                        "pid": 1000,
+                        "cwd": "/src",
+                        "env": {"PATH": "/bin:/usr/bin", "QUOTE": '"}]'},
+                        "foreground_processes": [{"pid": 1, "cmdline": ["vim", "a b"], "cwd": "/"}],
+                        "cmdline": ["zsh"],
+                        "lines": 40,
+                        "at_prompt": False,
+                        "user_vars": {},
+                        "extra": None,
+                        "ratio": -1.5e3,
+                    }
+                ],
+            }
+        ],
+    }
+]
+
+PRUNED = [
+    {
+        "id": 1,
+        "is_focused": True,
+        "tabs": [
+            {
+                "id": 10,
+                "title": 'say "hi" \\ [x] {y}',
+                "windows": [
+                    {
+                        "id": 100,
+                        "title": "vim ünïcode ☃",
+                        "pid": 1000,
+                        "cwd": "/src",
+                        "foreground_processes": [{"pid": 1, "cmdline": ["vim", "a b"], "cwd": "/"}],
+                    }
+                ],
+            }
+        ],
+    }
+]
+
+
+def chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 20])
+def test_decode_prunes_unused_fields_across_chunk_boundaries(size):
+    payload = json.dumps(NOISY_LS, indent=2).encode()
+    assert decode_kitty_ls(chunked(payload, size)) == PRUNED
+
+
+def test_decode_compact_and_ascii_escaped_output():
+    payload = json.dumps(NOISY_LS, separators=(",", ":"), ensure_ascii=True).encode()
+    assert decode_kitty_ls(chunked(payload, 5)) == PRUNED
+
+
+def test_decode_empty_list():
+    assert decode_kitty_ls([b" [ ] \n"]) == []
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"",
+        b"{not-json",
+        b'[{"id": 1',
+        b'[{"id": 1}] trailing',
+        b'[{"tabs": {"id": 1}}]',
+        b'[{"id" 1}]',
+        b"[1]",
+    ],
+)
+def test_decode_rejects_invalid_input(payload):
+    with pytest.raises(ValueError, match="at offset"):
+        decode_kitty_ls(chunked(payload, 3))
@@ -0,0 +1,135 @@
+import base64
+import itertools
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.activity import WindowActivity
+from catherd.kitty import KittySnapshot
+from catherd.layout import (
+    SavedOSWindow,
+    SavedTab,
+    SavedWindow,
+    layout_from_snapshot,
+    load_layout,
+    restore_layout,
+    save_layout,
+)
+from catherd.remote import KittyRemote
+
+SNAPSHOT = KittySnapshot.from_ls([
+    {
+        "id": 1,
+        "tabs": [
+            {
+                "id": 1,
+                "title": "code",
+                "windows": [
+                    {"id": 11, "title": "vim", "cwd": "/src"},
+                    {"id": 12, "title": "sh", "cwd": "/work"},
+                ],
+            },
+            {"id": 2, "title": "logs", "windows": [{"id": 21, "title": "tail"}]},
+        ],
+    },
+    {"id": 2, "tabs": [{"id": 3, "title": "ops", "windows": [{"id": 31, "title": "htop", "cwd": "/"}]}]},
+])
+ACTIVITY = [
+    WindowActivity("11", "1", "vim", "s1", "vim main.py"),
+    WindowActivity("12", "1", "sh", "s2", "(no command)"),
+    WindowActivity("21", "2", "tail", None, "(no session info)"),
+    WindowActivity("31", "3", "htop", "s3", "htop"),
+]
+
+
+def launching_server(fake_kitty_server, *, fail_match=None):
+    ids = itertools.count(100)
+
+    def handler(message):
+        if message["cmd"] != "launch":
+            return {"ok": True}
+        if fail_match is not None and message["payload"].get("match") == fail_match:
+            return {"ok": False, "error": "No matching windows"}
+        return {"ok": True, "data": next(ids)}
+
+    return fake_kitty_server(handler)
+
+
+def test_layout_from_snapshot_and_roundtrip(tmp_path):
+    layout = layout_from_snapshot(SNAPSHOT, ACTIVITY)
+    assert [[tab.title for tab in os_window.tabs] for os_window in layout] == [["code", "logs"], ["ops"]]
+    assert layout[0].tabs[0].windows == [
+        SavedWindow("vim", "/src", "vim main.py"),
+        SavedWindow("sh", "/work", None),
+    ]
+    assert layout[0].tabs[1].windows == [SavedWindow("tail", None, None)]
+    path = tmp_path / "sub" / "layout.json"
+    save_layout(layout, path)
+    assert load_layout(path) == layout
+
+
+def test_load_layout_rejects_other_files(tmp_path):
+    path = tmp_path / "layout.json"
+    path.write_text('{"version": 99}', encoding="utf-8")
+    with pytest.raises(ValueError, match="not a catherd layout"):
+        load_layout(path)
+    path.write_text(
+        '{"version": 1, "os_windows": [{"tabs": [{"windows": [{"shape": 1}]}]}]}', encoding="utf-8"
+    )
+    with pytest.raises(ValueError, match="not a valid catherd layout"):
+        load_layout(path)
+    for os_window in ({"tabs": []}, {"tabs": [{"windows": []}]}):
+        path.write_text(json.dumps({"version": 1, "os_windows": [os_window]}), encoding="utf-8")
+        with pytest.raises(ValueError, match="has no windows"):
+            load_layout(path)
+
+
+def test_restore_layout_pipelines_launches(fake_kitty_server):
+    server = launching_server(fake_kitty_server)
+    layout = layout_from_snapshot(SNAPSHOT, ACTIVITY)
+    with KittyRemote(server.address) as remote:
+        result = restore_layout(remote, layout, prefill=True)
+    assert (result.launched, result.failed, result.error) == (4, 0, None)
+    assert server.connections == 1
+    launches = [(m["cmd"], m["payload"]) for m in server.messages]
+    assert launches[:5] == [
+        ("launch", {"type": "os-window", "cwd": "/src"}),
+        ("launch", {"type": "os-window", "cwd": "/"}),
+        ("launch", {"type": "tab", "match": "window_id:100"}),
+        ("launch", {"type": "window", "cwd": "/work", "match": "window_id:100"}),
+        ("send-text", launches[4][1]),
+    ]
+    prefills = {m["payload"]["match"]: m["payload"]["data"] for m in server.messages[4:]}
+    assert {match: base64.b64decode(data.removeprefix("base64:")) for match, data in prefills.items()} == {
+        "id:100": b"vim main.py",
+        "id:101": b"htop",
+    }
+
+
+def test_restore_layout_skips_children_of_failed_launches(fake_kitty_server):
+    server = launching_server(fake_kitty_server, fail_match="window_id:100")
+    layout = [SavedOSWindow([SavedTab("a", [SavedWindow(), SavedWindow()]), SavedTab("b", [SavedWindow()])])]
+    with KittyRemote(server.address) as remote:
+        result = restore_layout(remote, layout)
+    assert (result.launched, result.failed, result.error) == (1, 2, "No matching windows")
+    assert [m["payload"]["type"] for m in server.messages] == ["os-window", "tab", "window"]
+
+
+def test_save_and_restore_commands(monkeypatch, tmp_path, fake_kitty_server):
+    monkeypatch.setattr(cli, "get_kitty_snapshot", lambda **_kwargs: SNAPSHOT)
+    monkeypatch.setattr(cli, "collect_activity", lambda *_args, **_kwargs: ACTIVITY)
+    path = tmp_path / "layout.json"
+    result = CliRunner().invoke(cli.main, ["save", "--file", str(path)])
+    assert "[OK] Saved 4 window(s) in 3 tab(s)" in result.output
+
+    server = launching_server(fake_kitty_server)
+    result = CliRunner().invoke(cli.main, ["restore", "--file", str(path), "--to", server.address])
+    assert "[OK] Restored 4 window(s)" in result.output
+    assert len(server.messages) == 4
+
+    missing = CliRunner().invoke(cli.main, ["restore", "--file", str(tmp_path / "none.json")])
+    assert "No saved layout" in missing.output
+    monkeypatch.setattr(cli, "get_kitty_snapshot", lambda **_kwargs: None)
+    assert "Could not get Kitty windows" in CliRunner().invoke(cli.main, ["save", "--file", str(path)]).output
@@ -0,0 +1,62 @@
+from catherd.hooks import HistoryEvent
+from catherd.kitty import KittyWindow
+from catherd.metrics import MetricsState, render_metrics, session_file_names, sync_state
+from catherd.registry import SESSION_FILE_PREFIX, resolve_registry_keys
+
+
+def event(session, exit_code=0):
+    return HistoryEvent(1, session, "make", "/work", exit_code, 1, 1)
+
+
+WINDOWS = [
+    KittyWindow(id="1", tab="10", title="a", os_window="100"),
+    KittyWindow(id="2", tab="10", title="b", os_window="100"),
+    KittyWindow(id="3", tab="20", title="c", os_window="100"),
+]
+
+
+def test_metrics_state_counts_and_prunes(tmp_path):
+    path = tmp_path / "state.json"
+    state = MetricsState(path)
+    state.count([event("s1"), event("s1", 2), event("s2")])
+    state.prune(["s1"])
+    state.source(tmp_path / "h.db").update(rowid=5, pending=[])
+    state.save()
+    again = MetricsState(path)
+    assert again.sessions == {"s1": [2, 1]}
+    assert again.source(tmp_path / "h.db") == {"rowid": 5, "pending": []}
+
+
+def test_sync_state_and_session_files(tmp_path):
+    (tmp_path / f"{SESSION_FILE_PREFIX}1").write_text("s1\n", encoding="utf-8")
+    (tmp_path / f"{SESSION_FILE_PREFIX}2").write_text("", encoding="utf-8")
+    files = session_file_names(tmp_path)
+    assert files == {"1", "2"}
+    keys = resolve_registry_keys(WINDOWS, files)
+    assert [sync_state(keys[win.id], {"1": "s1"}) for win in WINDOWS] == [
+        "synced",
+        "corrupt_file",
+        "missing_file",
+    ]
+    assert session_file_names(tmp_path / "missing") == set()
+
+
+def test_render_metrics():
+    text = render_metrics(WINDOWS, {"1": "s1", "3": "s3"}, {"1", "3"}, {"s1": [4, 1]})
+    lines = text.splitlines()
+    assert "catherd_kitty_up 1" in lines
+    assert 'catherd_windows{os_window="100",tab="10"} 2' in lines
+    assert 'catherd_windows{os_window="100",tab="20"} 1' in lines
+    assert 'catherd_sync_windows{state="synced"} 2' in lines
+    assert 'catherd_sync_windows{state="missing_file"} 1' in lines
+    assert "# TYPE catherd_window_commands counter" in lines
+    assert 'catherd_window_commands_total{window="1"} 4' in lines
+    assert 'catherd_window_failures_total{window="1"} 1' in lines
+    assert 'catherd_window_commands_total{window="3"} 0' in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_render_metrics_without_kitty():
+    text = render_metrics(None, {}, set(), {})
+    assert "catherd_kitty_up 0" in text.splitlines()
+    assert "catherd_windows{" not in text
@@ -0,0 +1,84 @@
+from catherd import perf
+from catherd.config import get_xdg_cache_dir
+from catherd.deadline import Deadline
+from catherd.kitty import KittyError, KittySnapshot, KittyTimeoutError
+from catherd.perf import PerfFinding, check_query_plans, check_registry, check_storage, perf_score
+
+LS = [{"id": 1, "tabs": [{"id": 2, "windows": [{"id": 3, "title": "zsh"}]}]}]
+
+
+ROWS = [(f"s{i % 3}", f"cmd{i}", i) for i in range(50)]
+
+
+def test_query_plan_flags_full_scan(history_db):
+    findings = check_query_plans(history_db(rows=ROWS).path)
+    assert any(f.status == "fail" and "full scan" in f.detail for f in findings)
+    assert any(f.check.startswith("indexes") for f in findings)
+
+
+def test_query_plan_ok_with_session_index(history_db):
+    findings = check_query_plans(history_db(rows=ROWS, index=True).path)
+    assert all(f.status != "fail" for f in findings)
+    assert not any(f.check.startswith("indexes") for f in findings)
+
+
+def test_storage_reports_sizes_and_wal(tmp_path, monkeypatch, history_db):
+    db = history_db(rows=ROWS).path
+    (tmp_path / "history.db-wal").write_bytes(b"\0" * 2048)
+    monkeypatch.setattr(perf, "WAL_WARN_BYTES", 1024)
+    findings = check_storage(db)
+    assert "page size" in findings[0].detail
+    wal = [f for f in findings if f.check.startswith("wal")]
+    assert wal
+    assert "wal_checkpoint(TRUNCATE)" in wal[0].hint
+
+
+def test_registry_counts_stale_files():
+    cache = get_xdg_cache_dir()
+    (cache / "atuin_kitty_3").write_text("s1\n")
+    (cache / "atuin_kitty_9").write_text("s2\n")
+    findings = check_registry(KittySnapshot.from_ls(LS))
+    stale = next(f for f in findings if f.check == "stale session files")
+    assert stale.status == "warn"
+    assert stale.detail.startswith("1 file")
+    assert stale.hint.endswith("atuin_kitty_9")
+
+    (cache / "atuin_kitty_8").write_text("s3\n")
+    stale = next(f for f in check_registry(KittySnapshot.from_ls(LS)) if f.check == "stale session files")
+    assert stale.hint.splitlines()[1:] == [
+        f"         rm {cache / name}" for name in ("atuin_kitty_8", "atuin_kitty_9")
+    ]
+
+
+def test_kitty_failure_is_reported(monkeypatch):
+    def boom(**_kwargs):
+        msg = "no kitty"
+        raise KittyError(msg)
+
+    monkeypatch.setattr(perf, "run_kitty_ls", boom)
+    findings, snapshot = perf.check_kitty_ls()
+    assert snapshot is None
+    assert findings[0].status == "fail"
+
+
+def test_perf_score():
+    findings = [PerfFinding("a", "ok", ""), PerfFinding("b", "warn", ""), PerfFinding("c", "fail", "")]
+    assert perf_score(findings) == 65
+    assert perf_score([PerfFinding("x", "fail", "")] * 10) == 0
+
+
+def test_checks_report_an_expired_deadline_as_timed_out(monkeypatch, history_db):
+    seen = {}
+
+    def slow_ls(**kwargs):
+        seen.update(kwargs)
+        msg = "kitty did not answer"
+        raise KittyTimeoutError(msg)
+
+    monkeypatch.setattr(perf, "run_kitty_ls", slow_ls)
+    db = history_db(rows=ROWS).path
+    deadline = Deadline(0)
+    findings = perf.run_perf_checks([db], deadline=deadline)
+    assert seen == {"timeout": 0.0}
+    timed_out = [finding.check for finding in findings if finding.detail.startswith("timed out")]
+    assert timed_out == ["history db (history.db)", "kitty @ ls"]
@@ -0,0 +1,89 @@
+import time
+from types import SimpleNamespace
+
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.activity import WindowActivity
+from catherd.kitty import KittyWindow
+from catherd.picker import FuzzyIndex, PickEntry, Picker, fuzzy_score
+
+ROWS = [
+    WindowActivity("1", "1", "vim notes.md", "s1", "vim notes.md"),
+    WindowActivity("2", "1", "zsh", "s2", "kubectl get pods"),
+    WindowActivity("3", "2", "htop", "s3", "htop"),
+    WindowActivity("4", "2", "zsh", "s4", "make test"),
+]
+
+
+def make_index():
+    return FuzzyIndex([PickEntry.from_activity(row) for row in ROWS])
+
+
+def test_fuzzy_score_prefers_boundaries_and_runs():
+    assert fuzzy_score("xyz", "vim") is None
+    assert fuzzy_score("kgp", "kubectl get pods") > fuzzy_score("kgp", "kangaroo pie")
+    assert fuzzy_score("make", "make test") > fuzzy_score("make", "m a k e")
+
+
+def test_search_ranks_and_rescores_only_previous_candidates():
+    index = make_index()
+    assert [e.window_id for e in index.search("")] == ["1", "2", "3", "4"]
+    assert [e.window_id for e in index.search("k")] == ["2", "4"]
+    assert index.scored == 4
+    assert [e.window_id for e in index.search("kub")] == ["2"]
+    assert index.scored == 6
+    # Backspace reuses the stored candidate set of the shorter query.
+    assert [e.window_id for e in index.search("k")] == ["2", "4"]
+    assert index.scored == 6
+    assert index.search("HT")[0].window_id == "3"
+
+
+def test_picker_keys_and_render():
+    picker = Picker(make_index())
+    for key in "zsh":
+        assert picker.handle_key(key) is None
+    assert [e.window_id for e in picker.matches] == ["2", "4"]
+    picker.handle_key("\x1b[B")
+    assert picker.choice.window_id == "4"
+    assert "> zsh" in picker.render(10)
+    assert ">      4 | zsh" in picker.render(10)
+    picker.handle_key("\x7f")
+    assert picker.query == "zs"
+    assert picker.handle_key("\r") == "select"
+    assert picker.handle_key("\x1b") == "cancel"
+    picker.handle_key("q")
+    assert not picker.matches
+    assert picker.handle_key("\r") is None
+
+
+def test_pick_command(monkeypatch, fake_kitty_server):
+    server = fake_kitty_server()
+    windows = [KittyWindow(id=row.window_id, tab=row.tab, title=row.title) for row in ROWS]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(cli, "collect_activity", lambda *_args, **_kwargs: ROWS)
+    runner = CliRunner()
+    assert runner.invoke(cli.main, ["pick", "--query", "kgp", "--print"]).output == "2\n"
+    result = runner.invoke(cli.main, ["pick", "--query", "make", "--to", server.address])
+    assert "[OK] Focused      4 | zsh" in result.output
+    assert server.messages[0]["cmd"] == "focus-window"
+    assert server.messages[0]["payload"] == {"match": "id:4"}
+    assert "No windows match" in runner.invoke(cli.main, ["pick", "--query", "zzz"]).output
+    assert "needs a terminal" in runner.invoke(cli.main, ["pick"]).output
+
+
+def test_pick_focuses_after_a_choice_slower_than_the_deadline(monkeypatch, fake_kitty_server):
+    server = fake_kitty_server()
+    windows = [KittyWindow(id=row.window_id, tab=row.tab, title=row.title) for row in ROWS]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    monkeypatch.setattr(cli, "collect_activity", lambda *_args, **_kwargs: ROWS)
+    monkeypatch.setattr(cli.click, "get_text_stream", lambda _name: SimpleNamespace(isatty=lambda: True))
+
+    def slow_picker(picker):
+        time.sleep(0.1)
+        return picker.index.entries[2]
+
+    monkeypatch.setattr(cli, "run_picker", slow_picker)
+    result = CliRunner().invoke(cli.main, ["pick", "--deadline", "20", "--to", server.address])
+    assert "[OK] Focused      3 | htop" in result.output
+    assert server.messages[0]["payload"] == {"match": "id:3"}
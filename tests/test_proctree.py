@@ -0,0 +1,55 @@
+from catherd.kitty import KittyWindow
+from catherd.proctree import LoadSampler, build_children, descendants, parse_stat, read_proc_stats
+
+
+def test_parse_stat_handles_odd_command_names(tmp_path, write_proc):
+    write_proc(tmp_path, {42: ("my (weird) cmd", 7, 10, 5, 999, 300)})
+    stat = parse_stat((tmp_path / "42" / "stat").read_text())
+    assert (stat.pid, stat.ppid, stat.ticks, stat.start, stat.rss_pages) == (42, 7, 15, 999, 300)
+
+
+def test_read_proc_stats_and_tree(tmp_path, write_proc):
+    write_proc(
+        tmp_path, {1: ("init", 0, 0, 0, 1, 10), 10: ("zsh", 1, 1, 1, 5, 20), 11: ("make", 10, 0, 0, 6, 30)}
+    )
+    (tmp_path / "self").mkdir()
+    (tmp_path / "99").mkdir()  # exited between listing and reading
+    stats = read_proc_stats(tmp_path)
+    assert sorted(stats) == [1, 10, 11]
+    children = build_children(stats)
+    assert sorted(descendants(10, children)) == [10, 11]
+    assert sorted(descendants(1, children)) == [1, 10, 11]
+
+
+def test_sampler_diffs_ticks_between_samples(tmp_path, write_proc):
+    clock = iter([100.0, 102.0])
+    sampler = LoadSampler(tmp_path, ticks_per_second=100, page_size=4096, clock=lambda: next(clock))
+    windows = [
+        KittyWindow(id="1", tab="t", title="busy", pid=10),
+        KittyWindow(id="2", tab="t", title="idle", pid=20),
+        KittyWindow(id="3", tab="t", title="gone", pid=30),
+    ]
+    write_proc(
+        tmp_path,
+        {
+            10: ("zsh", 1, 5, 5, 1, 100),
+            11: ("cc", 10, 50, 10, 2, 1000),
+            20: ("zsh", 1, 7, 3, 3, 100),
+            21: ("exits", 20, 10, 0, 4, 1),
+        },
+    )
+    first = sampler.sample(windows)
+    assert [load.cpu_percent for load in first] == [0.0, 0.0, 0.0]
+    assert first[0].window.id == "1"
+    assert first[0].rss_bytes == 1100 * 4096
+    assert first[0].processes == 2
+
+    # cc used 100 more ticks in 2 s; a new child of window 2 used 20; pid 21 exited.
+    write_proc(tmp_path, {11: ("cc", 10, 130, 30, 2, 1200), 22: ("new", 20, 15, 5, 9, 50)})
+    (tmp_path / "21" / "stat").unlink()
+    (tmp_path / "21").rmdir()
+    loads = {load.window.id: load for load in sampler.sample(windows)}
+    assert loads["1"].cpu_percent == 50.0
+    assert loads["2"].cpu_percent == 10.0
+    assert loads["3"].cpu_percent == 0.0
+    assert loads["3"].processes == 0
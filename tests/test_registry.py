@@ -0,0 +1,122 @@
+from catherd.kitty import KittySnapshot
+from catherd.registry import (
+    LINEAGE_DIRNAME,
+    MAX_LINEAGE_SESSIONS,
+    LineageEntry,
+    compact_session_lineage,
+    earlier_sessions,
+    instance_key,
+    parse_lineage,
+    read_session_lineage,
+    read_session_registry,
+    registry_key,
+    split_registry_key,
+    window_sessions,
+)
+
+
+def test_read_session_registry(tmp_path):
+    (tmp_path / "atuin_kitty_1").write_text("sess1 1\n")
+    (tmp_path / "atuin_kitty_2").write_text("")
+    (tmp_path / "atuin_kitty_3").mkdir()
+    (tmp_path / "unrelated").write_text("x")
+    assert read_session_registry(tmp_path) == {"1": "sess1"}
+
+
+def test_read_session_registry_default_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    (tmp_path / "catherd").mkdir()
+    (tmp_path / "catherd" / "atuin_kitty_7").write_text("s7 7")
+    assert read_session_registry() == {"7": "s7"}
+
+
+def test_read_session_registry_missing_dir(tmp_path):
+    assert read_session_registry(tmp_path / "nope") == {}
+
+
+def test_parse_lineage_drops_repeats():
+    text = "a 100 1\nb 200 1\na 300 1\n\nc 400 2\nd 500 2\nc 600 2\n"
+    assert parse_lineage(text) == [
+        LineageEntry("a", 100, "1"),
+        LineageEntry("b", 200, "1"),
+        LineageEntry("c", 400, "2"),
+        LineageEntry("d", 500, "2"),
+    ]
+    assert parse_lineage("a\nb x\n") == [LineageEntry("a"), LineageEntry("b")]
+
+
+def test_read_session_lineage_only_reads_and_compaction_is_explicit(tmp_path):
+    lineage_dir = tmp_path / LINEAGE_DIRNAME
+    lineage_dir.mkdir()
+    big = "".join(f"session-{i:04d} {1_700_000_000 + i} 42\n" for i in range(200))
+    (lineage_dir / "1").write_text(big)
+    (lineage_dir / "2").write_text("s2 1700000000 42\n")
+    (lineage_dir / "3").write_text("")
+    lineage = read_session_lineage(tmp_path)
+    assert set(lineage) == {"1", "2"}
+    assert len(lineage["1"]) == 200
+    assert (lineage_dir / "1").read_text() == big
+
+    assert compact_session_lineage(tmp_path) == 1
+    compacted = parse_lineage((lineage_dir / "1").read_text())
+    assert compacted == lineage["1"][-MAX_LINEAGE_SESSIONS:]
+    assert compacted[-1] == LineageEntry("session-0199", 1_700_000_199, "42")
+    assert sorted(p.name for p in lineage_dir.iterdir()) == ["1", "2", "3"]
+    assert compact_session_lineage(tmp_path) == 0
+    assert read_session_lineage(tmp_path / "nope") == {}
+    assert compact_session_lineage(tmp_path / "nope") == 0
+
+
+def test_earlier_sessions():
+    lineage = {"1": [LineageEntry("a"), LineageEntry("b")], "2": [LineageEntry("c")]}
+    assert earlier_sessions({"1": "b", "2": "c", "3": "d"}, lineage) == {"b": ["a"]}
+    # A legacy lineage file counts for an instance's window only if it lists that window's session.
+    assert earlier_sessions({"x_1": "b", "y_1": "e"}, lineage) == {"b": ["a"]}
+
+
+def test_earlier_sessions_with_interleaved_kitty_pids():
+    # Window 1 of two kitty processes, written by an older snippet to one file.
+    lineage = {"1": parse_lineage("a 100 1\nc 150 2\nb 200 1\nd 250 2\ne 300 2\n")}
+    assert earlier_sessions({"x_1": "b", "y_1": "e"}, lineage) == {"b": ["a"], "e": ["c", "d"]}
+    # Kitty restarted: the window's own file keeps only this process's sessions.
+    lineage = {"x_1": parse_lineage("a 100 1\nb 200 1\nc 300 2\n")}
+    assert earlier_sessions({"x_1": "c"}, lineage) == {}
+    assert earlier_sessions({"x_1": "b"}, lineage) == {"b": ["a"]}
+
+
+def test_windows_of_two_instances_with_the_same_ids(monkeypatch):
+    ls = [{"id": 1, "tabs": [{"id": 1, "windows": [{"id": 1}, {"id": 2}]}]}]
+    snapshot = KittySnapshot.from_instances(
+        {"a": ls, "b": ls}, {"a": "unix:/tmp/kitty-a", "b": "unix:/tmp/kitty-b"}
+    )
+    registry = {
+        registry_key(1, instance_key("unix:/tmp/kitty-a")): "sa1",
+        registry_key(1, instance_key("unix:/tmp/kitty-b")): "sb1",
+        "2": "old",  # Bare-ID file from an older snippet: window 2 of a or b?
+    }
+    assert window_sessions(snapshot.windows, registry) == {
+        "a/1": "sa1",
+        "a/2": None,
+        "b/1": "sb1",
+        "b/2": None,
+    }
+
+    # A single instance: its own file, then an unambiguous bare-ID file.
+    windows = KittySnapshot.from_ls(ls).windows
+    monkeypatch.setenv("KITTY_LISTEN_ON", "unix:/tmp/kitty-b")
+    assert window_sessions(windows, registry) == {"1": "sb1", "2": "old"}
+    # Window 1 of another instance must not get a's or b's session.
+    monkeypatch.setenv("KITTY_LISTEN_ON", "unix:/tmp/kitty-c")
+    assert window_sessions(windows, registry) == {"1": None, "2": "old"}
+    # Outside kitty the instance is unknown, so only a file no other instance shares is used.
+    monkeypatch.delenv("KITTY_LISTEN_ON")
+    assert window_sessions(windows, {"pid9_1": "s9", "2": "old"}) == {"1": "s9", "2": "old"}
+    assert window_sessions(windows, registry) == {"1": None, "2": "old"}
+
+
+def test_instance_key_matches_the_snippets():
+    assert instance_key("unix:/tmp/kitty-12") == "unix__tmp_kitty-12"
+    assert instance_key(None, 42) == "pid42"
+    assert instance_key() is None
+    assert split_registry_key("unix__tmp_kitty-12_3") == ("unix__tmp_kitty-12", "3")
+    assert split_registry_key("3") == (None, "3")
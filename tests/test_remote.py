@@ -0,0 +1,124 @@
+import base64
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.deadline import Deadline
+from catherd.kitty import KittyWindow
+from catherd.remote import (
+    KittyRemote,
+    KittyRemoteError,
+    KittyRemoteTimeoutError,
+    encode_request,
+    get_listen_on,
+)
+
+
+def test_get_listen_on(monkeypatch):
+    monkeypatch.delenv("KITTY_LISTEN_ON", raising=False)
+    with pytest.raises(KittyRemoteError, match="No kitty socket"):
+        get_listen_on()
+    monkeypatch.setenv("KITTY_LISTEN_ON", "unix:/env")
+    assert get_listen_on() == "unix:/env"
+    assert get_listen_on("unix:/explicit") == "unix:/explicit"
+
+
+def test_encode_request():
+    data = encode_request("ls", {"all": True})
+    assert data.startswith(b"\x1bP@kitty-cmd{")
+    assert data.endswith(b"\x1b\\")
+    assert b'"cmd":"ls"' in data
+
+
+def test_request_and_pipeline_share_one_connection(fake_kitty_server):
+    server = fake_kitty_server(lambda m: {"ok": True, "data": m["payload"]["n"]})
+    with KittyRemote(server.address) as remote:
+        assert remote.request("echo", {"n": -1})["data"] == -1
+        responses = remote.pipeline([("echo", {"n": i}) for i in range(200)], depth=16)
+    assert [r["data"] for r in responses] == list(range(200))
+    assert server.connections == 1
+    assert len(server.messages) == 201
+
+
+class ChunkedSocket:
+    """Hands out a fixed reply a few bytes at a time."""
+
+    def __init__(self, data, size):
+        self.chunks = [data[i : i + size] for i in range(0, len(data), size)]
+        self.reads = 0
+
+    def recv(self, _bufsize):
+        self.reads += 1
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def close(self):
+        pass
+
+
+def test_responses_split_across_many_chunks():
+    text = "x" * 20_000
+    data = b"\x1bP@kitty-cmd" + json.dumps({"ok": True, "data": text}).encode() + b"\x1b\\"
+    data += b"\x1bP@kitty-cmd" + b'{"ok": true}' + b"\x1b\\"
+    remote = KittyRemote("unix:/unused", timeout=None)
+    remote._sock = sock = ChunkedSocket(data, 7)  # The suffix lands across chunk boundaries.
+    assert remote._read_response()["data"] == text
+    assert remote._read_response() == {"ok": True}
+    assert sock.reads == len(data) // 7 + 1
+
+
+def test_connect_errors(tmp_path):
+    with pytest.raises(KittyRemoteError, match="Could not connect"):
+        KittyRemote(f"unix:{tmp_path / 'missing.sock'}").connect()
+    with pytest.raises(KittyRemoteError, match="Unsupported"):
+        KittyRemote("pipe:whatever").connect()
+
+
+def test_closed_connection(fake_kitty_server):
+    server = fake_kitty_server(lambda _m: None)
+    remote = KittyRemote(server.address, timeout=0.2)
+    with pytest.raises(KittyRemoteError, match="No response"):
+        remote.request("ls")
+    remote.close()
+
+
+def test_deadline_bounds_socket_reads(fake_kitty_server):
+    server = fake_kitty_server(lambda _message: None)
+    with KittyRemote(server.address, deadline=Deadline(50)) as remote:
+        with pytest.raises(KittyRemoteTimeoutError):
+            remote.request("ls")
+        with pytest.raises(KittyRemoteTimeoutError, match="Deadline of 50 ms"):
+            remote.request("ls")
+
+
+def test_send_command(monkeypatch, fake_kitty_server):
+    def handler(message):
+        if message["payload"]["match"] == "id:2":
+            return {"ok": False, "error": "No matching windows"}
+        return {"ok": True}
+
+    server = fake_kitty_server(handler)
+    windows = [
+        KittyWindow(id="1", tab="t", title="vim"),
+        KittyWindow(id="2", tab="t", title="vim 2"),
+        KittyWindow(id="3", tab="t", title="htop"),
+    ]
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: windows)
+    result = CliRunner().invoke(cli.main, ["send", "--to", server.address, "-m", "title:^vim", "make"])
+    assert "[OK]      1 | vim" in result.output
+    assert "[FAIL]      2 | No matching windows" in result.output
+    assert "Sent to 1/2 window(s)" in result.output
+    assert [m["cmd"] for m in server.messages] == ["send-text", "send-text"]
+    assert base64.b64decode(server.messages[0]["payload"]["data"].removeprefix("base64:")) == b"make\r"
+    assert server.connections == 1
+
+
+def test_send_command_errors(monkeypatch):
+    monkeypatch.delenv("KITTY_LISTEN_ON", raising=False)
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: [KittyWindow(id="1", tab="t", title="x")])
+    assert "No kitty socket" in CliRunner().invoke(cli.main, ["send", "-m", "id:1", "ls"]).output
+    assert "No windows match" in CliRunner().invoke(cli.main, ["send", "-m", "id:9", "ls"]).output
+    assert "Invalid pattern" in CliRunner().invoke(cli.main, ["send", "-m", "title:(", "ls"]).output
+    monkeypatch.setattr(cli, "get_kitty_windows", lambda **_kwargs: None)
+    assert "Could not get Kitty windows" in CliRunner().invoke(cli.main, ["send", "-m", "id:1", "ls"]).output
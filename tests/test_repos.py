@@ -0,0 +1,102 @@
+import json
+import os
+
+from catherd import repos
+from catherd.kitty import KittyWindow
+from catherd.repos import NO_REPO, RepoResolver, group_windows_by_repo
+
+
+def make_tree(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / ".git").mkdir(parents=True)
+    (repo / "src" / "pkg").mkdir(parents=True)
+    (repo / "docs").mkdir()
+    worktree = tmp_path / "worktree"
+    worktree.mkdir()
+    (worktree / ".git").write_text("gitdir: elsewhere\n")
+    (tmp_path / "plain").mkdir()
+    return repo, worktree
+
+
+def count_lexists(monkeypatch):
+    calls = []
+    real = os.path.lexists
+
+    def counting(path):
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(repos.os.path, "lexists", counting)
+    return calls
+
+
+def test_resolve_memoizes_shared_parents(tmp_path, monkeypatch):
+    repo, worktree = make_tree(tmp_path)
+    calls = count_lexists(monkeypatch)
+    resolver = RepoResolver(tmp_path / "cache.json")
+    assert resolver.resolve(str(repo / "src" / "pkg")) == str(repo)
+    first = len(calls)
+    assert first == 3  # pkg, src, repo
+    assert resolver.resolve(str(repo / "docs")) == str(repo)
+    assert len(calls) == first + 1  # only docs itself; repo is memoized
+    assert resolver.resolve(str(repo / "src" / "pkg") + "/") == str(repo)
+    assert resolver.resolve(str(worktree)) == str(worktree)
+    assert resolver.resolve(str(tmp_path / "plain")) is None
+    assert resolver.resolve(None) is None
+
+
+def test_disk_cache_keyed_by_inode_and_mtime(tmp_path, monkeypatch):
+    repo, _ = make_tree(tmp_path)
+    cache = tmp_path / "cache.json"
+    cwd = str(repo / "src" / "pkg")
+    resolver = RepoResolver(cache)
+    resolver.resolve(cwd)
+    resolver.resolve(str(tmp_path / "plain"))
+    resolver.save()
+    assert list(json.loads(cache.read_text())) == [cwd]
+
+    calls = count_lexists(monkeypatch)
+    assert RepoResolver(cache).resolve(cwd) == str(repo)
+    assert calls == []
+
+    (repo / "src" / "pkg" / ".git").mkdir()  # changes the cwd's mtime
+    assert RepoResolver(cache).resolve(cwd) == cwd
+    assert calls
+
+
+def test_disk_cache_notices_a_repo_created_between_cwd_and_root(tmp_path):
+    repo, _ = make_tree(tmp_path)
+    cache = tmp_path / "cache.json"
+    cwd = str(repo / "src" / "pkg")
+    resolver = RepoResolver(cache)
+    resolver.resolve(cwd)
+    resolver.save()
+    (repo / "src" / ".git").write_text("gitdir: elsewhere\n")  # e.g. a submodule at src
+    assert RepoResolver(cache).resolve(cwd) == str(repo / "src")
+
+    cache.write_text(json.dumps({cwd: [[1, 2], str(repo), [3, 4]]}))  # An older cache format.
+    assert RepoResolver(cache).resolve(cwd) == str(repo / "src")
+
+
+def test_group_windows_by_repo(tmp_path):
+    repo, worktree = make_tree(tmp_path)
+    windows = [
+        KittyWindow(id="1", tab="t", title="a", cwd=str(repo / "docs")),
+        KittyWindow(id="2", tab="t", title="b", cwd=str(tmp_path / "plain")),
+        KittyWindow(id="3", tab="t", title="c", cwd=str(worktree)),
+        KittyWindow(id="4", tab="t", title="d", cwd=str(repo)),
+        KittyWindow(id="5", tab="t", title="e"),
+    ]
+    groups = group_windows_by_repo(windows, RepoResolver(tmp_path / "cache.json"))
+    assert [(label, [w.id for w in group]) for label, group in groups] == [
+        (f"Repo {repo}", ["1", "4"]),
+        (f"Repo {worktree}", ["3"]),
+        (NO_REPO, ["2", "5"]),
+    ]
+    assert (tmp_path / "cache.json").exists()
+
+
+def test_repo_label_shortens_home(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert repos.repo_label(str(tmp_path / "src" / "x")) == "~/src/x"
+    assert repos.repo_label("/opt/x") == "/opt/x"
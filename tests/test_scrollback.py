@@ -0,0 +1,61 @@
+import re
+import threading
+
+from catherd import scrollback
+from catherd.kitty import KittyWindow
+from catherd.scrollback import grep_scrollback, scan_text
+
+TEXTS = {
+    "1": "ok\nError: disk full\nok\nerror again, error twice\n",
+    "2": "nothing here\n",
+    "3": "Error at the end",
+}
+
+
+class FakeRemote:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, address, **_kwargs):
+        self.address = address
+
+    def __enter__(self):  # noqa: D105
+        with FakeRemote.lock:
+            FakeRemote.active += 1
+            FakeRemote.peak = max(FakeRemote.peak, FakeRemote.active)
+        return self
+
+    def __exit__(self, *_exc):  # noqa: D105
+        with FakeRemote.lock:
+            FakeRemote.active -= 1
+
+    def request(self, cmd, payload):  # noqa: PLR6301
+        assert cmd == "get-text"
+        assert payload["extent"] == "all"
+        window_id = payload["match"].removeprefix("id:")
+        if window_id not in TEXTS:
+            return {"ok": False, "error": "No matching windows"}
+        return {"ok": True, "data": TEXTS[window_id]}
+
+
+def test_scan_text_reports_each_line_once():
+    pattern = re.compile(r"error", re.IGNORECASE)
+    assert scan_text(pattern, TEXTS["1"]) == [(2, "Error: disk full"), (4, "error again, error twice")]
+    assert scan_text(pattern, TEXTS["3"]) == [(1, "Error at the end")]
+    assert scan_text(re.compile(r"^ok", re.MULTILINE), "ok\r\nx\nok") == [(1, "ok"), (3, "ok")]
+    assert scan_text(pattern, "") == []
+
+
+def test_grep_scrollback_bounded_pool(monkeypatch):
+    monkeypatch.setattr(scrollback, "KittyRemote", FakeRemote)
+    windows = [KittyWindow(id=i, tab="t", title=f"w{i}") for i in ["1", "2", "3", "4"]]
+    results = {
+        r.window.id: r for r in grep_scrollback(windows, re.compile(r"Error"), address="unix:@k", jobs=2)
+    }
+    assert results["1"].lines == [(2, "Error: disk full")]
+    assert results["2"].lines == []
+    assert results["3"].lines == [(1, "Error at the end")]
+    assert "No matching windows" in str(results["4"].error)
+    assert FakeRemote.peak <= 2
+    assert list(grep_scrollback([], re.compile(r"x"), address="unix:@k")) == []
@@ -0,0 +1,126 @@
+import sqlite3
+
+from catherd.deadline import TIMED_OUT, Deadline
+from catherd.session_index import (
+    SessionIndex,
+    get_indexed_last_commands,
+    get_indexed_recent_windows,
+    get_session_index_path,
+)
+
+
+def test_refresh_reads_only_new_rows(tmp_path, history_db):
+    db = history_db(tmp_path / "history.db", [("s1", "ls", 1), ("s1", "vim", 3), ("s2", "top", 2)])
+    index = SessionIndex(tmp_path / "index.db")
+    assert index.refresh([db.path]) == 3
+    assert index.lookup(["s1", "s2", "s3"]) == {"s1": (3, "vim", 2), "s2": (2, "top", 1)}
+
+    assert index.refresh([db.path]) == 0
+    db.add_rows([("s1", "make", 5), ("s2", "late-arriving-old", 1)])
+    assert index.refresh([db.path]) == 2
+    assert index.lookup(["s1", "s2"]) == {"s1": (5, "make", 3), "s2": (2, "top", 2)}
+
+
+def test_refresh_merges_sources_and_rebuilds_when_replaced(tmp_path, history_db):
+    a = history_db(tmp_path / "a.db", [("s1", "from-a", 1)])
+    b = history_db(tmp_path / "b.db", [("s1", "from-b", 2)])
+    index = SessionIndex(tmp_path / "index.db")
+    index.refresh([a.path, b.path])
+    assert index.lookup(["s1"]) == {"s1": (2, "from-b", 2)}
+
+    # Dropping a source rebuilds from the remaining ones.
+    index.refresh([a.path])
+    assert index.lookup(["s1"]) == {"s1": (1, "from-a", 1)}
+
+    # A history DB replaced under the same path is detected via the high-water row.
+    a.path.unlink()
+    history_db(a.path, [("s9", "fresh", 7)])
+    assert index.refresh([a.path]) == 1
+    assert index.lookup(["s1", "s9"]) == {"s9": (7, "fresh", 1)}
+
+
+def test_replacing_one_source_keeps_the_others(tmp_path, history_db):
+    a = history_db(tmp_path / "a.db", [("s1", "from-a", 1)])
+    b = history_db(tmp_path / "b.db", [("s2", "from-b", 2)])
+    index = SessionIndex(tmp_path / "index.db")
+    index.refresh([a.path, b.path])
+    b.path.unlink()
+    history_db(b.path, [("s3", "fresh-b", 5)])
+    a.add_rows([("s1", "more-a", 3)])
+    assert index.refresh([a.path, b.path]) == 2
+    assert index.lookup(["s1", "s2", "s3"]) == {"s1": (3, "more-a", 2), "s3": (5, "fresh-b", 1)}
+
+
+def test_old_index_schema_is_rebuilt(tmp_path, history_db):
+    path = tmp_path / "index.db"
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE session_last (session TEXT PRIMARY KEY, last_ts, last_command, count)")
+    con.execute("INSERT INTO session_last VALUES ('s1', 9, 'stale', 1)")
+    con.commit()
+    con.close()
+    index = SessionIndex(path)
+    index.refresh([history_db(tmp_path / "a.db", [("s1", "ls", 1)]).path])
+    assert index.lookup(["s1"]) == {"s1": (1, "ls", 1)}
+
+
+def test_get_indexed_last_commands(tmp_path, capsys, history_db):
+    db = history_db(tmp_path / "history.db", [("s1", "ls", 1)]).path
+    index = SessionIndex(tmp_path / "index.db")
+    assert get_indexed_last_commands(["s1", "s2", "s1"], db_paths=[db], index=index, verbose=True) == {
+        "s1": "ls",
+        "s2": "(no command)",
+    }
+    assert "refreshed from 1 new history row(s)" in capsys.readouterr().out
+    assert get_indexed_last_commands([], db_paths=[db], index=index) == {}
+    assert get_indexed_last_commands(["s1"], db_paths=[tmp_path / "nope.db"]) == {"s1": "(no history db)"}
+
+
+def test_get_indexed_last_commands_follow_lineage(tmp_path, history_db):
+    db = history_db(tmp_path / "history.db", [("old", "make", 1), ("new", "ls", 2), ("old", "vim", 3)]).path
+    index = SessionIndex(tmp_path / "index.db")
+    result = get_indexed_last_commands(["new", "other"], db_paths=[db], index=index, lineage={"new": ["old"]})
+    assert result == {"new": "vim", "other": "(no command)"}
+
+
+def test_get_indexed_last_commands_sqlite_error(tmp_path, capsys):
+    bad = tmp_path / "bad.db"
+    bad.write_text("NOTADB")
+    index = SessionIndex(tmp_path / "index.db")
+    assert get_indexed_last_commands(["s"], db_paths=[bad], index=index, verbose=True) == {
+        "s": "(sqlite error)"
+    }
+    assert "SQLite error" in capsys.readouterr().out
+
+
+def test_default_index_path(monkeypatch, tmp_path, history_db):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert get_session_index_path() == tmp_path / "catherd" / "session_index.db"
+    db = history_db(tmp_path / "history.db", [("s1", "ls", 1)]).path
+    assert get_indexed_last_commands(["s1"], db_paths=[db]) == {"s1": "ls"}
+    assert get_session_index_path().exists()
+
+
+def test_expired_deadline_marks_results_timed_out(tmp_path, history_db):
+    db = history_db(tmp_path / "history.db", [("s1", "ls", 1)]).path
+    result = get_indexed_last_commands(
+        ["s1"], db_paths=[db], index=SessionIndex(tmp_path / "index.db"), deadline=Deadline(0)
+    )
+    assert result == {"s1": TIMED_OUT}
+
+
+def test_get_indexed_recent_windows(tmp_path, history_db):
+    db = history_db(tmp_path / "history.db", [("s1", "vim", 1), ("s2", "make", 5), ("s1b", "git", 4)]).path
+    index = SessionIndex(tmp_path / "index.db")
+    session_windows = {"s1": "1", "s1b": "1", "s2": "2", "s3": "3"}
+    assert get_indexed_recent_windows(session_windows, limit=5, db_paths=[db], index=index) == [
+        ("2", "make", 5),
+        ("1", "git", 4),
+    ]
+    assert get_indexed_recent_windows(session_windows, limit=1, oldest=True, db_paths=[db], index=index) == [
+        ("1", "git", 4)
+    ]
+    assert get_indexed_recent_windows({}, limit=1, db_paths=[db], index=index) == []
+    assert get_indexed_recent_windows(session_windows, limit=1, db_paths=[tmp_path / "no.db"]) is None
+    bad = tmp_path / "bad.db"
+    bad.write_text("NOTADB")
+    assert get_indexed_recent_windows(session_windows, limit=1, db_paths=[bad], index=index) is None
@@ -0,0 +1,94 @@
+import fcntl
+import os
+import threading
+import time
+
+from catherd.shared_cache import SharedCache
+from catherd.timings import Timings
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+
+    return compute, calls
+
+
+def test_miss_then_hit_across_instances(tmp_path):
+    compute, calls = counting({"a": 1})
+    first = SharedCache("x", ttl=60, directory=tmp_path)
+    assert first.get("k", compute) == {"a": 1}
+    second = SharedCache("x", ttl=60, directory=tmp_path)
+    assert second.get("k", compute) == {"a": 1}
+    assert len(calls) == 1
+    assert first.timings.counters["cache miss"] == 1
+    assert second.timings.counters["cache hit"] == 1
+
+
+def test_failed_write_still_returns_the_value(tmp_path):
+    (tmp_path / "x.json").mkdir()  # Cannot be replaced by a file.
+    compute, calls = counting([1])
+    cache = SharedCache("x", ttl=60, directory=tmp_path)
+    assert cache.get("k", compute) == [1]
+    assert cache.get("k", compute) == [1]
+    assert len(calls) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["x.json", "x.lock"]
+
+
+def test_key_change_and_expiry_refresh(tmp_path):
+    compute, calls = counting([1])
+    cache = SharedCache("x", ttl=60, directory=tmp_path)
+    cache.get("k1", compute)
+    cache.get("k2", compute)
+    assert len(calls) == 2
+    SharedCache("x", ttl=0, directory=tmp_path).get("k2", compute)
+    assert len(calls) == 3
+
+
+def test_waits_for_refresher_instead_of_computing(tmp_path):
+    holder = SharedCache("x", ttl=60, directory=tmp_path)
+    fd = os.open(holder.lock_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def refresh():
+        time.sleep(0.05)
+        holder._write("k", "fresh")
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    compute, calls = counting("computed")
+    waiter = SharedCache("x", ttl=60, wait=2, directory=tmp_path)
+    assert waiter.get("k", compute) == "fresh"
+    thread.join()
+    assert not calls
+    assert waiter.timings.counters["cache wait"] == 1
+    assert waiter.timings.counters["cache hit"] == 1
+
+
+def test_falls_back_to_stale_value_when_lock_is_held(tmp_path):
+    SharedCache("x", ttl=60, directory=tmp_path).get("k", lambda: "old")
+    cache = SharedCache("x", ttl=0, wait=0.02, directory=tmp_path, timings=Timings())
+    fd = os.open(cache.lock_path, os.O_RDWR)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        assert cache.get("k", lambda: "new") == "old"
+        assert cache.get("other", lambda: "new") == "new"
+    finally:
+        os.close(fd)
+    assert cache.timings.counters["cache stale"] == 1
+    assert cache.timings.counters["cache miss"] == 1
+
+
+def test_timings_report():
+    timings = Timings()
+    with timings.stage("kitty ls"):
+        pass
+    timings.count("cache hit", 2)
+    lines = timings.report()
+    assert lines[0].startswith("[timings] kitty ls: ")
+    assert lines[1] == "[timings] cache hit: 2"
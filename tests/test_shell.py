@@ -1,8 +1,12 @@
+import os
+import shutil
+import subprocess
 from pathlib import Path
 
 import pytest
 
 from catherd import shell
+from catherd.registry import instance_key, registry_key
 from catherd.shell import SHELL_SNIPPET_FILENAMES, get_shell_rc_path, load_snippet_for_shell
 
 
@@ -99,3 +103,21 @@ def test_load_snippet_for_shell_reads_file():
         assert "export X=42" in val
     finally:
         path.unlink()
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+def test_bash_snippet_appends_lineage(tmp_path):
+    snippet = (Path(shell.__file__).parent / "snippets" / SHELL_SNIPPET_FILENAMES["bash"]).read_text()
+    for session in ("s1", "s2"):
+        env = {"PATH": os.environ["PATH"], "HOME": str(tmp_path), "XDG_CACHE_HOME": str(tmp_path)}
+        env |= {"KITTY_WINDOW_ID": "7", "ATUIN_SESSION": session, "KITTY_PID": "99"}
+        subprocess.run(["bash", "-c", snippet], env=env, check=True)  # noqa: S607
+    assert (tmp_path / "catherd" / "atuin_kitty_pid99_7").read_text() == "s2 7\n"
+    lines = (tmp_path / "catherd" / "lineage" / "pid99_7").read_text().splitlines()
+    assert [line.split()[0::2] for line in lines] == [["s1", "99"], ["s2", "99"]]
+
+    env["KITTY_LISTEN_ON"] = "unix:@kitty 2"
+    subprocess.run(["bash", "-c", snippet], env=env, check=True)  # noqa: S607
+    key = registry_key("7", instance_key(env["KITTY_LISTEN_ON"], "99"))
+    assert (tmp_path / "catherd" / f"atuin_kitty_{key}").read_text() == "s2 7\n"
+    assert (tmp_path / "catherd" / "lineage" / key).read_text().split()[0::2] == ["s2", "99"]
@@ -0,0 +1,69 @@
+import sqlite3
+
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.activity import WindowActivity
+from catherd.timeline import TimelineRecorder, get_timeline_dir, replay
+
+DAY_MS = 86_400_000
+T0 = 1_700_000_000_000  # 2023-11-14T22:13:20Z
+
+
+def row(window_id, cmd, title="t"):
+    return WindowActivity(window_id, "1", title, f"s{window_id}", cmd)
+
+
+def test_record_stores_only_changes(tmp_path):
+    rec = TimelineRecorder(tmp_path, checkpoint_every=10)
+    assert rec.record([row("1", "ls"), row("2", "vim")], T0) == 2
+    assert rec.record([row("1", "ls"), row("2", "vim")], T0 + 1000) == 0
+    assert rec.record([row("1", "make"), row("2", "vim")], T0 + 2000) == 1
+    assert rec.record([row("1", "make")], T0 + 3000) == 1
+    rec.close()
+
+    assert replay(T0 - 1, tmp_path) is None
+    assert replay(T0 + 500, tmp_path) == [row("1", "ls"), row("2", "vim")]
+    assert replay(T0 + 2500, tmp_path) == [row("1", "make"), row("2", "vim")]
+    assert replay(T0 + 10_000, tmp_path) == [row("1", "make")]
+
+
+def test_replay_starts_from_nearest_checkpoint(tmp_path):
+    rec = TimelineRecorder(tmp_path, checkpoint_every=2)
+    for i in range(5):
+        rec.record([row("1", f"cmd{i}")], T0 + i * 1000)
+    rec.close()
+    conn = sqlite3.connect(tmp_path / "timeline-2023-11-14.db")
+    checkpoints = [ts for (ts,) in conn.execute("SELECT ts FROM samples WHERE checkpoint = 1 ORDER BY ts")]
+    conn.close()
+    assert checkpoints == [T0, T0 + 2000, T0 + 4000]
+    assert replay(T0 + 3500, tmp_path) == [row("1", "cmd3")]
+
+
+def test_rotation_and_replay_across_days(tmp_path):
+    rec = TimelineRecorder(tmp_path, checkpoint_every=100, keep_days=2)
+    rec.record([row("1", "day0")], T0)
+    rec.record([row("1", "day1")], T0 + DAY_MS)
+    rec.record([row("1", "day2")], T0 + 2 * DAY_MS)
+    rec.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["timeline-2023-11-15.db", "timeline-2023-11-16.db"]
+    # Early on day 2 (before any sample that day) falls back to the previous file.
+    assert replay(T0 + 2 * DAY_MS - 1, tmp_path) == [row("1", "day1")]
+    assert replay(T0 + 2 * DAY_MS, tmp_path) == [row("1", "day2")]
+
+
+def test_get_timeline_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert get_timeline_dir() == tmp_path / "catherd" / "timeline"
+    assert get_timeline_dir().is_dir()
+
+
+def test_keep_days_never_deletes_the_current_file(tmp_path):
+    (tmp_path / "timeline-2099-01-01.db").touch()  # Sorts after today's file.
+    rec = TimelineRecorder(tmp_path, keep_days=0)
+    assert rec.record([row("1", "x")], T0) == 1
+    rec.close()
+    assert [p.name for p in tmp_path.iterdir()] == ["timeline-2023-11-14.db"]
+    result = CliRunner().invoke(cli.main, ["record", "--keep-days", "0", "--count", "1"])
+    assert result.exit_code != 0
+    assert "--keep-days" in result.output
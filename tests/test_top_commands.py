@@ -0,0 +1,71 @@
+import random
+from collections import Counter
+
+import pytest
+
+from catherd.top_commands import CommandCount, SpaceSaving, command_key, top_commands
+
+
+@pytest.mark.parametrize(
+    ("command", "key"),
+    [
+        ("make -j8", "make"),
+        ("FOO=1 BAR=2 /usr/bin/make test", "make"),
+        ("sudo git commit -m 'x y'", "git commit"),
+        ("git --no-pager log", "git"),
+        ("kubectl get pods -A", "kubectl get"),
+        ("terraform", "terraform"),
+        ("  ls   -la ", "ls"),
+        ("time nice cargo build --release", "cargo build"),
+        ("sudo -u root make install", "make"),
+        ("sudo -E -- git pull", "git pull"),
+        ("time -p nice -n 5 make", "make"),
+        ("sudo -i", None),
+        ("FOO=1", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_command_key(command, key):
+    assert command_key(command) == key
+
+
+def test_space_saving_is_exact_within_capacity():
+    sketch = SpaceSaving(10)
+    for key in ["a", "b", "a", "c", "a", "b"]:
+        sketch.add(key, failed=key == "b")
+    assert sketch.top(2) == [CommandCount("a", 3, 0), CommandCount("b", 2, 2)]
+
+
+def test_space_saving_bounds_errors_with_fixed_memory():
+    rng = random.Random(7)  # noqa: S311
+    stream = [f"k{min(int(rng.paretovariate(1.2)), 500)}" for _ in range(20_000)]
+    truth = Counter(stream)
+    sketch = SpaceSaving(50)
+    for key in stream:
+        sketch.add(key)
+    top = sketch.top(50)
+    assert len(top) == 50
+    for entry in top:
+        assert truth[entry.key] <= entry.count <= truth[entry.key] + entry.error
+    assert [entry.key for entry in top[:3]] == [key for key, _ in truth.most_common(3)]
+
+
+def test_top_commands_sql_and_sketch_agree(history_db):
+    db = history_db()
+    for command, exit_code, session in [
+        ("git commit -m a", 0, "s1"),
+        ("git commit -m b", 1, "s2"),
+        ("make", 2, "s1"),
+        ("git push", 0, "s1"),
+        ("git commit --amend", 0, "s1"),
+        ("ls", 0, "other"),
+    ]:
+        db.add(command, exit=exit_code, session=session)
+    exact, total = top_commands(["s1", "s2"], db_paths=[db.path], top=2)
+    assert exact == [CommandCount("git commit", 3, 1), CommandCount("git push", 1, 0)]
+    assert total == 5
+    approx, total = top_commands(["s1", "s2"], db_paths=[db.path], top=2, sketch_size=10, batch_size=2)
+    assert approx == exact
+    assert total == 5
+    assert top_commands([], db_paths=[db.path]) == ([], 0)
@@ -0,0 +1,178 @@
+import importlib.util
+import json
+from types import SimpleNamespace
+
+from click.testing import CliRunner
+
+from catherd import cli
+from catherd.kitty import KittySnapshot
+from catherd.watcher import (
+    KittyEvent,
+    KittyEventLog,
+    LiveKittyModel,
+    apply_kitty_event,
+    get_event_log_path,
+    get_kitty_conf_path,
+    get_watcher_path,
+)
+
+LS = [
+    {
+        "id": 1,
+        "tabs": [{"id": 1, "title": "t", "windows": [{"id": 11, "title": "a"}, {"id": 12, "title": "b"}]}],
+    }
+]
+
+
+def load_watcher_script():
+    spec = importlib.util.spec_from_file_location("catherd_kitty_watcher", get_watcher_path())
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fake_window(window_id, tab_id=1, os_window_id=1, title="t"):
+    return SimpleNamespace(id=window_id, tab_id=tab_id, os_window_id=os_window_id, title=title, child=None)
+
+
+def test_watcher_script_writes_events(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    script = load_watcher_script()
+    script.on_load(None, {})
+    script.on_title_change(None, fake_window(11), {"title": "vim"})
+    script.on_focus_change(None, fake_window(11), {"focused": True})
+    script.on_close(None, fake_window(12), {})
+
+    log = tmp_path / "catherd" / "kitty_events.jsonl"
+    assert log == get_event_log_path()
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [e["e"] for e in events] == ["load", "title", "focus", "close"]
+    assert events[1]["title"] == "vim"
+    assert events[1]["w"] == 11
+    assert events[2]["focused"] is True
+
+
+def test_watcher_script_rotates(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    script = load_watcher_script()
+    monkeypatch.setattr(script, "MAX_LOG_BYTES", 10)
+    script.on_load(None, {})
+    script.on_load(None, {})
+    assert (tmp_path / "catherd" / "kitty_events.jsonl.1").exists()
+
+
+def test_event_log_reads_only_new_complete_lines(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"e":"close","w":1}\n')
+    log = KittyEventLog(path)
+    log.seek_end()
+    assert log.read_events() == ([], False)
+
+    with path.open("a") as f:
+        f.write('{"e":"title","w":2,"t":1,"title":"x"}\nnot json\n{"e":"fo')
+    events, rotated = log.read_events()
+    assert not rotated
+    assert [(e.kind, e.window_id, e.title) for e in events] == [("title", "2", "x")]
+
+    with path.open("a") as f:
+        f.write('cus","w":2,"focused":true}\n')
+    events, _ = log.read_events()
+    assert [(e.kind, e.is_focused) for e in events] == [("focus", True)]
+
+
+def test_event_log_detects_rotation(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"e":"close","w":1}\n')
+    log = KittyEventLog(path)
+    log.seek_end()
+    path.replace(tmp_path / "events.jsonl.1")
+    assert log.read_events() == ([], True)
+    path.write_text('{"e":"close","w":1}\n')
+    events, rotated = log.read_events()
+    assert not rotated
+    assert len(events) == 1
+
+
+def test_apply_kitty_event():
+    snap = KittySnapshot.from_ls(LS)
+    assert apply_kitty_event(snap, KittyEvent(kind="title", window_id="11", title="vim"))
+    assert snap.window("11").title == "vim"
+    assert apply_kitty_event(snap, KittyEvent(kind="focus", window_id="12", is_focused=True))
+    assert snap.window("12").is_focused
+    assert apply_kitty_event(snap, KittyEvent(kind="close", window_id="11"))
+    assert snap.window("11") is None
+    assert [w.id for w in snap.tab("1").windows] == ["12"]
+
+    # Unknown window in a new tab and OS window is created on the fly.
+    assert apply_kitty_event(
+        snap, KittyEvent(kind="title", window_id="30", tab="3", os_window="2", title="new")
+    )
+    assert snap.tab("3").os_window == "2"
+    assert [osw.id for osw in snap.os_windows] == ["1", "2"]
+
+    assert not apply_kitty_event(snap, KittyEvent(kind="load"))
+    assert not apply_kitty_event(snap, KittyEvent(kind="title", window_id="99", title="?"))
+    assert apply_kitty_event(snap, KittyEvent(kind="resize", window_id="12"))
+
+
+def test_live_model_applies_deltas_without_relisting(tmp_path):
+    path = tmp_path / "events.jsonl"
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return KittySnapshot.from_ls(LS)
+
+    model = LiveKittyModel(log=KittyEventLog(path), loader=loader)
+    assert model.refresh() == []
+    path.write_text('{"e":"close","w":11}\n{"e":"title","w":12,"t":1,"o":1,"title":"b2"}\n')
+    events = model.refresh()
+    assert len(events) == 2
+    assert [w.title for w in model.snapshot.windows] == ["b2"]
+    assert len(loads) == 1
+
+    with path.open("a") as f:
+        f.write('{"e":"load"}\n')
+    model.refresh()
+    assert len(loads) == 2
+    assert model.resyncs == 2
+
+
+def test_get_kitty_conf_path(monkeypatch, tmp_path):
+    monkeypatch.delenv("KITTY_CONFIG_DIRECTORY", raising=False)
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    assert get_kitty_conf_path() == tmp_path / "kitty" / "kitty.conf"
+    monkeypatch.setenv("KITTY_CONFIG_DIRECTORY", str(tmp_path / "k"))
+    assert get_kitty_conf_path() == tmp_path / "k" / "kitty.conf"
+
+
+def test_install_watcher_idempotent(monkeypatch, tmp_path):
+    conf = tmp_path / "kitty.conf"
+    conf.write_text("font_size 12\n")
+    monkeypatch.setattr(cli, "get_kitty_conf_path", lambda: conf)
+    result = CliRunner().invoke(cli.main, ["install-watcher"])
+    assert "Watcher added" in result.output
+    assert f"watcher {get_watcher_path()}" in conf.read_text()
+    assert (tmp_path / "kitty.conf.catherd.bak").exists()
+    result = CliRunner().invoke(cli.main, ["install-watcher"])
+    assert "already installed" in result.output
+
+
+def test_watch_prints_events(monkeypatch, tmp_path):
+    path = tmp_path / "events.jsonl"
+
+    class Model(LiveKittyModel):
+        def __init__(self):
+            super().__init__(log=KittyEventLog(path), loader=lambda: KittySnapshot.from_ls(LS))
+
+    monkeypatch.setattr(cli, "LiveKittyModel", Model)
+    monkeypatch.setattr(cli.time, "sleep", lambda _s: path.write_text('{"e":"close","w":11}\n'))
+    result = CliRunner().invoke(cli.main, ["watch", "--count", "1"])
+    assert "Tracking 2 window(s)" in result.output
+    assert "close" in result.output
+
+
+def test_watch_no_kitty(monkeypatch):
+    monkeypatch.setattr(cli, "LiveKittyModel", lambda: LiveKittyModel(loader=lambda: None))
+    result = CliRunner().invoke(cli.main, ["watch", "--count", "1"])
+    assert "Could not get Kitty windows" in result.output